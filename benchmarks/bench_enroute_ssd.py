@@ -0,0 +1,69 @@
+"""Benchmark enroute_ssd_safety_analysis on a national-scale synthetic scenario
+
+Aircraft are placed at random over the continental US at cruise flight
+levels between FL290 and FL410, with random headings and speeds, and
+flown straight for a number of 10 s steps, similar to a national GNATS
+simulation.  The analysis is timed, and the number of aircraft pairs
+that reach the SSD construction after the spatial and altitude
+pre-filters is compared with the number of all pairs.
+
+Usage::
+
+    python benchmarks/bench_enroute_ssd.py [--aircraft N] [--steps S] [--n-jobs J]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from paraatm.safety import enroute_ssd
+from paraatm.safety.enroute_ssd import enroute_ssd_safety_analysis
+
+
+def make_national_scenario(n_aircraft, steps, seed=0):
+    """Return a trajectory DataFrame of n_aircraft flying straight for steps 10 s steps"""
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(25, 49, n_aircraft)
+    lon = rng.uniform(-125, -67, n_aircraft)
+    altitude = rng.integers(29, 42, n_aircraft) * 1000.
+    heading = rng.uniform(0, 360, n_aircraft)
+    tas = rng.uniform(420, 500, n_aircraft)
+    start = pd.Timestamp('2020-01-01 12:00')
+    frames = []
+    for step in range(steps):
+        frames.append(pd.DataFrame({'time': start + pd.Timedelta(seconds=10 * step),
+                                    'callsign': ['AC{:05d}'.format(i) for i in range(n_aircraft)],
+                                    'latitude': lat, 'longitude': lon, 'altitude': altitude,
+                                    'tas': tas, 'heading': heading}))
+        # Distance flown in 10 s, in degrees
+        d = tas * 1852 / 3600 * 10 / 111195.
+        lat = lat + d * np.cos(np.radians(heading))
+        lon = lon + d * np.sin(np.radians(heading)) / np.cos(np.radians(lat))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aircraft', type=int, default=5000, help='number of aircraft')
+    parser.add_argument('--steps', type=int, default=10, help='number of 10 s time steps')
+    parser.add_argument('--n-jobs', type=int, help='number of worker processes')
+    args = parser.parse_args()
+
+    df = make_national_scenario(args.aircraft, args.steps)
+    first = df[df['time'] == df['time'].min()]
+    ind1, _ = enroute_ssd._candidate_pairs(first['latitude'].to_numpy(), first['longitude'].to_numpy(),
+                                           first['altitude'].to_numpy(), enroute_ssd.ADSB_RANGE, 1000)
+    print('{} aircraft, {} records; per step {} candidate pairs of {} pairs'.format(
+        args.aircraft, len(df), len(ind1), args.aircraft * (args.aircraft - 1) // 2))
+
+    t0 = time.perf_counter()
+    result = enroute_ssd_safety_analysis(df, n_jobs=args.n_jobs)
+    elapsed = time.perf_counter() - t0
+    print('  {:8.2f} s   {:8.0f} records/s   mean FPF {:.4f}   (n_jobs={})'.format(
+        elapsed, len(df) / elapsed, result['fpf'].mean(), args.n_jobs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark reading a large synthetic GNATS trajectory output file
+
+The aircraft block of the bundled GNATS_output_SFO_PHX.csv sample is
+repeated under different callsigns to produce an output file with the
+requested number of aircraft, which is then read with
+read_gnats_output_file.
+
+Usage::
+
+    python benchmarks/bench_gnats_read.py [--aircraft N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from paraatm.io.gnats import read_gnats_output_file
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'paraatm', 'sample_data', 'GNATS_output_SFO_PHX.csv')
+
+
+def make_scaled_file(n_aircraft, filename):
+    """Write a GNATS output file containing n_aircraft copies of the sample aircraft"""
+    with open(SAMPLE, 'r') as f:
+        lines = f.readlines()
+    preamble = lines[:9]
+    header = lines[9].rstrip('\n').split(',')
+    block = ''.join(lines[10:])
+    with open(filename, 'w') as f:
+        f.writelines(preamble)
+        for i in range(n_aircraft):
+            header[1] = str(i)
+            header[2] = 'AC{:05d}'.format(i)
+            header[6] = str(10 * i)
+            f.write(','.join(header) + '\n')
+            f.write(block)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aircraft', type=int, default=10000, help='number of aircraft in the synthetic file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'gnats.csv')
+        make_scaled_file(args.aircraft, filename)
+        size_mb = os.path.getsize(filename) / 2**20
+
+        t0 = time.perf_counter()
+        df = read_gnats_output_file(filename)
+        elapsed = time.perf_counter() - t0
+
+    print('{} aircraft, {} rows ({:.1f} MB): {:.2f} s'.format(
+        df['callsign'].nunique(), len(df), size_mb, elapsed))
+
+
+if __name__ == '__main__':
+    main()
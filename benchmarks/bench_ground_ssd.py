@@ -0,0 +1,130 @@
+"""Benchmark ground_ssd_safety_analysis on a busy synthetic scenario
+
+The bundled IFF_SFO_window.csv scenario is scaled up to a busy hub by
+adding copies of its aircraft under new callsigns, with their
+positions shifted by a few hundred meters, so that every time bucket
+holds `copies` times as many aircraft.  The analysis is timed on the
+result and, with --baseline, compared against the implementation in a
+previous git revision, whose FPF values must be identical (with
+--method polygon) or agree to within rounding (--method fast).  With
+--interaction-radius, the number of candidate pairs and the time for
+the reduced radius are reported as well.  With --n-jobs, the time
+buckets are spread over that many worker processes.  With --profile,
+the analysis is profiled with SSDProfile, and the time per phase, the
+slowest buckets, and the mean bucket time by number of aircraft are
+printed.
+
+Usage::
+
+    python benchmarks/bench_ground_ssd.py [--copies N] [--baseline REV] [--interaction-radius M] [--n-jobs J] [--method fast|polygon] [--profile]
+"""
+
+import argparse
+import os
+import subprocess
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+from paraatm.io.utils import read_csv_file
+from paraatm.safety.ground_ssd import ground_ssd_safety_analysis, SSDProfile
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE = os.path.join(REPO_DIR, 'paraatm', 'sample_data', 'IFF_SFO_window.csv')
+
+
+def make_busy_scenario(copies, seed=0):
+    """Return the sample scenario with copies of each aircraft added"""
+    df = read_csv_file(SAMPLE)
+    rng = np.random.default_rng(seed)
+    frames = [df]
+    for k in range(1, copies):
+        copy = df.copy()
+        copy['callsign'] = copy['callsign'] + '_{}'.format(k)
+        # Shift each copied aircraft by up to about 500 m
+        shift = {c: rng.uniform(-0.005, 0.005, 2) for c in df['callsign'].unique()}
+        copy['latitude'] += df['callsign'].map(lambda c: shift[c][0])
+        copy['longitude'] += df['callsign'].map(lambda c: shift[c][1])
+        frames.append(copy)
+    return pd.concat(frames, ignore_index=True).sort_values('time', kind='stable', ignore_index=True)
+
+
+def load_baseline(rev):
+    """Import paraatm.safety.ground_ssd as of a git revision"""
+    source = subprocess.run(['git', 'show', '{}:paraatm/safety/ground_ssd.py'.format(rev)], cwd=REPO_DIR,
+                            check=True, capture_output=True, text=True).stdout
+    module = types.ModuleType('ground_ssd_baseline')
+    exec(compile(source, 'ground_ssd_baseline', 'exec'), module.__dict__)
+    return module
+
+
+def print_profile(df, args):
+    """Profile the analysis and print the phases and the slowest buckets"""
+    profile = SSDProfile()
+    ground_ssd_safety_analysis(df, n_jobs=args.n_jobs, method=args.method, profile=profile)
+    summary = profile.summary()
+    print('  seconds per phase:')
+    for phase, seconds in summary.items():
+        print('    {:<9s} {:8.3f}'.format(phase, seconds))
+    buckets = profile.to_frame()
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print('  slowest buckets:')
+        print(buckets.sort_values('total').tail(5).to_string(index=False, float_format='{:.4f}'.format))
+        print('  mean bucket seconds by number of aircraft:')
+        print(buckets.groupby(pd.cut(buckets['aircraft'], 5), observed=True)[['pairs', 'search', 'geometry', 'vo', 'clip', 'total']]
+              .mean().to_string(float_format='{:.4f}'.format))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, default=8, help='number of copies of each aircraft')
+    parser.add_argument('--baseline', help='git revision of the implementation to compare against')
+    parser.add_argument('--interaction-radius', type=float, help='also time the analysis with this interaction radius in meters')
+    parser.add_argument('--n-jobs', type=int, help='number of worker processes')
+    parser.add_argument('--method', choices=['fast', 'polygon'], default='fast', help='FPF area computation')
+    parser.add_argument('--profile', action='store_true', help='report where the time goes')
+    args = parser.parse_args()
+
+    df = make_busy_scenario(args.copies)
+    per_bucket = df.groupby(pd.Grouper(key='time', freq='1s')).size()
+    print('{} aircraft, {} records, up to {} aircraft per 1 s bucket'.format(
+        df['callsign'].nunique(), len(df), per_bucket.max()))
+
+    t0 = time.perf_counter()
+    result = ground_ssd_safety_analysis(df, n_jobs=args.n_jobs, method=args.method)
+    elapsed = time.perf_counter() - t0
+    print('  current   {:8.2f} s   {:8.0f} records/s   (n_jobs={}, method={})'.format(
+        elapsed, len(df) / elapsed, args.n_jobs, args.method))
+
+    if args.profile:
+        print_profile(df, args)
+
+    if args.interaction_radius:
+        t0 = time.perf_counter()
+        ground_ssd_safety_analysis(df, interaction_radius=args.interaction_radius, n_jobs=args.n_jobs, method=args.method)
+        elapsed_radius = time.perf_counter() - t0
+        print('  radius {:g} m   {:8.2f} s   {:8.0f} records/s'.format(
+            args.interaction_radius, elapsed_radius, len(df) / elapsed_radius))
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        t0 = time.perf_counter()
+        expected = baseline.ground_ssd_safety_analysis(df)
+        elapsed_baseline = time.perf_counter() - t0
+        print('  {:<9s} {:8.2f} s   {:8.0f} records/s   speedup {:5.1f}x'.format(
+            args.baseline, elapsed_baseline, len(df) / elapsed_baseline, elapsed_baseline / elapsed))
+        if args.method == 'polygon':
+            pd.testing.assert_frame_equal(result[['time', 'callsign', 'fpf']], expected, check_exact=True)
+            print('  FPF values identical')
+        else:
+            # The fast method derives the ARV area from the ring area,
+            # which may differ in the last digits
+            pd.testing.assert_frame_equal(result, expected, check_exact=False, atol=1e-5)
+            print('  FPF values agree, max difference {:.2g}'.format(
+                np.abs(result['fpf'].to_numpy(float) - expected['fpf'].to_numpy(float)).max()))
+
+
+if __name__ == '__main__':
+    main()
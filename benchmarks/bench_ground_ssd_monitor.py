@@ -0,0 +1,61 @@
+"""Measure the per-update latency of GroundSSDMonitor
+
+The busy synthetic scenario of bench_ground_ssd.py is replayed in time
+order, in batches of --batch-size track updates, through a
+GroundSSDMonitor.  The latency of each update call is recorded and
+its distribution is reported separately for the calls that complete a
+window (and hence compute the SSDs) and for those that only update
+the state.
+
+Usage::
+
+    python benchmarks/bench_ground_ssd_monitor.py [--copies N] [--batch-size B] [--interaction-radius M]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from paraatm.safety.ground_ssd import GroundSSDMonitor
+
+from bench_ground_ssd import make_busy_scenario
+
+
+def describe(label, latencies):
+    latencies = np.asarray(latencies) * 1e3
+    if len(latencies) == 0:
+        return
+    print('  {:<18s} {:6d} calls   median {:8.2f} ms   p95 {:8.2f} ms   max {:8.2f} ms'.format(
+        label, len(latencies), np.median(latencies), np.percentile(latencies, 95), latencies.max()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, default=4, help='number of copies of each aircraft')
+    parser.add_argument('--batch-size', type=int, default=10, help='number of track updates per batch')
+    parser.add_argument('--interaction-radius', type=float, help='interaction radius in meters')
+    args = parser.parse_args()
+
+    df = make_busy_scenario(args.copies)
+    monitor = GroundSSDMonitor(interaction_radius=args.interaction_radius)
+    print('{} records in batches of {}'.format(len(df), args.batch_size))
+
+    state_only, completing = [], []
+    n_rows = 0
+    for start in range(0, len(df), args.batch_size):
+        batch = df.iloc[start:start+args.batch_size]
+        t0 = time.perf_counter()
+        fpf = monitor.update(batch)
+        elapsed = time.perf_counter() - t0
+        (completing if len(fpf) else state_only).append(elapsed)
+        n_rows += len(fpf)
+    n_rows += len(monitor.flush())
+
+    print('  {} FPF rows'.format(n_rows))
+    describe('state update', state_only)
+    describe('window completed', completing)
+
+
+if __name__ == '__main__':
+    main()
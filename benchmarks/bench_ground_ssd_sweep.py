@@ -0,0 +1,58 @@
+"""Benchmark ground_ssd_sweep against one analysis per lookahead time
+
+Lookahead times are drawn from a lognormal response time distribution
+and rounded to 10 ms, as in the response time studies that motivated
+the sweep, and the FPF of the busy synthetic scenario of
+bench_ground_ssd.py is computed for all of them, either with
+ground_ssd_sweep or by calling ground_ssd_safety_analysis once per
+lookahead time.  The loop is only timed on a subset of the lookahead
+times and extrapolated, since it takes long.
+
+Usage::
+
+    python benchmarks/bench_ground_ssd_sweep.py [--lookaheads N] [--copies N] [--loop-sample N]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_ground_ssd import make_busy_scenario
+from paraatm.safety.ground_ssd import ground_ssd_safety_analysis, ground_ssd_sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lookaheads', type=int, default=200, help='number of lookahead times')
+    parser.add_argument('--copies', type=int, default=1, help='number of copies of each aircraft')
+    parser.add_argument('--loop-sample', type=int, default=5, help='number of lookahead times to time the loop on')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lookaheads = np.unique(np.round(rng.lognormal(np.log(2), 0.5, args.lookaheads), 2))
+    df = make_busy_scenario(args.copies)
+    print('{} records, {} distinct lookahead times from {:g} to {:g} s'.format(
+        len(df), len(lookaheads), lookaheads.min(), lookaheads.max()))
+
+    t0 = time.perf_counter()
+    sweep = ground_ssd_sweep(df, lookaheads)
+    elapsed_sweep = time.perf_counter() - t0
+
+    sample = rng.choice(lookaheads, min(args.loop_sample, len(lookaheads)), replace=False)
+    t0 = time.perf_counter()
+    for lookahead in sample:
+        expected = ground_ssd_safety_analysis(df, lookahead_seconds=lookahead)
+        result = sweep[sweep['lookahead'] == lookahead].drop(columns='lookahead')
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    elapsed_loop = (time.perf_counter() - t0) * len(lookaheads) / len(sample)
+
+    print('  sweep     {:8.2f} s'.format(elapsed_sweep))
+    print('  loop      {:8.2f} s (extrapolated from {} lookahead times)   speedup {:5.1f}x'.format(
+        elapsed_loop, len(sample), elapsed_loop / elapsed_sweep))
+    print('  FPF values identical')
+
+
+if __name__ == '__main__':
+    main()
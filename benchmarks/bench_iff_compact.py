@@ -0,0 +1,46 @@
+"""Report the memory saved by the compact dtype mode of read_iff_file
+
+Each bundled IFF_SFO_ASDEX_*.csv sample (scaled up as in
+bench_iff_read.py) is read with the default dtypes, with
+compact=True, and with compact=True restricted to a typical set of
+track-point columns.  The deep memory usage of the resulting
+track-point frames is reported.
+
+Usage::
+
+    python benchmarks/bench_iff_compact.py [--scale N]
+"""
+
+import argparse
+import tempfile
+
+from paraatm.io.iff import read_iff_file
+
+from bench_iff_read import SAMPLES, make_scaled_file
+
+TRACK_COLUMNS = ['time', 'callsign', 'latitude', 'longitude', 'altitude', 'tas', 'heading']
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=50, help='number of times data records are repeated')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for sample in SAMPLES:
+            filename = make_scaled_file(sample, args.scale, tmp)
+            default = frame_mb(read_iff_file(filename))
+            compact = frame_mb(read_iff_file(filename, compact=True))
+            subset = frame_mb(read_iff_file(filename, compact=True, usecols=TRACK_COLUMNS))
+            print('{} x{}'.format(sample, args.scale))
+            print('  default                {:8.2f} MB'.format(default))
+            print('  compact=True           {:8.2f} MB   saved {:5.1f}%'.format(compact, 100 * (1 - compact / default)))
+            print('  compact=True, usecols  {:8.2f} MB   saved {:5.1f}%'.format(subset, 100 * (1 - subset / default)))
+
+
+if __name__ == '__main__':
+    main()
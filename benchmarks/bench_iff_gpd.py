@@ -0,0 +1,56 @@
+"""Benchmark GeoDataFrame construction in read_iff_file_as_gpd
+
+The track points of a scaled-up IFF sample (see bench_iff_read.py) are
+converted to a GeoDataFrame with the previous per-row shapely Point
+list comprehension and with the vectorized construction, and the
+lazy_geometry mode is timed without and with building its geometry.
+Parsing time is excluded by reading the file once up front.
+
+Usage::
+
+    python benchmarks/bench_iff_gpd.py [--scale N] [--repeat R]
+"""
+
+import argparse
+import tempfile
+
+import geopandas as gpd
+from shapely.geometry import Point
+
+from paraatm.io.iff import read_iff_file, _to_geodataframe, TrackPointFrame
+
+from bench_iff_read import best_time, make_scaled_file
+
+
+def legacy_to_geodataframe(df):
+    """Per-row conversion, as implemented prior to the vectorized construction"""
+    geom = [Point(x,y,z) for x,y,z in zip(df.longitude.values,df.latitude.values,df.altitude.values)]
+    df = df.drop(['latitude','longitude','altitude'], axis=1)
+    gdf = gpd.GeoDataFrame(df, geometry=geom)
+    gdf.set_crs(epsg=4326,inplace=True)
+    return gdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1400, help='number of times data records are repeated')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timing repetitions')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_scaled_file('IFF_SFO_ASDEX_ABC123.csv', args.scale, tmp)
+        df = read_iff_file(filename)
+
+    print('{} track points'.format(len(df)))
+    t_legacy = best_time(lambda: legacy_to_geodataframe(df), args.repeat)
+    t_new = best_time(lambda: _to_geodataframe(df), args.repeat)
+    t_lazy = best_time(lambda: TrackPointFrame(df), args.repeat)
+    t_lazy_geom = best_time(lambda: TrackPointFrame(df).geometry, args.repeat)
+    print('  per-row Points      {:7.3f} s'.format(t_legacy))
+    print('  vectorized          {:7.3f} s   speedup {:5.1f}x'.format(t_new, t_legacy / t_new))
+    print('  lazy, no geometry   {:7.3f} s'.format(t_lazy))
+    print('  lazy, geometry      {:7.3f} s'.format(t_lazy_geom))
+
+
+if __name__ == '__main__':
+    main()
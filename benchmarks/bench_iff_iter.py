@@ -0,0 +1,60 @@
+"""Measure peak memory of iter_iff_file against read_iff_file
+
+Synthetic IFF files of increasing size are built from the bundled
+IFF_SFO_ASDEX_ABC123.csv sample (see bench_iff_read.py), with the
+record times of each repetition following the previous one, and each is
+consumed in a fresh process, either all at once with read_iff_file or
+chunk by chunk with iter_iff_file.  The peak resident set size of the
+process is reported.  With the iterator it should stay flat as the
+file grows.
+
+Usage::
+
+    python benchmarks/bench_iff_iter.py [--scales 50 200 800]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_iff_read import make_scaled_file
+
+CHILD = '''
+import resource, sys
+from paraatm.io.iff import read_iff_file, iter_iff_file
+filename, mode = sys.argv[1], sys.argv[2]
+if mode == 'read':
+    nrows = len(read_iff_file(filename))
+else:
+    nrows = sum(len(chunk) for chunk in iter_iff_file(filename, chunksize=20000, time_window='5min'))
+print(nrows, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def peak_rss(filename, mode):
+    out = subprocess.run([sys.executable, '-c', CHILD, filename, mode],
+                         check=True, capture_output=True, text=True).stdout.split()
+    # ru_maxrss is in kB on Linux
+    return int(out[0]), int(out[1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[50, 200, 800], help='number of times data records are repeated')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            filename = make_scaled_file('IFF_SFO_ASDEX_ABC123.csv', scale, tmp, shift_time=True)
+            size_mb = os.path.getsize(filename) / 2**20
+            nrows, rss_read = peak_rss(filename, 'read')
+            _, rss_iter = peak_rss(filename, 'iter')
+            print('{:7.1f} MB, {:8d} rows: read_iff_file peak RSS {:7.1f} MB   iter_iff_file peak RSS {:7.1f} MB'.format(
+                size_mb, nrows, rss_read, rss_iter))
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
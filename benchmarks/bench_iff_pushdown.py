@@ -0,0 +1,57 @@
+"""Benchmark time-range and bounding-box pushdown in read_iff_file
+
+A scaled-up IFF sample (see bench_iff_read.py), with record times
+shifted so that the file spans a long time range, is queried for
+increasing fractions of its time range, once by reading everything and
+filtering the DataFrame afterwards and once with the time_range
+argument.  A bounding-box query around the runway area is timed the
+same way.
+
+Usage::
+
+    python benchmarks/bench_iff_pushdown.py [--scale N] [--repeat R]
+"""
+
+import argparse
+import tempfile
+
+from paraatm.io.iff import read_iff_file
+
+from bench_iff_read import best_time, make_scaled_file
+
+BBOX = (37.615, -122.39, 37.625, -122.38)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=400, help='number of times data records are repeated')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timing repetitions')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_scaled_file('IFF_SFO_ASDEX_ABC123.csv', args.scale, tmp, shift_time=True)
+        times = read_iff_file(filename, usecols=['time'])['time']
+
+        def post_filter_time(end):
+            df = read_iff_file(filename)
+            return df[df['time'] < end]
+
+        def post_filter_bbox():
+            df = read_iff_file(filename)
+            return df[df['latitude'].between(BBOX[0], BBOX[2]) & df['longitude'].between(BBOX[1], BBOX[3])]
+
+        print('{} track points'.format(len(times)))
+        for fraction in [0.01, 0.1, 0.5]:
+            end = times.quantile(fraction)
+            t_post = best_time(lambda: post_filter_time(end), args.repeat)
+            t_push = best_time(lambda: read_iff_file(filename, time_range=(None, end)), args.repeat)
+            print('  time_range {:4.0%}   filter after read {:6.3f} s   pushdown {:6.3f} s'.format(fraction, t_post, t_push))
+
+        n = len(read_iff_file(filename, bbox=BBOX))
+        t_post = best_time(post_filter_bbox, args.repeat)
+        t_push = best_time(lambda: read_iff_file(filename, bbox=BBOX), args.repeat)
+        print('  bbox ({:4.0%})        filter after read {:6.3f} s   pushdown {:6.3f} s'.format(n / len(times), t_post, t_push))
+
+
+if __name__ == '__main__':
+    main()
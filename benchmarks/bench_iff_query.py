@@ -0,0 +1,77 @@
+"""Benchmark IFFQueryEngine against IFFSpark on the same queries
+
+A scaled-up IFF sample (see bench_iff_read.py) is registered as a
+table, converted to geometry, and queried for a time window and a
+fix/radius box with both engines.  The Spark path is skipped when
+pyspark and apache-sedona are not installed.  Spark timings include
+the session startup (and jar download on first use), since that is
+paid by every script that uses IFFSpark.
+
+Usage::
+
+    python benchmarks/bench_iff_query.py [--scale N]
+"""
+
+import argparse
+import tempfile
+import time
+
+from paraatm.io.iff import IFFQueryEngine, IFFSpark
+
+from bench_iff_read import make_scaled_file
+
+FIX = (37.62, -122.385, 0.0)
+RADIUS = 0.005
+VERTICAL_THRESH = -1.0
+
+
+def run_queries(engine_factory, filename, t_start, t_end):
+    """Run the benchmark queries, returning timings and result sizes"""
+    timings = {}
+    t0 = time.perf_counter()
+    engine = engine_factory()
+    timings['startup'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    engine.register_iff_file_as_sql_table(filename, query_name='iff')
+    engine.convert_position_to_geometry('iff', register_name='iff_geom')
+    timings['load'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    n_time = len(engine.query_time('iff_geom', t_start, t_end))
+    timings['query_time'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    n_fix = len(engine.query_fix_and_radius('iff_geom', FIX, RADIUS, VERTICAL_THRESH))
+    timings['query_fix_and_radius'] = time.perf_counter() - t0
+
+    return timings, n_time, n_fix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=400, help='number of times data records are repeated')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = make_scaled_file('IFF_SFO_ASDEX_ABC123.csv', args.scale, tmp, shift_time=True)
+        table = IFFQueryEngine().register_iff_file_as_sql_table(filename)
+        t_start, t_end = (int(t) for t in table['recTime'].quantile([0.45, 0.55]))
+        print('{} track points'.format(len(table)))
+
+        engines = [('IFFQueryEngine', IFFQueryEngine)]
+        try:
+            import pyspark, sedona
+            engines.append(('IFFSpark', IFFSpark))
+        except ImportError:
+            print('  (pyspark/apache-sedona not installed, skipping IFFSpark)')
+
+        for name, factory in engines:
+            timings, n_time, n_fix = run_queries(factory, filename, t_start, t_end)
+            print('  {:<15s} startup {:7.3f} s   load {:7.3f} s   query_time {:7.4f} s ({} rows)   query_fix_and_radius {:7.4f} s ({} rows)'.format(
+                name, timings['startup'], timings['load'], timings['query_time'], n_time,
+                timings['query_fix_and_radius'], n_fix))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark single-pass IFF reading against the previous multi-pass reader
+
+The bundled IFF_SFO_ASDEX_*.csv samples are scaled up synthetically by
+repeating their data records (keeping the header lines once), and both
+readers are timed on the result.
+
+Usage::
+
+    python benchmarks/bench_iff_read.py [--scale N] [--repeat R]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from paraatm.io.iff import read_iff_file, _read_iff_version, _iff_columns, _normalize_iff_frame
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'paraatm', 'sample_data')
+SAMPLES = ['IFF_SFO_ASDEX_ABC123.csv', 'IFF_SFO_ASDEX_3aircraft.csv']
+
+
+def legacy_read_iff_file(filename, record_types=3, callsigns=None, chunksize=50000, encoding='latin-1'):
+    """Multi-pass reader, as implemented prior to the single-pass reader
+
+    The file is scanned once to classify lines and then re-read once
+    per requested record type with a skiprows list.
+    """
+    cols = _iff_columns(_read_iff_version(filename))
+
+    with open(filename, 'r', encoding=encoding) as f:
+        line_record_types = [int(line.split(',')[0]) for line in f]
+
+    if record_types == 'all':
+        record_types = np.unique(line_record_types)
+        scalar_result = False
+    elif hasattr(record_types, '__getitem__'):
+        scalar_result = False
+    else:
+        record_types = [record_types]
+        scalar_result = True
+
+    if callsigns is not None:
+        callsigns = list(np.atleast_1d(callsigns))
+
+    data_frames = dict()
+    for record_type in record_types:
+        skiprows = [i for i,lr in enumerate(line_record_types) if lr != record_type]
+        reader = pd.read_csv(filename, header=None, skiprows=skiprows, names=cols[record_type], usecols=cols[record_type], na_values='?', encoding=encoding, chunksize=chunksize, low_memory=False)
+        if callsigns is None:
+            df = pd.concat((chunk for chunk in reader), ignore_index=True)
+        else:
+            df = pd.concat((chunk[chunk['AcId'].isin(callsigns)] for chunk in reader), ignore_index=True)
+        data_frames[record_type] = _normalize_iff_frame(df)
+
+    if scalar_result:
+        return data_frames[record_types[0]]
+    return data_frames
+
+
+def make_scaled_file(sample, scale, dirname, shift_time=False):
+    """Write a copy of sample with its data records repeated scale times
+
+    If shift_time is True, the record times of each repetition are
+    shifted to follow the previous one, so that the file spans a
+    time range proportional to scale.
+    """
+    with open(os.path.join(SAMPLE_DIR, sample), 'r', encoding='latin-1') as f:
+        lines = f.readlines()
+    header = [l for l in lines if l.split(',')[0] in ('0', '1', '2')]
+    data = [l.split(',') for l in lines if l.split(',')[0] not in ('0', '1', '2')]
+    times = [int(fields[1]) for fields in data]
+    span = max(times) - min(times) + 1
+    filename = os.path.join(dirname, 'scaled_' + sample)
+    with open(filename, 'w', encoding='latin-1') as f:
+        f.writelines(header)
+        for i in range(scale):
+            if shift_time:
+                for fields, t in zip(data, times):
+                    fields[1] = str(t + i * span)
+            f.writelines(','.join(fields) for fields in data)
+    return filename
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=200, help='number of times data records are repeated')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timing repetitions')
+    args = parser.parse_args()
+
+    cases = [('record_types=3', dict(record_types=3)),
+             ("record_types='all'", dict(record_types='all')),
+             ("callsigns='ABC123'", dict(record_types=[3, 4], callsigns='ABC123'))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for sample in SAMPLES:
+            filename = make_scaled_file(sample, args.scale, tmp)
+            size_mb = os.path.getsize(filename) / 2**20
+            print('{} x{} ({:.1f} MB)'.format(sample, args.scale, size_mb))
+            for label, kwargs in cases:
+                t_legacy = best_time(lambda: legacy_read_iff_file(filename, **kwargs), args.repeat)
+                t_new = best_time(lambda: read_iff_file(filename, **kwargs), args.repeat)
+                print('  {:<22s} legacy {:7.3f} s   single-pass {:7.3f} s   speedup {:5.1f}x'.format(
+                    label, t_legacy, t_new, t_legacy / t_new))
+
+
+if __name__ == '__main__':
+    main()
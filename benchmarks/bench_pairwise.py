@@ -0,0 +1,114 @@
+"""Micro-benchmark the pairwise geometry kernel at 10, 100, and 1000 aircraft
+
+Two workloads are timed for random positions around an airport:
+
+* Bearings and distances of all aircraft pairs, as needed by the SSD
+  metrics, computed by gathering the pair positions with fancy indexing
+  and calling _qdrdist_matrix (the previous approach), and with
+  PairwiseGeometry.bearing_distance into reused buffers.
+* The BSTAR neighbor lists of a batch of frames, computed with the
+  previous per-pair loop over vectorized_haversine_dist, and with
+  neighbor_lists.  The loop is only timed up to --loop-max aircraft.
+
+Usage::
+
+    python benchmarks/bench_pairwise.py [--sizes 10 100 1000] [--frames F] [--loop-max N]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from paraatm.pairwise import PairwiseGeometry, neighbor_lists
+from paraatm.safety.ground_ssd import _qdrdist_matrix
+
+
+def legacy_pair_indices(n):
+    """Pair indices as built by the SSD code before the kernel"""
+    x = np.arange(n-1)
+    ind1 = np.repeat(x,(x+1)[::-1])
+    ind2 = np.ones(ind1.shape[0])
+    np.put(ind2, np.cumsum(x[1:][::-1]+1),np.arange(n *-1 + 3, 1))
+    ind2 = np.cumsum(ind2, out=ind2)
+    return ind1, ind2.astype(int)
+
+
+def legacy_haversine_dist(s_lat, s_lng, e_lat, e_lng):
+    """Haversine distance in km, as in bstar/src/utils.py before the kernel"""
+    R = 6373.0
+    s_lat = s_lat * np.pi / 180.0
+    s_lng = np.deg2rad(s_lng)
+    e_lat = np.deg2rad(e_lat)
+    e_lng = np.deg2rad(e_lng)
+    d = np.sin((e_lat - s_lat) / 2) ** 2 + np.cos(s_lat) * np.cos(e_lat) * np.sin((e_lng - s_lng) / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(d))
+
+
+def legacy_neighbor_lists(inputnodes, threshold):
+    """Neighbor lists as computed by TrajectoryDataloader.get_social_inputs_numpy before the kernel"""
+    num_Peds = inputnodes.shape[1]
+    seq_list = (inputnodes[:, :, 0] != 0).astype(float)
+    nei_list = np.zeros((inputnodes.shape[0], num_Peds, num_Peds))
+    nei_num = np.zeros((inputnodes.shape[0], num_Peds))
+    for pedi in range(num_Peds):
+        nei_list[:, pedi, :] = seq_list
+        nei_list[:, pedi, pedi] = 0
+        nei_num[:, pedi] = np.sum(nei_list[:, pedi, :], 1)
+        seqi = inputnodes[:, pedi]
+        for pedj in range(num_Peds):
+            seqj = inputnodes[:, pedj]
+            select = (seq_list[:, pedi] > 0) & (seq_list[:, pedj] > 0)
+            hdist = legacy_haversine_dist(seqi[select, 1], seqi[select, 0], seqj[select, 1], seqj[select, 0])
+            select_dist = (hdist > threshold)
+            nei_num[select, pedi] -= select_dist
+            select[select==True] = select_dist
+            nei_list[select, pedi, pedj] = 0
+    return nei_list, nei_num
+
+
+def best_time(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='numbers of aircraft')
+    parser.add_argument('--frames', type=int, default=20, help='number of frames of the neighbor search')
+    parser.add_argument('--loop-max', type=int, default=100, help='largest number of aircraft to time the neighbor loop for')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    geometry = PairwiseGeometry()
+
+    print('bearing and distance of all pairs')
+    for n in args.sizes:
+        lat, lon = rng.uniform(33.5, 33.8, n), rng.uniform(-84.6, -84.3, n)
+
+        def legacy():
+            ind1, ind2 = legacy_pair_indices(n)
+            return _qdrdist_matrix(lat[ind1], lon[ind1], lat[ind2], lon[ind2])
+
+        number = max(1, 20000 // n)
+        t_legacy = best_time(legacy, number)
+        t_kernel = best_time(lambda: geometry.bearing_distance(lat, lon), number)
+        print('  {:5d} aircraft   previous {:10.1f} us   kernel {:10.1f} us   speedup {:5.1f}x'.format(
+            n, t_legacy * 1e6, t_kernel * 1e6, t_legacy / t_kernel))
+
+    print('neighbor lists of {} frames'.format(args.frames))
+    for n in args.sizes:
+        nodes = np.zeros((args.frames, n, 2))
+        nodes[..., 0] = rng.uniform(-84.6, -84.3, (args.frames, n))
+        nodes[..., 1] = rng.uniform(33.5, 33.8, (args.frames, n))
+        exists = nodes[:, :, 0] != 0
+        t_kernel = best_time(lambda: neighbor_lists(nodes[:, :, 1], nodes[:, :, 0], exists, 10, radius=6373.0, geometry=geometry), 1)
+        if n <= args.loop_max:
+            t_legacy = best_time(lambda: legacy_neighbor_lists(nodes, 10), 1)
+            print('  {:5d} aircraft   previous {:10.2f} ms   kernel {:10.2f} ms   speedup {:5.1f}x'.format(
+                n, t_legacy * 1e3, t_kernel * 1e3, t_legacy / t_kernel))
+        else:
+            print('  {:5d} aircraft   previous {:>10s}      kernel {:10.2f} ms'.format(n, '-', t_kernel * 1e3))
+
+
+if __name__ == '__main__':
+    main()
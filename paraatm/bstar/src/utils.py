@@ -5,6 +5,11 @@ import time
 import numpy as np
 import torch
 
+from paraatm.pairwise import PairwiseGeometry, neighbor_lists
+
+# approximate radius of earth in km
+HAVERSINE_RADIUS = 6373.0
+
 DATASET_NAME_TO_NUM = {
     'atl0801': 0,
     'atl0802': 1,
@@ -19,6 +24,8 @@ class TrajectoryDataloader():
     def __init__(self, args):
 
         self.args = args #arg.dataset=iffatl
+        # buffers for the pairwise distances of the neighbor search
+        self.geometry = PairwiseGeometry()
 
         if self.args.dataset == 'iffatl':
 
@@ -423,41 +430,12 @@ class TrajectoryDataloader():
             seq = inputnodes[:, pedi]  # trajectory for each ped
             seq_list[seq[:, 0] != 0, pedi] = 1  # exist location in ped
 
-        # get relative cords, neighbor id list
-        nei_list = np.zeros((inputnodes.shape[0], num_Peds, num_Peds))
-        nei_num = np.zeros((inputnodes.shape[0], num_Peds))
-
-        # nei_list[f,i,j] denote if j is i's neighbors in timeframe f
-        for pedi in range(num_Peds):
-            nei_list[:, pedi, :] = seq_list
-            nei_list[:, pedi, pedi] = 0  # person i is not the neighbor of itself
-            nei_num[:, pedi] = np.sum(nei_list[:, pedi, :], 1)
-            seqi = inputnodes[:, pedi]
-            for pedj in range(num_Peds):
-                seqj = inputnodes[:, pedj]
-
-                # if altitude (distance coversion) in 3d case
-                # if seqi[select, -1] - seqi[select, -1] < 1000:
-
-                # else:
-                select = (seq_list[:, pedi] > 0) & (seq_list[:, pedj] > 0)
-
-                # calculate the haversine distance between two trajectory sequences
-                hdist = vectorized_haversine_dist(seqi[select, 1], seqi[select, 0], seqj[select, 1], seqj[select, 0])
-                select_dist = (hdist > self.args.neighbor_thred)
-
-                #relative_cord = seqi[select, :] - seqj[select, :]  # relative coords
-
-                # invalid data index
-                # change threshold here
-                # change to L2 norm
-                #select_dist = np.sqrt(relative_cord[:, 0]**2 + relative_cord[:, 1]**2) > self.args.neighbor_thred
-                #select_dist = (abs(relative_cord[:, 0]) > self.args.neighbor_thred) | (abs(relative_cord[:, 1]) > self.args.neighbor_thred)
-
-                nei_num[select, pedi] -= select_dist
-
-                select[select==True] = select_dist
-                nei_list[select, pedi, pedj] = 0
+        # get neighbor id list: nei_list[f,i,j] denote if j is i's
+        # neighbors in timeframe f, using the haversine distance
+        # between the positions of i and j in that timeframe
+        nei_list, nei_num = neighbor_lists(inputnodes[:, :, 1], inputnodes[:, :, 0], seq_list > 0,
+                                           self.args.neighbor_thred, radius=HAVERSINE_RADIUS,
+                                           geometry=self.geometry)
 
         return seq_list, nei_list, nei_num
 
@@ -579,15 +557,9 @@ def L2forTestS(outputs, targets, obs_length, lossMask, num_samples=20):
 
 
 def vectorized_haversine_dist(s_lat, s_lng, e_lat, e_lng):
-    # approximate radius of earth in km
-    # vectorized version to speed up the neighbor search process
-    R = 6373.0
-
-    s_lat = s_lat * np.pi / 180.0
-    s_lng = np.deg2rad(s_lng)
-    e_lat = np.deg2rad(e_lat)
-    e_lng = np.deg2rad(e_lng)
-
-    d = np.sin((e_lat - s_lat) / 2) ** 2 + np.cos(s_lat) * np.cos(e_lat) * np.sin((e_lng - s_lng) / 2) ** 2
-
-    return 2 * R * np.arcsin(np.sqrt(d))
+    # vectorized version to speed up the neighbor search process,
+    # using the shared pairwise geometry kernel
+    n = len(s_lat)
+    pairs = np.arange(n)
+    return PairwiseGeometry().haversine(np.concatenate((s_lat, e_lat)), np.concatenate((s_lng, e_lng)),
+                                        pairs, pairs + n, radius=HAVERSINE_RADIUS).copy()
@@ -0,0 +1,272 @@
+"""On-disk columnar cache for parsed data files
+
+Parsing large IFF or GNATS text files can take from seconds to
+minutes.  The :py:class:`DataCache` class stores the normalized
+DataFrames produced by the readers in Parquet format, keyed by the
+source file path, its size and modification time, and the reader
+arguments.  A later read of the same file with the same arguments
+loads the cached frames instead of reparsing the text.
+
+The cache is opt-in: it is only used when ``cache`` is passed to
+:py:func:`paraatm.io.utils.read_data_file`.  Writing Parquet requires
+the optional ``pyarrow`` package.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Incremented whenever the readers change the layout of the frames
+# they return, so that entries written by older versions are ignored
+CACHE_FORMAT_VERSION = 1
+
+META_FILE = 'meta.json'
+
+
+def default_cache_dir():
+    """Return the default cache directory
+
+    This is the PARAATM_CACHE_DIR environment variable if set, and
+    otherwise ``~/.cache/para-atm``.
+    """
+    return os.environ.get('PARAATM_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'para-atm'))
+
+
+class DataCache:
+    """Size-bounded, least-recently-used cache of parsed DataFrames
+
+    Each entry is a directory holding one Parquet file per DataFrame
+    and a small JSON metadata file.  The modification time of the
+    metadata file records when the entry was last used, and the least
+    recently used entries are evicted once the total size exceeds
+    `max_bytes`.
+    """
+
+    def __init__(self, directory=None, max_bytes=2 * 2**30):
+        """
+        Parameters
+        ----------
+        directory : str, optional
+            Cache directory.  Defaults to :py:func:`default_cache_dir`.
+        max_bytes : int
+            Maximum total size of the cache in bytes
+        """
+        if directory is None:
+            directory = default_cache_dir()
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def make_key(self, filename, reader, args=(), kwargs=None):
+        """Return the cache key for reading filename with the given reader arguments
+
+        Parameters
+        ----------
+        filename : str
+            Source data file
+        reader : str
+            Name of the reader function
+        args : tuple
+            Positional arguments passed to the reader
+        kwargs : dict
+            Keyword arguments passed to the reader
+        """
+        st = os.stat(filename)
+        desc = json.dumps([CACHE_FORMAT_VERSION,
+                           os.path.abspath(filename), st.st_size, st.st_mtime_ns,
+                           reader, [_key_value(a) for a in args],
+                           sorted((k, _key_value(v)) for k, v in (kwargs or {}).items())])
+        return hashlib.sha1(desc.encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss
+
+        Returns
+        -------
+        DataFrame, dict of DataFrames, or None
+        """
+        entry_dir = self._entry_dir(key)
+        meta_file = os.path.join(entry_dir, META_FILE)
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            parts = {part: pd.read_parquet(os.path.join(entry_dir, '{}.parquet'.format(part)))
+                     for part in meta['parts']}
+        except (OSError, ValueError):
+            # Missing or partially written entry
+            return None
+
+        # Parquet does not preserve every datetime resolution, so
+        # restore the original ones
+        for part, dtypes in meta['datetime_dtypes'].items():
+            parts[part] = parts[part].astype(dtypes)
+
+        # Mark entry as recently used
+        os.utime(meta_file)
+
+        if meta['kind'] == 'frame':
+            return parts['0']
+        return {int(part) if meta['int_keys'] else part: df for part, df in parts.items()}
+
+    def put(self, key, result, source=None):
+        """Store a DataFrame or dict of DataFrames under key
+
+        Parameters
+        ----------
+        key : str
+            Cache key from :py:meth:`make_key`
+        result : DataFrame or dict of DataFrames
+            Result to cache
+        source : str, optional
+            Source file name, recorded for :py:meth:`entries`
+
+        Returns
+        -------
+        bool
+            Whether the result was stored.  A result that cannot be
+            represented in Parquet, or any result if pyarrow is not
+            installed, is simply not cached.
+        """
+        if isinstance(result, pd.DataFrame):
+            meta = {'kind': 'frame', 'int_keys': False}
+            parts = {'0': result}
+        else:
+            meta = {'kind': 'dict', 'int_keys': all(isinstance(k, int) for k in result)}
+            parts = {str(k): df for k, df in result.items()}
+        meta['parts'] = list(parts)
+        meta['datetime_dtypes'] = {part: {col: str(dtype) for col, dtype in df.dtypes.items()
+                                          if pd.api.types.is_datetime64_any_dtype(dtype)}
+                                   for part, df in parts.items()}
+        meta['source'] = source
+
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir + '.tmp{}'.format(os.getpid())
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            for part, df in parts.items():
+                df.to_parquet(os.path.join(tmp_dir, '{}.parquet'.format(part)))
+            with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+                json.dump(meta, f)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except ImportError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            warnings.warn('result not cached: {}'.format(e))
+            return False
+        except Exception:
+            # E.g., object columns with mixed types that have no
+            # Parquet representation
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+
+        self.evict()
+        return True
+
+    def entries(self):
+        """Return a DataFrame describing the cache entries
+
+        Returns
+        -------
+        DataFrame
+            Columns 'key', 'source', 'bytes', and 'last_used', sorted
+            from least to most recently used
+        """
+        rows = []
+        if os.path.isdir(self.directory):
+            for key in os.listdir(self.directory):
+                entry_dir = self._entry_dir(key)
+                meta_file = os.path.join(entry_dir, META_FILE)
+                if not os.path.isfile(meta_file):
+                    continue
+                try:
+                    with open(meta_file, 'r') as f:
+                        source = json.load(f).get('source')
+                except ValueError:
+                    source = None
+                size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+                rows.append([key, source, size, pd.Timestamp(os.path.getmtime(meta_file), unit='s')])
+        df = pd.DataFrame(rows, columns=['key', 'source', 'bytes', 'last_used'])
+        return df.sort_values('last_used', ignore_index=True)
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used entries until the cache fits in max_bytes
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Size limit.  Defaults to the limit given at construction.
+
+        Returns
+        -------
+        int
+            Number of entries removed
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self.entries()
+        total = entries['bytes'].sum()
+        removed = 0
+        for key, size in zip(entries['key'], entries['bytes']):
+            if total <= max_bytes:
+                break
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Remove all entries from the cache
+
+        Returns
+        -------
+        int
+            Number of entries removed
+        """
+        return self.evict(max_bytes=-1)
+
+
+def _key_value(value):
+    """Return a JSON-serializable description of a reader argument for the cache key
+
+    Arrays and other sequences are described by their full contents,
+    since repr() abbreviates long arrays.
+    """
+    if isinstance(value, (np.ndarray, pd.Series, pd.Index)):
+        arr = np.asarray(value)
+        if arr.dtype.hasobject:
+            contents = [_key_value(v) for v in arr.ravel().tolist()]
+        else:
+            contents = hashlib.sha1(np.ascontiguousarray(arr).tobytes()).hexdigest()
+        return ['array', str(arr.dtype), list(arr.shape), contents]
+    if isinstance(value, (set, frozenset)):
+        return ['set', sorted(json.dumps(_key_value(v)) for v in value)]
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__, [_key_value(v) for v in value]]
+    return repr(value)
+
+
+def cached_read(cache, reader, filename, *args, **kwargs):
+    """Call reader(filename, *args, **kwargs), going through the cache
+
+    Parameters
+    ----------
+    cache : DataCache
+    reader : callable
+        Reader function returning a DataFrame or dict of DataFrames
+    filename : str
+        Data file to read
+    """
+    key = cache.make_key(filename, reader.__module__ + '.' + reader.__name__, args, kwargs)
+    result = cache.get(key)
+    if result is None:
+        result = reader(filename, *args, **kwargs)
+        cache.put(key, result, source=os.path.abspath(filename))
+    return result
@@ -2,12 +2,125 @@
 
 import pandas as pd
 import numpy as np
-from io import StringIO
+from io import BytesIO
 import os
 import jpype
 import tempfile
 import atexit
 import time
+import hashlib
+import shutil
+import traceback
+import warnings
+import multiprocessing
+import multiprocessing.connection
+from collections import deque
+
+
+#directories on RAM-backed file systems, used for simulation output that
+#is only read back
+MEMORY_TEMP_DIRS = ('/dev/shm',)
+#free space in bytes that a RAM-backed directory must have to be used,
+#since containers often limit /dev/shm to 64 MB
+MEMORY_TEMP_MIN_FREE = 2**30
+#directory for scratch_tempdir, if set
+scratch_root = None
+
+
+def scratch_tempdir():
+    """Create a temporary directory for simulation output that is read back and deleted
+
+    The simulations write their trajectories to a text file, which is
+    parsed and then deleted.  To keep this round trip off persistent
+    disk, the directory is created in a RAM-backed file system
+    (/dev/shm on Linux) if available with at least
+    ``MEMORY_TEMP_MIN_FREE`` bytes free, and otherwise in the default
+    temporary directory.  To choose another location, set the module
+    variable ``scratch_root``.
+
+    Returns
+    -------
+    str
+        Path of the new directory, to be removed by the caller
+    """
+    root = scratch_root
+    if root is None:
+        root = next((d for d in MEMORY_TEMP_DIRS if os.path.isdir(d) and os.access(d, os.W_OK | os.X_OK)
+                     and shutil.disk_usage(d).free >= MEMORY_TEMP_MIN_FREE), None)
+    return tempfile.mkdtemp(prefix='paraatm_', dir=root)
+
+
+def _scratch_output(write, read, basename):
+    """Write simulation output to a scratch file, read it back, and delete it
+
+    The file is written in a directory from :py:func:`scratch_tempdir`.
+    If that is on a RAM-backed file system and writing or reading the
+    file fails, for example because the file system filled up, the
+    output is written again in the default temporary directory.
+
+    Parameters
+    ----------
+    write : callable
+        Called with the file name, to write the output
+    read : callable, optional
+        Called with the file name, to read the output back
+    basename : str
+        Name of the file
+
+    Returns
+    -------
+    Return value of read, or None
+    """
+    tempdir = scratch_tempdir()
+    try:
+        return _write_read(write, read, os.path.join(tempdir, basename))
+    except Exception as e:
+        if not any(os.path.commonpath([os.path.realpath(tempdir), os.path.realpath(d)]) == os.path.realpath(d)
+                   for d in MEMORY_TEMP_DIRS):
+            raise
+        error = e
+    finally:
+        shutil.rmtree(tempdir, ignore_errors=True)
+
+    warnings.warn('simulation output in {} failed ({}), writing it to disk instead'.format(tempdir, error))
+    tempdir = tempfile.mkdtemp(prefix='paraatm_')
+    try:
+        return _write_read(write, read, os.path.join(tempdir, basename))
+    finally:
+        shutil.rmtree(tempdir, ignore_errors=True)
+
+
+def _write_read(write, read, filename):
+    write(filename)
+    if read is not None:
+        return read(filename)
+
+
+def _wait_for_status(get_status, status, timeout=None, initial_interval=1e-4, max_interval=0.05):
+    """Poll get_status() until it returns status
+
+    The simulation interfaces offer no callback for status changes, so
+    the status is polled, first after a fraction of a millisecond and
+    then at intervals that double up to max_interval.  Short
+    simulation steps are thus not followed by a long sleep, while long
+    runs are polled only a few times per second.
+
+    Returns
+    -------
+    float
+        Seconds waited
+    """
+    start = time.perf_counter()
+    interval = initial_interval
+    while True:
+        current = get_status()
+        waited = time.perf_counter() - start
+        if current == status:
+            return waited
+        if timeout is not None and waited > timeout:
+            raise TimeoutError('simulation status {} not reached within {} s, status is {}'.format(status, timeout, current))
+        time.sleep(interval)
+        interval = min(2 * interval, max_interval)
 
 
 # Note: GnatsEnvironment is implemented as a class wtih static methods.
@@ -37,6 +150,12 @@ class GnatsEnvironment:
     # been started and stopped
     jvm_started = False
     jvm_stopped = False
+    # Total seconds spent in wait_for_status
+    wait_time = 0.
+    # Identity of the loaded wind data and aircraft, as set by
+    # load_rap and load_aircraft
+    loaded_rap = None
+    loaded_aircraft = None
 
     @classmethod
     def start_jvm(cls, gnats_home=None):
@@ -199,6 +318,111 @@ class GnatsEnvironment:
             raise RuntimeError("JVM already stopped")        
         return getattr(getattr(jpype.JPackage('com').osi.util, classname), name)
 
+    @classmethod
+    def load_rap(cls, path):
+        """Load wind (RAP) data, unless the same data is already loaded
+
+        The loaded data is identified by its path and the modification
+        times and sizes of its files, so that a sweep over scenarios
+        with the same wind field loads it only once.  Data loaded
+        before is released first.  Wind data loaded this way should
+        only be released through :py:meth:`release_rap`, so that the
+        tracking stays accurate.
+
+        Parameters
+        ----------
+        path : str
+            RAP file or directory.  It is passed to GNATS as given, so
+            a relative path is relative to GNATS_HOME; use
+            :py:meth:`build_path` for a path relative to the original
+            working directory.
+
+        Returns
+        -------
+        bool
+            Whether the data was loaded, as opposed to already loaded
+        """
+        state = _path_state(path)
+        if state == cls.loaded_rap:
+            return False
+        cls.release_rap()
+        cls.environmentInterface.load_rap(path)
+        cls.loaded_rap = state
+        return True
+
+    @classmethod
+    def release_rap(cls):
+        """Release the wind data loaded by :py:meth:`load_rap`, if any"""
+        if cls.loaded_rap is not None:
+            cls.environmentInterface.release_rap()
+            cls.loaded_rap = None
+
+    @classmethod
+    def load_aircraft(cls, trx_file, mfl_file):
+        """Load aircraft, unless the same aircraft are already loaded
+
+        The loaded aircraft are identified by the contents of the TRX
+        and MFL files.  Aircraft loaded before are released first.
+        Note that the aircraft keep their state after a simulation, so
+        reusing them is only appropriate if the simulations do not
+        depend on it.  Aircraft loaded this way should only be released
+        through :py:meth:`release_aircraft`.
+
+        Parameters
+        ----------
+        trx_file, mfl_file : str
+            Passed to GNATS as given, as for :py:meth:`load_rap`
+
+        Returns
+        -------
+        bool
+            Whether the aircraft were loaded, as opposed to already
+            loaded
+        """
+        contents = (_file_digest(trx_file), _file_digest(mfl_file))
+        if contents == cls.loaded_aircraft:
+            return False
+        cls.release_aircraft()
+        cls.aircraftInterface.load_aircraft(trx_file, mfl_file)
+        cls.loaded_aircraft = contents
+        return True
+
+    @classmethod
+    def release_aircraft(cls):
+        """Release the aircraft loaded by :py:meth:`load_aircraft`, if any"""
+        if cls.loaded_aircraft is not None:
+            cls.aircraftInterface.release_aircraft()
+            cls.loaded_aircraft = None
+
+    @classmethod
+    def wait_for_status(cls, status, timeout=None):
+        """Wait until the simulation reaches a runtime status
+
+        The status is polled at intervals that start below a
+        millisecond and grow up to 50 ms, so that pausing after a
+        short simulation step costs little more than the step itself.
+
+        Parameters
+        ----------
+        status : str or int
+            Status to wait for, as the name of a GNATS constant such as
+            'GNATS_SIMULATION_STATUS_PAUSE', or its value
+        timeout : numeric, optional
+            Seconds after which to raise TimeoutError
+
+        Returns
+        -------
+        float
+            Seconds waited, which are also added to the class
+            attribute wait_time
+        """
+        if isinstance(status, str):
+            status = cls.get_gnats_constant(status)
+        waited = _wait_for_status(cls.get_gnats_standalone().getSimulationInterface().get_runtime_sim_status,
+                                  status, timeout)
+        cls.wait_time += waited
+        return waited
+
     @classmethod
     def build_path(cls, filename):
         """Return a path to filename that behaves as if original directory is current working directory
@@ -212,6 +436,25 @@ class GnatsEnvironment:
         return filename
     
 
+def _path_state(path):
+    """Path with the modification times and sizes of its files, to tell whether they changed"""
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [path]
+    return (path,) + tuple((f, os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in files)
+
+
+def _file_digest(filename):
+    """SHA-1 digest of the contents of a file"""
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 # Register stop_jvm to be called automatically when Python exits.
 # This ensures that the JVM is shutdown properly.  The user can still
 # manually call stop_jvm at any point, as it is safe to have multiple
@@ -230,7 +473,12 @@ class GnatsSimulationWrapper:
       directory, use the :py:meth:`GnatsEnvironment.build_path`
       method, which will produce an appropriate path to work around
       the fact that GNATS simulation occurs in the GNATS_HOME
-      directory.
+      directory.  Load and release wind data and aircraft with
+      :py:meth:`GnatsEnvironment.load_rap`,
+      :py:meth:`GnatsEnvironment.load_aircraft`, and the
+      corresponding release methods, rather than through the
+      interfaces, so that the tracking of the loaded data stays
+      accurate.
 
     write_output
       This method writes output to the specified filename.
@@ -278,7 +526,9 @@ class GnatsSimulationWrapper:
         Parameters
         ----------
         output_file : str
-            Output file to write to.  If not provided, a temporary file is used
+            Output file to write to.  If not provided, a temporary
+            file is used, in memory if possible (see
+            :py:func:`scratch_tempdir`)
         return_df : bool
             Whether to read the output into a DataFrame and return it
         **kwargs
@@ -302,25 +552,14 @@ class GnatsSimulationWrapper:
         results['sim_results'] = self.simulation(**kwargs)
 
         if output_file is None:
-            # Create a temporary directory to store the output, so it
-            # can be read back
-            tempdir = tempfile.mkdtemp()
-            output_file = os.path.join(tempdir, 'gnats.csv')
+            # Write the output to a temporary file, so it can be read
+            # back
+            df = _scratch_output(lambda filename: self.write_output(GnatsEnvironment.build_path(filename)),
+                                 read_gnats_output_file if return_df else None, 'gnats.csv')
         else:
-            tempdir = None
-
-        try:
             self.write_output(GnatsEnvironment.build_path(output_file))
             if return_df:
                 df = read_gnats_output_file(GnatsEnvironment.build_path(output_file))
-        finally:
-            # This ensures we clean up the temporary directory and
-            # file even if an exception occurs above.  If there is an
-            # exception, it is automatically re-raised after finally.
-            if tempdir:
-                if os.path.isfile(output_file):
-                    os.remove(output_file)
-                os.rmdir(tempdir)
 
         if hasattr(self, 'cleanup'):
             self.cleanup()
@@ -334,8 +573,12 @@ class GnatsSimulationWrapper:
 class GnatsBasicSimulation(GnatsSimulationWrapper):
     """Simple interface for running a GNATS simulation from TRX and MFL files
 
+    The wind data is kept loaded after the simulation, and is reused by
+    later simulations in the same process (see
+    :py:meth:`GnatsEnvironment.load_rap`).
+
     If more control is needed, create a subclass of :py:class:`GnatsSimulationWrapper`"""
-    def __init__(self, trx_file, mfl_file, propagation_time, time_step):
+    def __init__(self, trx_file, mfl_file, propagation_time, time_step, reuse_aircraft=False):
         """Define basic simulation
 
         Parameters
@@ -346,43 +589,324 @@ class GnatsBasicSimulation(GnatsSimulationWrapper):
             Total flight propagation time in seconds
         time_step : int
             Time step in seconds
+        reuse_aircraft : bool
+            Whether to keep the aircraft loaded after the simulation,
+            so that a following simulation of the same TRX and MFL
+            files skips loading them (see
+            :py:meth:`GnatsEnvironment.load_aircraft`)
         """
         
         self.trx_file = trx_file
         self.mfl_file = mfl_file
         self.propagation_time = propagation_time
         self.time_step = time_step
+        self.reuse_aircraft = reuse_aircraft
 
     def simulation(self):
-        GNATS_SIMULATION_STATUS_ENDED = GnatsEnvironment.get_gnats_constant('GNATS_SIMULATION_STATUS_ENDED')
-
         simulationInterface = GnatsEnvironment.simulationInterface
-        environmentInterface = GnatsEnvironment.environmentInterface
-        aircraftInterface = GnatsEnvironment.aircraftInterface
 
         simulationInterface.clear_trajectory()
 
-        environmentInterface.load_rap(GnatsEnvironment.share_dir + "/tg/rap")
+        GnatsEnvironment.load_rap(GnatsEnvironment.share_dir + "/tg/rap")
 
-        aircraftInterface.load_aircraft(self.trx_file, self.mfl_file)
+        GnatsEnvironment.load_aircraft(self.trx_file, self.mfl_file)
 
         simulationInterface.setupSimulation(self.propagation_time, self.time_step)
 
         simulationInterface.start()
 
-        while True:
-            runtime_sim_status = simulationInterface.get_runtime_sim_status()
-            if (runtime_sim_status == GNATS_SIMULATION_STATUS_ENDED) :
-                break
-            else:
-                time.sleep(1)
+        GnatsEnvironment.wait_for_status('GNATS_SIMULATION_STATUS_ENDED')
 
     def write_output(self, filename):
         GnatsEnvironment.simulationInterface.write_trajectories(filename)
 
     def cleanup(self):
-        GnatsEnvironment.aircraftInterface.release_aircraft()
-        GnatsEnvironment.environmentInterface.release_rap()
+        # The wind data is released by the next load_rap, if different
+        if not self.reuse_aircraft:
+            GnatsEnvironment.release_aircraft()
+
+def run_basic_simulation(trx_file, mfl_file, propagation_time, time_step, reuse_aircraft=False):
+    """Run a :py:class:`GnatsBasicSimulation` and return its trajectory
+
+    This is the default simulator of :py:class:`GnatsScenarioPool`.
+    The JVM is started if it is not already running.  Relative file
+    names are passed to GNATS as given, and so are relative to
+    GNATS_HOME.  The wind data stays
+    loaded for the next scenario run in the same process, and so do
+    the aircraft with reuse_aircraft.
+
+    Returns
+    -------
+    DataFrame
+        Trajectory results
+    """
+    GnatsEnvironment.start_jvm()
+    simulation = GnatsBasicSimulation(trx_file, mfl_file, propagation_time, time_step, reuse_aircraft)
+    return simulation()['trajectory']
+
+
+class GnatsScenarioPool:
+    """Run GNATS scenarios in parallel, in long-lived worker processes
+
+    The JVM can only be started once per process (see
+    :py:class:`GnatsEnvironment`), so simulations in one process run
+    one after another.  The pool starts n_workers processes instead,
+    each of which starts its own JVM and GNATS standalone server with
+    its first scenario and keeps them for the following ones, so that
+    the start-up cost is paid once per worker rather than once per
+    scenario.  Each worker writes the output files of its simulations
+    into its own temporary directory, in memory if possible (see
+    :py:func:`scratch_tempdir`).
+
+    If a worker process dies while running a scenario, for example
+    because the JVM crashed, or exceeds the timeout, it is replaced by
+    a new process, and the scenario is retried up to max_retries
+    times.
+
+    The pool can be used as a context manager, which shuts the workers
+    down on exit::
+
+        scenarios = [dict(trx_file=trx_file, mfl_file=mfl_file, propagation_time=22000, time_step=30)
+                     for trx_file in trx_files]
+        with GnatsScenarioPool(4) as pool:
+            trajectories = pool.map(scenarios)
+    """
+
+    def __init__(self, n_workers=None, simulator=run_basic_simulation, gnats_home=None, timeout=None, max_retries=1):
+        """
+        Parameters
+        ----------
+        n_workers : int, optional
+            Number of worker processes.  Defaults to the number of CPUs.
+        simulator : callable
+            Function that runs a scenario in a worker process, called
+            as ``simulator(**scenario)`` and returning the trajectory
+            DataFrame.  The default, :py:func:`run_basic_simulation`,
+            runs a :py:class:`GnatsBasicSimulation`.  Other functions
+            can run a :py:class:`GnatsSimulationWrapper` subclass, or
+            stand in for GNATS, for example in tests.  The function
+            must be defined at the top level of a module, so that the
+            workers can import it.
+        gnats_home : str, optional
+            GNATS home directory of the workers.  If not provided, the
+            GNATS_HOME environment variable will be used.
+        timeout : numeric, optional
+            Seconds after which a scenario is considered hung, counted
+            from when the worker starts it.  Its worker is then
+            stopped and replaced.  For the first scenario of each
+            worker, this includes starting the JVM.
+        max_retries : int
+            Number of times that a scenario is retried after its worker
+            died or timed out.  Exceptions raised by the simulator are
+            not retried.
+        """
+        self.n_workers = os.cpu_count() if n_workers is None else n_workers
+        self.simulator = simulator
+        self.gnats_home = gnats_home
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Number of worker processes that were replaced
+        self.restarts = 0
+
+        # The JVM does not survive fork, so the workers are started as
+        # fresh interpreters
+        self._context = multiprocessing.get_context('spawn')
+        self._workdir = scratch_tempdir()
+        self._workers = [self._start_worker() for _ in range(self.n_workers)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def map(self, scenarios, return_exceptions=False):
+        """Run scenarios and return their trajectories
+
+        Parameters
+        ----------
+        scenarios : iterable of dict
+            Keyword arguments of the simulator for each scenario, such
+            as 'trx_file', 'mfl_file', 'propagation_time', and
+            'time_step' for :py:func:`run_basic_simulation`
+        return_exceptions : bool
+            If True, a scenario that failed gives a RuntimeError in
+            its place in the results.  Otherwise, a RuntimeError is
+            raised after all scenarios have finished.
+
+        Returns
+        -------
+        list of DataFrame
+            Trajectory of each scenario, in order
+        """
+        if self._workers is None:
+            raise RuntimeError('pool is closed')
+        scenarios = list(scenarios)
+        results = [None] * len(scenarios)
+        failures = {}
+        attempts = [0] * len(scenarios)
+        pending = deque(range(len(scenarios)))
+
+        while True:
+            for worker in list(self._workers):
+                if worker.task is None and pending:
+                    if not worker.process.is_alive():
+                        worker = self._replace(worker)
+                    worker.run(pending.popleft(), scenarios)
+            busy = [worker for worker in self._workers if worker.task is not None]
+            if not busy:
+                break
+
+            wait_timeout = None
+            started = [worker.started for worker in busy if worker.started is not None]
+            if self.timeout is not None and started:
+                wait_timeout = max(0, min(started) + self.timeout - time.monotonic())
+            multiprocessing.connection.wait([worker.conn for worker in busy] + [worker.process.sentinel for worker in busy],
+                                            timeout=wait_timeout)
+
+            for worker in busy:
+                key = worker.task
+                reason = None
+                while worker.conn.poll():
+                    try:
+                        message = worker.conn.recv()
+                    except (EOFError, OSError):
+                        reason = 'worker process died'
+                        break
+                    if message[0] == 'started':
+                        worker.started = time.monotonic()
+                        continue
+                    worker.task = None
+                    if message[0] == 'done':
+                        results[key] = message[2]
+                    else:
+                        failures[key] = RuntimeError('scenario {} failed:\n{}'.format(key, message[2]))
+                    break
+                if worker.task is None:
+                    continue
+                if reason is None and not worker.process.is_alive():
+                    reason = 'worker process died with exit code {}'.format(worker.process.exitcode)
+                if (reason is None and self.timeout is not None and worker.started is not None
+                        and time.monotonic() - worker.started > self.timeout):
+                    reason = 'scenario timed out after {} s'.format(self.timeout)
+                if reason is None:
+                    continue
+
+                # Replace the worker, and retry its scenario first
+                self._replace(worker)
+                attempts[key] += 1
+                if attempts[key] <= self.max_retries:
+                    pending.appendleft(key)
+                else:
+                    failures[key] = RuntimeError('scenario {} failed: {}'.format(key, reason))
+
+        if failures and not return_exceptions:
+            key = min(failures)
+            raise RuntimeError('{} of {} scenarios failed, the first one being {}'.format(
+                len(failures), len(scenarios), failures[key]))
+        for key, exc in failures.items():
+            results[key] = exc
+        return results
+
+    def close(self):
+        """Shut the worker processes down, stopping their JVMs
+
+        Multiple calls are OK.
+        """
+        if self._workers is None:
+            return
+        # Ask all workers to stop first, so that their JVMs shut down
+        # at the same time
+        for worker in self._workers:
+            worker.shutdown()
+        for worker in self._workers:
+            worker.stop(timeout=30)
+        self._workers = None
+        shutil.rmtree(self._workdir, ignore_errors=True)
+
+    def _start_worker(self):
+        workdir = tempfile.mkdtemp(dir=self._workdir)
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_pool_worker, args=(child_conn, self.simulator, self.gnats_home, workdir),
+                                        daemon=True)
+        process.start()
+        child_conn.close()
+        return _PoolWorker(process, conn, workdir)
+
+    def _replace(self, worker):
+        worker.stop()
+        new_worker = self._workers[self._workers.index(worker)] = self._start_worker()
+        self.restarts += 1
+        return new_worker
+
+
+class _PoolWorker:
+    """Parent side of a :py:class:`GnatsScenarioPool` worker process"""
+
+    def __init__(self, process, conn, workdir):
+        self.process = process
+        self.conn = conn
+        self.workdir = workdir
+        # Index of the scenario being run, and when the worker started
+        # it, which excludes the start-up of the process
+        self.task = None
+        self.started = None
+
+    def run(self, key, scenarios):
+        self.task = key
+        self.started = None
+        try:
+            self.conn.send((key, scenarios[key]))
+        except OSError:
+            # The process has died, which is handled as for a crash
+            # during the scenario
+            pass
+
+    def shutdown(self):
+        """Ask the worker to exit once it is idle"""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+    def stop(self, timeout=None):
+        """Wait up to timeout seconds for the process to exit, then kill it"""
+        if timeout is not None:
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def _pool_worker(conn, simulator, gnats_home, workdir):
+    """Main loop of a :py:class:`GnatsScenarioPool` worker process"""
+    global scratch_root
+    if gnats_home is not None:
+        os.environ['GNATS_HOME'] = gnats_home
+    # The output files of the simulations are written to the worker's
+    # own directory
+    scratch_root = workdir
+    try:
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            key, scenario = task
+            conn.send(('started', key))
+            try:
+                result = ('done', key, simulator(**scenario))
+            except Exception:
+                # The exception itself may not be picklable
+                result = ('failed', key, traceback.format_exc())
+            conn.send(result)
+    except (EOFError, KeyboardInterrupt):
+        # The pool has gone away, or the user interrupted the run
+        pass
+    finally:
+        GnatsEnvironment.stop_jvm()
+
 
 def read_gnats_output_file(filename):
     """Read the specified GNATS output file
@@ -396,43 +920,53 @@ def read_gnats_output_file(filename):
     -------
     Single formatted data frame"""
 
-    # Read all lines:
-    with open(filename, 'r') as f:
-        lines = f.readlines()
+    with open(filename, 'rb') as f:
+        preamble = [f.readline().decode() for _ in range(9)]
+        # Store all lines after header
+        raw = f.read()
 
     # Read header information out of specific line numbers
-    header_cols = lines[4].strip()[3:].split(',')
-    data_cols = lines[5].strip()[3:].split(',')
-    start_time = int(lines[7])
-
-    # Store all lines after header
-    lines = lines[9:]
-
-    # Flag header lines, which may occur throughout the file
-    is_header_line = [line.split(',')[0].isalpha() for line in lines]
-    header_indices = np.where(is_header_line)[0]
-
-    # Read in data by iterating over the header rows.  Each header row
-    # specifies the number of records that follow.  That number is
-    # used to find the corresponding subset of data lines associated
-    # with the header, and those lines are read in as a DataFrame
-    # according to the column names defined above.
-    df = pd.DataFrame(columns=data_cols + ['callsign','origin','destination'])
-    for header_idx in header_indices:
-        header_row = pd.read_csv(StringIO(lines[header_idx]), header=None, names=header_cols).iloc[0]
-        nrows = header_row['number_of_trajectory_rec']
-        aircraft_df = pd.read_csv(StringIO('\n'.join(lines[header_idx+1:header_idx+1+nrows])), header=None, names=data_cols)
-
-        # Fill in auxiliary data that comes from the header row
-        aircraft_df['callsign'] = header_row['callsign']
-        aircraft_df['origin'] = header_row['origin_airport']
-        aircraft_df['destination'] = header_row['destination_airport']
+    header_cols = preamble[4].strip()[3:].split(',')
+    data_cols = preamble[5].strip()[3:].split(',')
+    start_time = int(preamble[7])
+
+    # Flag header lines, which may occur throughout the file.  These
+    # are the lines that start with a letter, which is checked for all
+    # lines at once on the raw bytes.
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == ord('\n'))
+    line_starts = np.concatenate(([0], newlines + 1))
+    line_starts = line_starts[line_starts < len(raw)]
+    first_char = buf[line_starts] | 0x20 # Lower case
+    header_starts = line_starts[(first_char >= ord('a')) & (first_char <= ord('z'))]
+    header_ends = np.append(newlines, len(raw))[np.searchsorted(newlines, header_starts)] + 1
+
+    if len(header_starts) == 0:
+        # No aircraft, e.g., an empty run
+        df = pd.DataFrame(columns=data_cols + ['callsign','origin','destination'])
+    else:
+        # Tokenize all header rows and all data rows (the text between
+        # the header rows) with one read_csv call each, instead of once
+        # per aircraft
+        header_text = b''.join([raw[i:j] for i, j in zip(header_starts, header_ends)])
+        data_text = b''.join([raw[i:j] for i, j in zip(np.append(0, header_ends), np.append(header_starts, len(raw)))])
+        headers = pd.read_csv(BytesIO(header_text), header=None, names=header_cols)
+        data = pd.read_csv(BytesIO(data_text), header=None, names=data_cols)
+
+        nrows = headers['number_of_trajectory_rec'].values
+        if nrows.sum() != len(data):
+            raise ValueError('number of trajectory records in {} does not match its aircraft headers'.format(filename))
+        # Index of the aircraft that each data row belongs to, used to
+        # broadcast the auxiliary data from the header rows
+        aircraft = np.repeat(np.arange(len(headers)), nrows)
+
+        columns = dict(data.items())
+        columns['callsign'] = headers['callsign'].values[aircraft]
+        columns['origin'] = headers['origin_airport'].values[aircraft]
+        columns['destination'] = headers['destination_airport'].values[aircraft]
         # Adjust for aircraft-specific start time:
-        aircraft_df['timestamp(UTC sec)'] += header_row['start_time']
-
-        # Append this aircraft's data to the output:
-        df = df.append(aircraft_df)
-
+        columns['timestamp(UTC sec)'] = columns['timestamp(UTC sec)'].values + headers['start_time'].values[aircraft]
+        df = pd.DataFrame(columns)
 
     df.rename(columns={'timestamp(UTC sec)':'time',
                        'course':'heading',
@@ -446,4 +980,3 @@ def read_gnats_output_file(filename):
     df['time'] = pd.to_datetime(df['time'], unit='s')
 
     return df
-
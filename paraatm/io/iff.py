@@ -2,11 +2,490 @@
 
 import pandas as pd
 import numpy as np
+from io import StringIO
+from array import array
+from itertools import compress
+import mmap
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from pkg_resources import parse_version
 import geopandas as gpd
-from shapely.geometry import Point
 
-def read_iff_file(filename, record_types=3, callsigns=None, chunksize=50000, encoding='latin-1'):
+def _read_iff_version(filename):
+    """Return the IFF file format version
+
+    This is in record type 1, which for now we assume to occur on the
+    first line.
+    """
+    with open(filename, 'r') as f:
+        return parse_version(f.readline().split(',')[2])
+
+def _iff_columns(version):
+    """Return dict mapping each record type to its list of column names"""
+    # Columns for each record type, from version 2.6 specification.
+    cols = {0:['recType','comment'],
+            1:['recType','fileType','fileFormatVersion'],
+            2:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','acType','Orig','Dest','opsType','estOrig','estDest'],
+            3:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','coord1','coord2','alt','significance','coord1Accur','coord2Accur','altAccur','groundSpeed','course','rateOfClimb','altQualifier','altIndicator','trackPtStatus','leaderDir','scratchPad','msawInhibitInd','assignedAltString','controllingFac','controllingSeg','receivingFac','receivingSec','activeContr','primaryContr','kybrdSubset','kybrdSymbol','adsCode','opsType','airportCode'],
+            4:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','acType','Orig','Dest','altcode','alt','maxAlt','assignedAltString','requestedAltString','route','estTime','fltCat','perfCat','opsType','equipList','coordinationTime','coordinationTimeType','leaderDir','scratchPad1','scratchPad2','fixPairScratchPad','prefDepArrRoute','prefDepRoute','prefArrRoute'],
+            5:['recType','dataSource','programName','programVersion'],
+            6:['recType','recTime','Source','msgType','rectypeCat','sectorizationString'],
+            7:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','coord1','coord2','alt','significance','coord1Accur','coord2Accur','altAccur','msawtype','msawTimeCat','msawLocCat','msawMinSafeAlt','msawIndex1','msawIndex2','msawVolID'],
+            8:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','acType','Orig','Dest','depTime','depTimeType','arrTime','arrTimeType'],
+            9:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','coord1','coord2','alt','pitchAngle','trueHeading','rollAngle','trueAirSpeed','fltPhaseIndicator'],
+            10:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','configType','configSpec']}
+
+    # For newer versions, additional columns are supported.  However,
+    # this code could be commented out, and it should still be
+    # compatible with newer versions, but just ignoring the additional
+    # columns.
+    if version >= parse_version('2.13'):
+        cols[2] += ['modeSCode']
+        cols[3] += ['trackNumber','tptReturnType','modeSCode']
+        cols[4] += ['coordinationPoint','coordinationPointType','trackNumber','modeSCode']
+    if version >= parse_version('2.15'):
+        cols[3] += ['sensorTrackNumberList','spi','dvs','dupM3a','tid']
+
+    return cols
+
+# Column renames applied for consistency with other PARA-ATM data
+_IFF_RENAME = {'recTime':'time',
+               'AcId':'callsign',
+               'coord1':'latitude',
+               'coord2':'longitude',
+               'alt':'altitude',
+               'rateOfClimb':'rocd',
+               'groundSpeed':'tas',
+               'course':'heading'}
+
+# Reduced-size dtypes used by the compact mode of read_iff_file.
+# Integer columns use the nullable pandas types, since they may have
+# missing values.
+IFF_COMPACT_DTYPES = {'coord1':'float32',
+                      'coord2':'float32',
+                      'coord1Accur':'float32',
+                      'coord2Accur':'float32',
+                      'altAccur':'float32',
+                      'bcnCode':'Int16',
+                      'significance':'Int8',
+                      'leaderDir':'Int8',
+                      'AcId':'category',
+                      'Source':'category',
+                      'msgType':'category',
+                      'acType':'category',
+                      'Orig':'category',
+                      'Dest':'category',
+                      'controllingFac':'category',
+                      'controllingSeg':'category',
+                      'receivingFac':'category',
+                      'receivingSec':'category'}
+
+def _parse_iff_lines(lines, columns, callsigns=None, usecols=None, dtype=None):
+    """Parse buffered raw lines of a single record type into a DataFrame
+
+    Parameters
+    ----------
+    lines : list of str, or str
+        Raw lines (including line terminators) that all belong to the
+        same record type, or their concatenation
+    columns : list of str
+        Column names for the record type
+    callsigns : None or list of str
+        If provided, only keep rows whose 'AcId' is in the list
+    usecols : None or list of str
+        If provided, only these columns are materialized
+    dtype : None or dict
+        Column dtypes passed on to pd.read_csv
+    """
+    if not isinstance(lines, str):
+        lines = ''.join(lines)
+    if usecols is None:
+        usecols = columns
+    # The callsign column is needed for filtering, even if it was not
+    # requested
+    read_cols = usecols
+    if callsigns is not None and 'AcId' in columns and 'AcId' not in usecols:
+        read_cols = [c for c in columns if c in usecols or c == 'AcId']
+    if dtype is not None:
+        dtype = {c: t for c, t in dtype.items() if c in read_cols}
+    # Passing usecols is necessary because for some records, the
+    # actual data has extraneous empty columns at the end, in which
+    # case the data does not seem to get read correctly without
+    # usecols.  Positions are used, so that the names only need to
+    # cover the selected columns.
+    positions = [i for i, c in enumerate(columns) if c in read_cols]
+    df = pd.read_csv(StringIO(lines), header=None, names=[columns[i] for i in positions], usecols=positions, dtype=dtype, na_values='?', low_memory=False)
+    if callsigns is not None and 'AcId' in df:
+        df = df[df['AcId'].isin(callsigns)]
+        if read_cols is not usecols:
+            df = df.drop(columns='AcId')
+    return df
+
+def _concat_iff_chunks(chunks):
+    """Concatenate DataFrame chunks, keeping categorical columns categorical
+
+    pd.concat turns categorical columns whose categories differ
+    between chunks into object columns, so the categories are unified
+    first.
+    """
+    if len(chunks) > 1:
+        for col, dtype in chunks[0].dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                categories = pd.api.types.union_categoricals([chunk[col] for chunk in chunks]).categories
+                chunks = [chunk.assign(**{col: chunk[col].cat.set_categories(categories)}) for chunk in chunks]
+    return pd.concat(chunks, ignore_index=True)
+
+def _to_epoch_seconds(value):
+    """Convert a time bound to seconds since the epoch, as used by recTime
+
+    Numeric values are taken to be seconds since the epoch already.
+    Other values are converted with pd.Timestamp, with naive times
+    taken as UTC.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return pd.Timestamp(value).timestamp()
+
+def _iff_line_mask(lines, columns, time_range, bbox):
+    """Evaluate time range and bounding box predicates on raw lines
+
+    Only the recTime, coord1, and coord2 fields are parsed, so that
+    the lines that fail the predicates can be dropped before the
+    remaining fields are converted.
+
+    Parameters
+    ----------
+    lines : list of str
+        Raw lines of a single record type
+    columns : list of str
+        Column names for the record type
+    time_range : None or tuple of float
+        (start, end) in seconds since the epoch.  Either may be None.
+    bbox : None or tuple of float
+        (lat_min, lon_min, lat_max, lon_max)
+
+    Returns
+    -------
+    ndarray of bool, or None
+        Mask of lines to keep, or None if the record type has none of
+        the fields that the predicates refer to
+    """
+    fields = []
+    if time_range is not None and 'recTime' in columns:
+        fields.append('recTime')
+    if bbox is not None and 'coord1' in columns and 'coord2' in columns:
+        fields += ['coord1', 'coord2']
+    if not fields:
+        return None
+
+    if fields == ['recTime']:
+        # recTime directly follows the record type, so it can be
+        # sliced out of each line much faster than the C reader
+        # tokenizes the full lines
+        df = pd.DataFrame({'recTime': [line.split(',', 2)[1] for line in lines]})
+    else:
+        positions = sorted(columns.index(c) for c in fields)
+        df = pd.read_csv(StringIO(''.join(lines)), header=None, names=[columns[i] for i in positions], usecols=positions, na_values='?', low_memory=False)
+    mask = np.ones(len(df), dtype=bool)
+    if 'recTime' in fields:
+        t = pd.to_numeric(df['recTime'], errors='coerce').to_numpy()
+        start, end = time_range
+        if start is not None:
+            mask &= t >= start
+        if end is not None:
+            mask &= t < end
+    if 'coord1' in fields:
+        lat = pd.to_numeric(df['coord1'], errors='coerce').to_numpy()
+        lon = pd.to_numeric(df['coord2'], errors='coerce').to_numpy()
+        lat_min, lon_min, lat_max, lon_max = bbox
+        mask &= (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+    return mask
+
+def _normalize_iff_frame(df):
+    """Rename and convert columns for consistency with other PARA-ATM data"""
+    df.rename(columns=_IFF_RENAME, inplace=True)
+
+    if 'time' in df:
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+    if 'altitude' in df:
+        df['altitude'] *= 100 # Convert 100s ft to ft
+
+    return df
+
+# Record types for which the sidecar index also stores the callsign of
+# each line, so that reads restricted to a few callsigns only touch
+# the matching lines
+INDEXED_CALLSIGN_RECORD_TYPES = (3, 4, 8, 9)
+
+def iff_index_filename(filename):
+    """Return the name of the sidecar index file for an IFF file"""
+    return filename + '.index.npz'
+
+def build_iff_index(filename, encoding='latin-1', index_file=None):
+    """Build the byte-offset record index for an IFF file and save it
+
+    The index stores, for each record type, the byte offset and
+    length of every line of that type.  For the record types in
+    :py:data:`INDEXED_CALLSIGN_RECORD_TYPES` it also stores the
+    callsign of each line.  It is saved next to the data file (see
+    :py:func:`iff_index_filename`) along with the size and
+    modification time of the data file, which are used to detect
+    when the index has become stale.
+
+    Parameters
+    ----------
+    filename : str
+        IFF file to index
+    encoding : str
+        Encoding used to decode callsigns
+    index_file : str, optional
+        Where to save the index.  Defaults to the sidecar location.
+
+    Returns
+    -------
+    dict
+        The index, as stored in the sidecar file
+    """
+    st = os.stat(filename)
+    offsets = dict()
+    lengths = dict()
+    codes = dict()
+    callsign_codes = dict()
+    prefix_record_type = dict()
+
+    pos = 0
+    with open(filename, 'rb') as f:
+        for line in f:
+            n = len(line)
+            prefix = line[:line.find(b',')]
+            record_type = prefix_record_type.get(prefix)
+            if record_type is None:
+                record_type = prefix_record_type[prefix] = int(prefix)
+                if record_type not in offsets:
+                    offsets[record_type] = array('q')
+                    lengths[record_type] = array('q')
+                    if record_type in INDEXED_CALLSIGN_RECORD_TYPES:
+                        codes[record_type] = array('q')
+            offsets[record_type].append(pos)
+            lengths[record_type].append(n)
+            if record_type in codes:
+                callsign = line.split(b',', 8)[7]
+                code = callsign_codes.get(callsign)
+                if code is None:
+                    code = callsign_codes[callsign] = len(callsign_codes)
+                codes[record_type].append(code)
+            pos += n
+
+    index = {'size': np.int64(st.st_size),
+             'mtime_ns': np.int64(st.st_mtime_ns),
+             'callsign_names': np.array([c.decode(encoding) for c in callsign_codes], dtype=str)}
+    for record_type in offsets:
+        index['offsets_%d' % record_type] = np.frombuffer(offsets[record_type], dtype=np.int64)
+        index['lengths_%d' % record_type] = np.frombuffer(lengths[record_type], dtype=np.int64)
+        if record_type in codes:
+            index['callsigns_%d' % record_type] = np.frombuffer(codes[record_type], dtype=np.int64)
+
+    if index_file is None:
+        index_file = iff_index_filename(filename)
+    try:
+        with open(index_file, 'wb') as f:
+            np.savez(f, **index)
+    except OSError:
+        # The index is only a cache, so an unwritable location is not
+        # an error; it will just be rebuilt on the next read
+        pass
+
+    return index
+
+def load_iff_index(filename, encoding='latin-1', rebuild=True):
+    """Load the sidecar index for an IFF file, building it if needed
+
+    The saved index is discarded if the size or modification time of
+    the data file has changed since it was built.
+
+    Parameters
+    ----------
+    filename : str
+        IFF file
+    encoding : str
+        Encoding used to decode callsigns when building the index
+    rebuild : bool
+        If True, build the index when it is missing or stale.
+        Otherwise, return None in that case.
+
+    Returns
+    -------
+    dict or None
+    """
+    st = os.stat(filename)
+    index_file = iff_index_filename(filename)
+    if os.path.isfile(index_file):
+        with np.load(index_file) as npz:
+            index = {key: npz[key] for key in npz.files}
+        if index['size'] == st.st_size and index['mtime_ns'] == st.st_mtime_ns:
+            return index
+    if rebuild:
+        return build_iff_index(filename, encoding=encoding)
+    return None
+
+def _index_record_types(index):
+    """Return the record types present in an index, in sorted order"""
+    return sorted(int(key.split('_')[1]) for key in index if key.startswith('offsets_'))
+
+def _scan_iff_chunks(filename, wanted, parse, chunksize, encoding):
+    """Read an IFF file in a single pass, yielding parsed chunks
+
+    Each line is routed, based on the record type field that precedes
+    the first comma, to a buffer for that record type.  Full buffers
+    are handed to parse(lines, record_type), which uses the C reader
+    of pd.read_csv and reduces the rows to the requested callsigns,
+    so that at most chunksize raw lines per record type are held in
+    memory at once.  Chunks for which parse returns None, because
+    none of their lines are selected, are skipped.
+
+    Yields
+    ------
+    (int, DataFrame)
+        Record type and the (not yet normalized) chunk of data
+    """
+    buffers = {}
+    prefix_record_type = {} # Cache the int conversion of each prefix
+    with open(filename, 'r', encoding=encoding) as f:
+        for line in f:
+            prefix = line[:line.find(',')]
+            buf = buffers.get(prefix)
+            if buf is None:
+                record_type = prefix_record_type.get(prefix)
+                if record_type is None:
+                    record_type = prefix_record_type[prefix] = int(prefix)
+                if wanted is not None and record_type not in wanted:
+                    continue
+                buf = buffers[prefix] = []
+            buf.append(line)
+            if len(buf) >= chunksize:
+                record_type = prefix_record_type[prefix]
+                chunk = parse(buf, record_type)
+                if chunk is not None:
+                    yield record_type, chunk
+                buf.clear()
+
+    for prefix, buf in buffers.items():
+        if buf:
+            record_type = prefix_record_type[prefix]
+            chunk = parse(buf, record_type)
+            if chunk is not None:
+                yield record_type, chunk
+
+def _index_iff_chunks(filename, index, wanted, callsigns, parse, chunksize, encoding):
+    """Read selected lines of an IFF file by seeking through its index
+
+    Only the lines of the wanted record types (and, for record types
+    in :py:data:`INDEXED_CALLSIGN_RECORD_TYPES`, of the wanted
+    callsigns) are sliced out of a memory map of the file.  Runs of
+    adjacent lines are copied as a single slice.
+
+    Yields
+    ------
+    (int, DataFrame)
+        Record type and the (not yet normalized) chunk of data
+    """
+    if wanted is None:
+        wanted = _index_record_types(index)
+    if callsigns is not None:
+        wanted_codes = np.flatnonzero(np.isin(index['callsign_names'], [str(c) for c in callsigns]))
+
+    if os.path.getsize(filename) == 0:
+        return
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for record_type in wanted:
+            key = 'offsets_%d' % record_type
+            if key not in index:
+                continue
+            offsets = index[key]
+            lengths = index['lengths_%d' % record_type]
+            if callsigns is not None and record_type in INDEXED_CALLSIGN_RECORD_TYPES:
+                keep = np.isin(index['callsigns_%d' % record_type], wanted_codes)
+                offsets = offsets[keep]
+                lengths = lengths[keep]
+
+            for start in range(0, len(offsets), chunksize):
+                chunk_offsets = offsets[start:start+chunksize]
+                chunk_ends = chunk_offsets + lengths[start:start+chunksize]
+                # Coalesce lines that directly follow one another
+                breaks = np.flatnonzero(chunk_offsets[1:] != chunk_ends[:-1]) + 1
+                run_starts = chunk_offsets[np.concatenate(([0], breaks))]
+                run_ends = chunk_ends[np.concatenate((breaks - 1, [len(chunk_ends) - 1]))]
+                data = b''.join([mm[s:e] for s, e in zip(run_starts, run_ends)])
+                chunk = parse(data.decode(encoding), record_type)
+                if chunk is not None:
+                    yield record_type, chunk
+
+def _open_iff_chunks(filename, record_types, callsigns, chunksize, encoding, use_index, compact=False, usecols=None, time_range=None, bbox=None):
+    """Set up a reader of raw chunks for the requested records
+
+    Returns
+    -------
+    cols : dict
+        Columns of each record type that are materialized
+    wanted : list of int, or None
+        Requested record types, or None for all
+    scalar_result : bool
+        Whether a single record type was requested as a scalar
+    reader : generator
+        Generator of (record_type, DataFrame) chunks
+    """
+    cols = _iff_columns(_read_iff_version(filename))
+
+    # Determine which record types to retrieve, and whether the result
+    # should be a scalar or dict:
+    if record_types == 'all':
+        wanted = None
+        scalar_result = False
+    elif hasattr(record_types, '__getitem__'):
+        wanted = [int(r) for r in record_types]
+        scalar_result = False
+    else:
+        wanted = [int(record_types)]
+        scalar_result = True
+
+    if callsigns is not None:
+        callsigns = list(np.atleast_1d(callsigns))
+
+    all_cols = cols
+    if usecols is not None:
+        # Accept both the original IFF names and the renamed ones
+        raw_names = {v: k for k, v in _IFF_RENAME.items()}
+        usecols = set(raw_names.get(c, c) for c in usecols)
+        cols = {r: [c for c in columns if c in usecols] for r, columns in cols.items()}
+
+    dtype = IFF_COMPACT_DTYPES if compact else None
+
+    if time_range is not None:
+        time_range = tuple(_to_epoch_seconds(t) for t in time_range)
+
+    def parse(lines, record_type):
+        if time_range is not None or bbox is not None:
+            if isinstance(lines, str):
+                lines = StringIO(lines).readlines()
+            mask = _iff_line_mask(lines, all_cols[record_type], time_range, bbox)
+            if mask is not None:
+                lines = list(compress(lines, mask))
+                if not lines:
+                    return None
+        return _parse_iff_lines(lines, all_cols[record_type], callsigns, usecols=cols[record_type], dtype=dtype)
+
+    if use_index:
+        index = load_iff_index(filename, encoding=encoding)
+        reader = _index_iff_chunks(filename, index, wanted, callsigns, parse, chunksize, encoding)
+    else:
+        reader = _scan_iff_chunks(filename, wanted, parse, chunksize, encoding)
+
+    return cols, wanted, scalar_result, reader
+
+def read_iff_file(filename, record_types=3, callsigns=None, chunksize=50000, encoding='latin-1', use_index=False, compact=False, usecols=None, time_range=None, bbox=None):
     """
     Read IFF file and return data frames for requested record types
     
@@ -33,16 +512,49 @@ def read_iff_file(filename, record_types=3, callsigns=None, chunksize=50000, enc
         (in the case of a single string) or match one of the specified
         callsigns (in the case of a list of strings).
     chunksize: int
-        Number of rows that are read at a time by pd.read_csv.  This
-        limits memory usage when working with large files, as we can
-        extract out the desired rows from each chunk, isntead of
-        reading everything into one large DataFrame and then taking a
-        subset.
+        Number of rows of each record type that are buffered before
+        being parsed by pd.read_csv.  This limits memory usage when
+        working with large files, as we can extract out the desired
+        rows from each chunk, isntead of reading everything into one
+        large DataFrame and then taking a subset.
     encoding: str
         Encoding argument passed on to open and pd.read_csv.  Using
         'latin-1' instead of the default will suppress errors that
         might otherwise occur with minor data corruption.  See
         http://python-notes.curiousefficiency.org/en/latest/python3/text_file_processing.html
+    use_index : bool
+        If True, use the sidecar byte-offset index of the file (see
+        :py:func:`build_iff_index`), building it first if it is
+        missing or out of date.  Reads then only touch the lines of
+        the requested record types and callsigns, instead of scanning
+        the whole file.
+    compact : bool
+        If True, use reduced-size dtypes (see
+        :py:data:`IFF_COMPACT_DTYPES`): float32 for positions and
+        their accuracies, small integers for the beacon code,
+        significance, and leader direction, and categoricals for the
+        callsign, source, message type, aircraft type, origin,
+        destination, and facility fields.
+    usecols : None or list of str
+        If provided, only these columns are materialized, which
+        further reduces memory use.  Both the original IFF column
+        names and the renamed ones (e.g., 'latitude' for 'coord1')
+        are accepted.  Names that do not occur in a record type are
+        ignored for that record type.
+    time_range : None or tuple
+        If provided, (start, end) of the half-open interval of record
+        times to return.  The bounds may be anything accepted by
+        pd.Timestamp, with naive times taken as UTC, or numbers of
+        seconds since the epoch.  Either bound may be None.
+    bbox : None or tuple of float
+        If provided, (lat_min, lon_min, lat_max, lon_max) of the area
+        to return.  Records without a position inside the box
+        (inclusive) are dropped.
+
+        Both predicates are evaluated on the raw recTime, coord1, and
+        coord2 fields of each chunk, so that only the selected lines
+        are fully parsed.  Record types that lack the relevant fields
+        (e.g., flight plans for bbox) are not filtered.
     
     Returns
     -------
@@ -55,99 +567,299 @@ def read_iff_file(filename, record_types=3, callsigns=None, chunksize=50000, enc
     # consistency with the behavior of other functions that expect
     # flight tracking data
 
-    # Determine file format version.  This is in record type 1, which
-    # for now we assume to occur on the first line.
-    with open(filename, 'r') as f:
-        version = parse_version(f.readline().split(',')[2])
-
-    # Columns for each record type, from version 2.6 specification.
-    cols = {0:['recType','comment'],
-            1:['recType','fileType','fileFormatVersion'],
-            2:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','acType','Orig','Dest','opsType','estOrig','estDest'],
-            3:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','coord1','coord2','alt','significance','coord1Accur','coord2Accur','altAccur','groundSpeed','course','rateOfClimb','altQualifier','altIndicator','trackPtStatus','leaderDir','scratchPad','msawInhibitInd','assignedAltString','controllingFac','controllingSeg','receivingFac','receivingSec','activeContr','primaryContr','kybrdSubset','kybrdSymbol','adsCode','opsType','airportCode'],
-            4:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','acType','Orig','Dest','altcode','alt','maxAlt','assignedAltString','requestedAltString','route','estTime','fltCat','perfCat','opsType','equipList','coordinationTime','coordinationTimeType','leaderDir','scratchPad1','scratchPad2','fixPairScratchPad','prefDepArrRoute','prefDepRoute','prefArrRoute'],
-            5:['recType','dataSource','programName','programVersion'],
-            6:['recType','recTime','Source','msgType','rectypeCat','sectorizationString'],
-            7:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','coord1','coord2','alt','significance','coord1Accur','coord2Accur','altAccur','msawtype','msawTimeCat','msawLocCat','msawMinSafeAlt','msawIndex1','msawIndex2','msawVolID'],
-            8:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','acType','Orig','Dest','depTime','depTimeType','arrTime','arrTimeType'],
-            9:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','coord1','coord2','alt','pitchAngle','trueHeading','rollAngle','trueAirSpeed','fltPhaseIndicator'],
-            10:['recType','recTime','fltKey','bcnCode','cid','Source','msgType','AcId','recTypeCat','configType','configSpec']}
+    cols, wanted, scalar_result, reader = _open_iff_chunks(filename, record_types, callsigns, chunksize, encoding, use_index, compact, usecols, time_range, bbox)
 
-    # For newer versions, additional columns are supported.  However,
-    # this code could be commented out, and it should still be
-    # compatible with newer versions, but just ignoring the additional
-    # columns.
-    if version >= parse_version('2.13'):
-        cols[2] += ['modeSCode']
-        cols[3] += ['trackNumber','tptReturnType','modeSCode']
-        cols[4] += ['coordinationPoint','coordinationPointType','trackNumber','modeSCode']
-    if version >= parse_version('2.15'):
-        cols[3] += ['sensorTrackNumberList','spi','dvs','dupM3a','tid']
+    chunks = {} if wanted is None else {r: [] for r in wanted}
+    for record_type, chunk in reader:
+        chunks.setdefault(record_type, []).append(chunk)
 
-    # Determine the record type of each row
-    with open(filename, 'r', encoding=encoding) as f:
-        # An alternative, using less memory, would be to directly
-        # create skiprows indices for a particular record type, using
-        # a comprehension on enumerate(f); however, that would not
-        # allow handling multiple record types.
-        line_record_types = [int(line.split(',')[0]) for line in f]
+    data_frames = dict()
+    for record_type in sorted(chunks) if wanted is None else wanted:
+        if chunks[record_type]:
+            df = _concat_iff_chunks(chunks[record_type])
+        else:
+            df = pd.DataFrame(columns=cols[record_type])
+        data_frames[record_type] = _normalize_iff_frame(df)
 
-    # Determine which record types to retrieve, and whether the result
-    # should be a scalar or dict:
-    if record_types == 'all':
-        record_types = np.unique(line_record_types)
-        scalar_result = False
-    elif hasattr(record_types, '__getitem__'):
-        scalar_result = False
+    if scalar_result:
+        result = data_frames[wanted[0]]
     else:
-        record_types = [record_types]
-        scalar_result = True
+        result = data_frames
 
-    if callsigns is not None:
-        callsigns = list(np.atleast_1d(callsigns))
+    return result
 
+def iter_iff_file(filename, record_types=3, callsigns=None, chunksize=50000, time_window=None, max_delay=None, encoding='latin-1', use_index=False, compact=False, usecols=None, time_range=None, bbox=None):
+    """
+    Iterate over an IFF file in chunks of bounded size
 
-    data_frames = dict()
-    for record_type in record_types:
-        # Construct list of rows to skip:
-        skiprows = [i for i,lr in enumerate(line_record_types) if lr != record_type]
-        
-        # Passing usecols is necessary because for some records, the
-        # actual data has extraneous empty columns at the end, in which
-        # case the data does not seem to get read correctly without
-        # usecols
-        if callsigns is None:
-            df = pd.concat((chunk for chunk in pd.read_csv(filename, header=None, skiprows=skiprows, names=cols[record_type], usecols=cols[record_type], na_values='?', encoding=encoding, chunksize=chunksize, low_memory=False)), ignore_index=True)
-        else:
-            df = pd.concat((chunk[chunk['AcId'].isin(callsigns)] for chunk in pd.read_csv(filename, header=None, skiprows=skiprows, names=cols[record_type], usecols=cols[record_type], na_values='?', encoding=encoding, chunksize=chunksize, low_memory=False)), ignore_index=True)
-
-        # For consistency with other PARA-ATM data:
-        df.rename(columns={'recTime':'time',
-                           'AcId':'callsign',
-                           'coord1':'latitude',
-                           'coord2':'longitude',
-                           'alt':'altitude',
-                           'rateOfClimb':'rocd',
-                           'groundSpeed':'tas',
-                           'course':'heading'},
-                  inplace=True)
-
-        if 'time' in df:
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-        if 'altitude' in df:
-            df['altitude'] *= 100 # Convert 100s ft to ft
-
-        # Store to dict of data frames
-        data_frames[record_type] = df
+    This is the streaming counterpart of :py:func:`read_iff_file`.
+    Instead of concatenating the whole file into one DataFrame, each
+    chunk is normalized in the same way as by :py:func:`read_iff_file`
+    and yielded as soon as it has been parsed, so that files that do
+    not fit in memory can be processed with memory use that does not
+    depend on the size of the file.
 
-    if scalar_result:
-        result = data_frames[record_types[0]]
+    Parameters
+    ----------
+    filename : str
+        File to read
+    record_types : int, sequence of ints, or 'all'
+        Record types to return
+    callsigns : None, string, or list of strings
+        If provided, only return records that match the given
+        callsign(s)
+    chunksize : int
+        Number of rows of each record type that are parsed at a time
+    time_window : None, str, Timedelta, or numeric
+        If None, chunks are yielded in file order.  Otherwise, each
+        chunk holds the records of one time window of this length
+        (numeric values are in seconds), sorted by time, and chunks
+        are yielded in time order.  Windows are aligned to multiples
+        of time_window, so that for example a window equal to the
+        lookahead time of
+        :py:func:`~paraatm.safety.ground_ssd.ground_ssd_safety_analysis`
+        matches its time buckets.  Windows without records are
+        skipped.
+    max_delay : None, str, Timedelta, or numeric
+        Only used with time_window.  IFF files are written
+        approximately in time order; a window is only yielded once a
+        record that is later than the end of the window by max_delay
+        has been read.  Records that arrive after their window has
+        been yielded trigger a warning and are included in the next
+        chunk.  Defaults to time_window.  Memory use grows with
+        max_delay, since records within it are held back.
+    encoding : str
+        Encoding argument passed on to open
+    use_index : bool
+        Whether to use the sidecar byte-offset index (see
+        :py:func:`read_iff_file`)
+    compact : bool
+        Whether to use reduced-size dtypes (see :py:func:`read_iff_file`)
+    usecols : None or list of str
+        Columns to materialize (see :py:func:`read_iff_file`).  With
+        time_window, the time column must be included.
+    time_range, bbox : None or tuple
+        Predicates evaluated while scanning (see :py:func:`read_iff_file`)
+
+    Yields
+    ------
+    DataFrame or (int, DataFrame)
+        If record_types is a scalar, DataFrame chunks.  Otherwise,
+        tuples of record type and DataFrame chunk.
+    """
+    cols, wanted, scalar_result, reader = _open_iff_chunks(filename, record_types, callsigns, chunksize, encoding, use_index, compact, usecols, time_range, bbox)
+
+    def result(record_type, df):
+        return df if scalar_result else (record_type, df)
+
+    if time_window is None:
+        for record_type, chunk in reader:
+            yield result(record_type, _normalize_iff_frame(chunk.reset_index(drop=True)))
+        return
+
+    window = _to_timedelta(time_window)
+    delay = window if max_delay is None else _to_timedelta(max_delay)
+
+    # Per record type: held back chunks, latest time read, and end of
+    # the last window that was yielded
+    pending = dict()
+    latest = dict()
+    emitted_until = dict()
+
+    def flush(record_type, cutoff):
+        """Yield the complete windows of pending records that end before cutoff"""
+        df = _concat_iff_chunks(pending[record_type])
+        if record_type in emitted_until and (df['time'] < emitted_until[record_type]).any():
+            warnings.warn('records of type {} in {} arrived after their time window was yielded; consider increasing max_delay'.format(record_type, filename))
+        ready = df['time'] < cutoff if cutoff is not None else np.ones(len(df), dtype=bool)
+        pending[record_type] = [df[~ready]]
+        df = df[ready].sort_values('time', kind='stable', ignore_index=True)
+        if df.empty:
+            return
+        window_start = df['time'].dt.floor(window)
+        for start, group in df.groupby(window_start, sort=True):
+            yield result(record_type, group.reset_index(drop=True))
+        emitted_until[record_type] = max(emitted_until.get(record_type, start + window), start + window)
+
+    for record_type, chunk in reader:
+        chunk = _normalize_iff_frame(chunk.reset_index(drop=True))
+        if 'time' not in chunk:
+            # Record types without a time stamp are passed through
+            yield result(record_type, chunk)
+            continue
+        if chunk.empty:
+            continue
+        pending.setdefault(record_type, []).append(chunk)
+        latest[record_type] = max(latest.get(record_type, chunk['time'].max()), chunk['time'].max())
+        cutoff = (latest[record_type] - delay).floor(window)
+        last_end = emitted_until.get(record_type, pd.Timestamp.min)
+        # Late records are flushed right away, rather than being held
+        # until the end of the file
+        if cutoff > last_end or chunk['time'].min() < last_end:
+            yield from flush(record_type, max(cutoff, last_end))
+
+    for record_type in pending:
+        yield from flush(record_type, None)
+
+def _to_timedelta(value):
+    """Convert a numeric value in seconds, string, or Timedelta to a Timedelta"""
+    if isinstance(value, (int, float, np.number)):
+        return pd.Timedelta(seconds=value)
+    return pd.Timedelta(value)
+
+def read_iff_files(filenames, record_types=3, callsigns=None, chunksize=50000, encoding='latin-1', use_index=False, compact=False, usecols=None, time_range=None, bbox=None, n_jobs=None):
+    """
+    Read several IFF files, in parallel, and combine the results
+
+    Each file is read with :py:func:`read_iff_file` in a separate
+    worker process.  When the optional `pyarrow` package is
+    available, the workers send their results back as Arrow IPC
+    buffers, which are transferred as a single block of bytes instead
+    of pickling the DataFrames object by object.
+
+    Parameters
+    ----------
+    filenames : sequence of str
+        Files to read, for example one file per airport per day
+    record_types : int, sequence of ints, or 'all'
+        Record types to return
+    callsigns : None, string, or list of strings
+        If provided, only return records that match the given
+        callsign(s)
+    chunksize : int
+        Passed on to :py:func:`read_iff_file`
+    encoding : str
+        Passed on to :py:func:`read_iff_file`
+    use_index : bool
+        Passed on to :py:func:`read_iff_file`
+    compact : bool
+        Passed on to :py:func:`read_iff_file`
+    usecols : None or list of str
+        Passed on to :py:func:`read_iff_file`
+    time_range, bbox : None or tuple
+        Passed on to :py:func:`read_iff_file`
+    n_jobs : int, optional
+        Number of worker processes.  If None or 1, the files are read
+        one after another in the current process.  If -1, use one
+        process per CPU.
+
+    Returns
+    -------
+    DataFrame or dict of DataFrames
+       As for :py:func:`read_iff_file`, with the records of all files
+       concatenated in the order of filenames and an additional
+       'source_file' column naming the file that each record came
+       from.
+    """
+    filenames = list(filenames)
+    kwargs = dict(record_types=record_types, callsigns=callsigns, chunksize=chunksize, encoding=encoding, use_index=use_index, compact=compact, usecols=usecols, time_range=time_range, bbox=bbox)
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    if n_jobs is None or n_jobs == 1 or len(filenames) < 2:
+        results = [read_iff_file(filename, **kwargs) for filename in filenames]
     else:
-        result = data_frames
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(filenames))) as executor:
+            results = [_frames_from_arrow(result) for result in
+                       executor.map(_read_iff_file_to_arrow, filenames, [kwargs] * len(filenames))]
+
+    scalar_result = not (record_types == 'all' or hasattr(record_types, '__getitem__'))
+    if scalar_result:
+        results = [{None: df} for df in results]
+
+    combined = dict()
+    for filename, result in zip(filenames, results):
+        for record_type, df in result.items():
+            df['source_file'] = filename
+            combined.setdefault(record_type, []).append(df)
+    combined = {record_type: _concat_iff_chunks(frames) for record_type, frames in combined.items()}
 
+    if scalar_result:
+        return combined.get(None, pd.DataFrame())
+    return dict(sorted(combined.items()))
+
+def _read_iff_file_to_arrow(filename, kwargs):
+    """Worker for :py:func:`read_iff_files`
+
+    Returns the result of :py:func:`read_iff_file`, with each
+    DataFrame converted to an Arrow IPC buffer where possible.
+    """
+    result = read_iff_file(filename, **kwargs)
+    if isinstance(result, dict):
+        return {record_type: _frame_to_arrow(df) for record_type, df in result.items()}
+    return _frame_to_arrow(result)
+
+def _frame_to_arrow(df):
+    """Serialize df as Arrow IPC stream bytes, or return it unchanged
+
+    The DataFrame is returned as-is if pyarrow is not installed or
+    cannot represent it (e.g., object columns with mixed types), in
+    which case it is pickled as usual.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return df
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowException, TypeError, ValueError):
+        return df
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _frames_from_arrow(result):
+    """Inverse of the conversion done by :py:func:`_read_iff_file_to_arrow`"""
+    if isinstance(result, dict):
+        return {record_type: _frames_from_arrow(df) for record_type, df in result.items()}
+    if isinstance(result, bytes):
+        import pyarrow as pa
+        return pa.ipc.open_stream(result).read_all().to_pandas()
     return result
 
-def read_iff_file_as_gpd(filename, record_types=3, callsigns=None, chunksize=50000, encoding='latin-1'):
+# Record types that carry positions and are converted to geometry by
+# read_iff_file_as_gpd
+GEOMETRY_RECORD_TYPES = (3, 7, 9)
+
+def _track_points(df):
+    """Return the 3d points of a frame with latitude, longitude, and altitude columns"""
+    return gpd.points_from_xy(df['longitude'].to_numpy(), df['latitude'].to_numpy(), df['altitude'].to_numpy(), crs='EPSG:4326')
+
+def _to_geodataframe(df):
+    """Replace the latitude, longitude, and altitude columns of df with point geometry"""
+    geom = _track_points(df)
+    return gpd.GeoDataFrame(df.drop(columns=['latitude','longitude','altitude']), geometry=geom)
+
+class TrackPointFrame(pd.DataFrame):
+    """DataFrame of positions whose point geometry is built on demand
+
+    Returned by :py:func:`read_iff_file_as_gpd` with
+    ``lazy_geometry=True``.  The latitude, longitude, and altitude
+    columns are kept as plain float arrays, and the corresponding
+    shapely points are only created when :py:attr:`geometry` or
+    :py:meth:`to_geodataframe` is first used.  Frames derived from a
+    TrackPointFrame (e.g., by selecting rows) are plain DataFrames.
+    """
+    # Cached GeoSeries, stored outside of the pandas attribute handling
+    _geometry_cache = None
+
+    @property
+    def geometry(self):
+        """GeoSeries of 3d points in EPSG:4326, built on first access
+
+        The result is cached, so it does not reflect later in-place
+        changes of the position columns.
+        """
+        if self._geometry_cache is None or not self._geometry_cache.index.equals(self.index):
+            object.__setattr__(self, '_geometry_cache', gpd.GeoSeries(_track_points(self), index=self.index))
+        return self._geometry_cache
+
+    def to_geodataframe(self):
+        """Return a GeoDataFrame, as read_iff_file_as_gpd does without lazy_geometry"""
+        return gpd.GeoDataFrame(pd.DataFrame(self).drop(columns=['latitude','longitude','altitude']), geometry=self.geometry)
+
+def read_iff_file_as_gpd(filename, record_types=3, callsigns=None, chunksize=50000, encoding='latin-1', lazy_geometry=False, **kwargs):
     """
     Read IFF file and return data frames for requested record types
     
@@ -184,6 +896,15 @@ def read_iff_file_as_gpd(filename, record_types=3, callsigns=None, chunksize=500
         'latin-1' instead of the default will suppress errors that
         might otherwise occur with minor data corruption.  See
         http://python-notes.curiousefficiency.org/en/latest/python3/text_file_processing.html
+    lazy_geometry : bool
+        If True, do not create any geometry objects while reading.
+        Record types 3, 7, and 9 are instead returned as
+        :py:class:`TrackPointFrame` objects, which keep the latitude,
+        longitude, and altitude columns and build the GeoSeries only
+        when their geometry is first accessed.
+    **kwargs
+        Additional keyword arguments passed on to
+        :py:func:`read_iff_file`, such as use_index or compact
     
     Returns
     -------
@@ -191,34 +912,287 @@ def read_iff_file_as_gpd(filename, record_types=3, callsigns=None, chunksize=500
        If record_types is a scalar and either 3,7 or 9, return a GeoDataFrame
        containing the data for that record type only.  Otherwise, return a dictionary
        mapping each requested record type to a corresponding DataFrame or GeoDataFrame.
+       With lazy_geometry, TrackPointFrame objects take the place of
+       the GeoDataFrames.
     """
 
     #Run read_iff_file to convert to pandas DataFrame
-    result = read_iff_file(filename,record_types=record_types,callsigns=callsigns,chunksize=chunksize,encoding=encoding)
+    result = read_iff_file(filename,record_types=record_types,callsigns=callsigns,chunksize=chunksize,encoding=encoding,**kwargs)
+
+    # The points are created from the coordinate arrays in a single
+    # vectorized step
+    convert = TrackPointFrame if lazy_geometry else _to_geodataframe
 
-    rec_types_to_convert = [3,7,9]
-    
     if not hasattr(record_types, '__getitem__'):
-        if record_types in rec_types_to_convert:
-            geom = [Point(x,y,z) for x,y,z in zip(result.longitude.values,result.latitude.values,result.altitude.values)]
-            result.drop(['latitude','longitude','altitude'], axis=1,inplace=True)
-            gdf = gpd.GeoDataFrame(result, geometry=geom)
-            gdf.set_crs(epsg=4326,inplace=True)
-            result = gdf
-    
-    if hasattr(record_types, '__getitem__'):
+        if record_types in GEOMETRY_RECORD_TYPES:
+            result = convert(result)
+    else:
         for key in result.keys():
-            if key in rec_types_to_convert:
-                df = result[key]
-                geom = [Point(x,y,z) for x,y,z in zip(df.longitude.values,df.latitude.values,df.altitude.values)]
-                df.drop(['latitude','longitude','altitude'], axis=1,inplace=True)
-                gdf = gpd.GeoDataFrame(df, geometry=geom)
-                gdf.set_crs(epsg=4326,inplace=True)
-                result[key] = gdf
+            if key in GEOMETRY_RECORD_TYPES:
+                result[key] = convert(result[key])
 
     return result
 
+# Columns of the track point tables used by IFFSpark and IFFQueryEngine,
+# mapped from the IFF column names
+_QUERY_COLUMNS = {'recType':'recType',
+                  'recTime':'recTime',
+                  'AcId':'callsign',
+                  'coord1':'latitude',
+                  'coord2':'longitude',
+                  'alt':'altitude',
+                  'course':'heading'}
+
+class TrackPointIndex:
+    """Time and spatial index over the rows of a track point table
+
+    The time index is the permutation that sorts the rows by time, so
+    that time windows are found by binary search.  The spatial index
+    is a uniform grid over latitude and longitude: rows are sorted by
+    the key of their grid cell, so that the rows of each run of cells
+    along a latitude band form a contiguous slice.  Candidates from
+    the grid are filtered exactly on their coordinates.
+
+    Query methods return sorted integer row positions into the
+    indexed frame.
+    """
+
+    def __init__(self, times, latitude, longitude, cell_size=0.01):
+        """
+        Parameters
+        ----------
+        times : array-like of float
+            Record times
+        latitude, longitude : array-like of float
+            Positions in degrees.  Rows with missing positions are
+            never returned by :py:meth:`bbox`.
+        cell_size : float
+            Edge length of the grid cells, in degrees
+        """
+        self.times = np.asarray(times, dtype=float)
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.longitude = np.asarray(longitude, dtype=float)
+        self.cell_size = cell_size
+
+        self._time_order = np.argsort(self.times, kind='stable')
+        self._sorted_times = self.times[self._time_order]
+
+        valid = np.isfinite(self.latitude) & np.isfinite(self.longitude)
+        if valid.any():
+            self._lat0 = self.latitude[valid].min()
+            self._lon0 = self.longitude[valid].min()
+            # Computed as in _cell, since floor division can differ
+            # from flooring the quotient
+            self._ncols = int(np.floor((self.longitude[valid].max() - self._lon0) / cell_size)) + 1
+        else:
+            self._lat0 = self._lon0 = 0.0
+            self._ncols = 1
+        keys = np.full(len(self.latitude), -1, dtype=np.int64)
+        keys[valid] = self._cell_key(self.latitude[valid], self.longitude[valid])
+        self._cell_order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._cell_order]
+
+    def _cell(self, lat, lon):
+        row = np.floor((np.asarray(lat) - self._lat0) / self.cell_size).astype(np.int64)
+        col = np.floor((np.asarray(lon) - self._lon0) / self.cell_size).astype(np.int64)
+        return row, col
+
+    def _cell_key(self, lat, lon):
+        row, col = self._cell(lat, lon)
+        return row * self._ncols + col
+
+    def time_range(self, start=None, end=None):
+        """Return the positions of rows with start <= time <= end
+
+        Either bound may be None.
+        """
+        lo = 0 if start is None else np.searchsorted(self._sorted_times, start, side='left')
+        hi = len(self._sorted_times) if end is None else np.searchsorted(self._sorted_times, end, side='right')
+        return np.sort(self._time_order[lo:hi])
+
+    def bbox(self, lat_min, lon_min, lat_max, lon_max, inclusive=True):
+        """Return the positions of rows inside a latitude/longitude box
+
+        Parameters
+        ----------
+        lat_min, lon_min, lat_max, lon_max : float
+            Box bounds in degrees
+        inclusive : bool
+            Whether points on the boundary of the box are inside
+        """
+        row_min, col_min = self._cell(lat_min, lon_min)
+        row_max, col_max = self._cell(lat_max, lon_max)
+        # Clip to the grid, so that large boxes do not loop over
+        # empty rows or wrap into neighboring rows
+        row_min = max(int(row_min), 0)
+        col_min = max(int(col_min), 0)
+        col_max = min(int(col_max), self._ncols - 1)
+        if self._sorted_keys.size:
+            row_max = min(int(row_max), int(self._sorted_keys[-1] // self._ncols))
+        if col_min > col_max or row_min > row_max:
+            return np.empty(0, dtype=np.int64)
+
+        rows = np.arange(row_min, row_max + 1)
+        starts = np.searchsorted(self._sorted_keys, rows * self._ncols + col_min, side='left')
+        ends = np.searchsorted(self._sorted_keys, rows * self._ncols + col_max, side='right')
+        candidates = np.concatenate([self._cell_order[a:b] for a, b in zip(starts, ends)])
+
+        lat = self.latitude[candidates]
+        lon = self.longitude[candidates]
+        if inclusive:
+            inside = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+        else:
+            inside = (lat > lat_min) & (lat < lat_max) & (lon > lon_min) & (lon < lon_max)
+        return np.sort(candidates[inside])
+
+class IFFQueryEngine:
+    """In-process replacement for :py:class:`IFFSpark`
+
+    Provides the same methods as IFFSpark, operating on named
+    in-memory tables instead of Spark SQL tables, so that time window
+    and fix/radius queries run offline and without starting a JVM.
+    Each table is indexed by a :py:class:`TrackPointIndex` on first
+    use.
+
+    As with IFFSpark, tables hold track points (record type 3) with
+    recTime in seconds since the epoch and altitude in 100s of feet,
+    and the 'geom' geometry column holds points with the latitude as x
+    and the longitude as y.
+    """
+
+    def __init__(self, cell_size=0.01):
+        """
+        Parameters
+        ----------
+        cell_size : float
+            Grid cell size, in degrees, of the spatial indexes
+        """
+        self.cell_size = cell_size
+        self.tables = {}
+        self._indexes = {}
+
+    def _register(self, name, df):
+        if name is not None:
+            self.tables[name] = df
+            self._indexes.pop(name, None)
+
+    def _index(self, tablename):
+        index = self._indexes.get(tablename)
+        if index is None:
+            df = self.tables[tablename]
+            index = self._indexes[tablename] = TrackPointIndex(df['recTime'], df['latitude'], df['longitude'], cell_size=self.cell_size)
+        return index
+
+    def _geodataframe(self, df):
+        if 'geom' not in df:
+            df = df.assign(geom=gpd.points_from_xy(df['latitude'].to_numpy(), df['longitude'].to_numpy()))
+        return gpd.GeoDataFrame(df, geometry='geom', crs='EPSG:4326')
+
+    def register_iff_file_as_sql_table(self, filename, record_types=3, callsigns=None, chunksize=50000, encoding='latin-1', query_name=None):
+        """Read the track points of an IFF file into a table
+
+        Parameters
+        ----------
+        filename : str
+            IFF file to read
+        record_types : int
+            Only track points (record type 3) are supported
+        callsigns : None, string, or list of strings
+            If provided, only read records for the given callsign(s)
+        chunksize, encoding
+            Passed on to :py:func:`read_iff_file`
+        query_name : str, optional
+            Name under which the table is registered
+
+        Returns
+        -------
+        DataFrame
+        """
+        if record_types != 3:
+            raise ValueError('only track points (record type 3) are supported')
+        cols, _, _, reader = _open_iff_chunks(filename, 3, callsigns, chunksize, encoding, False, usecols=list(_QUERY_COLUMNS))
+        chunks = [chunk for _, chunk in reader]
+        if chunks:
+            df = _concat_iff_chunks(chunks)
+        else:
+            df = pd.DataFrame(columns=cols[3])
+        df = df.rename(columns=_QUERY_COLUMNS)[list(_QUERY_COLUMNS.values())]
+        df['recTime'] = df['recTime'].astype('int64')
+        self._register(query_name, df)
+        return df
+
+    def convert_position_to_geometry(self, tablename, register_name=None):
+        """Add the 'geom' point column to a table
+
+        Returns
+        -------
+        GeoDataFrame
+        """
+        gdf = self._geodataframe(self.tables[tablename])
+        self._register(register_name, gdf)
+        return gdf
+
+    def query_time(self, tablename, t_start, t_end, register_name=None):
+        """Return the records with t_start <= recTime <= t_end
+
+        Parameters
+        ----------
+        tablename : str
+            Table to query
+        t_start, t_end : numeric, str, or Timestamp
+            Time bounds, in seconds since the epoch or as accepted by
+            pd.Timestamp
+        register_name : str, optional
+            Name under which the result is registered as a table
+
+        Returns
+        -------
+        GeoDataFrame
+        """
+        rows = self._index(tablename).time_range(_to_epoch_seconds(t_start), _to_epoch_seconds(t_end))
+        gdf = self._geodataframe(self.tables[tablename].iloc[rows].reset_index(drop=True))
+        self._register(register_name, gdf)
+        return gdf
+
+    def query_fix_and_radius(self, tablename, fix_x_y_z, radius, vertical_thresh, register_name=None):
+        """Return the records near a fix and above an altitude
+
+        As with IFFSpark, the records returned are those strictly
+        inside the square of half-width radius (in degrees) around the
+        fix, and with altitude above fix_x_y_z[2] + vertical_thresh.
+
+        Parameters
+        ----------
+        tablename : str
+            Table to query
+        fix_x_y_z : sequence of float
+            Latitude, longitude, and altitude of the fix
+        radius : float
+            Half-width of the square, in degrees
+        vertical_thresh : float
+            Altitude offset above the fix
+        register_name : str, optional
+            Name under which the result is registered as a table
+
+        Returns
+        -------
+        GeoDataFrame
+        """
+        lat, lon, alt = fix_x_y_z[:3]
+        rows = self._index(tablename).bbox(lat - radius, lon - radius, lat + radius, lon + radius, inclusive=False)
+        df = self.tables[tablename].iloc[rows]
+        df = df[df['altitude'].to_numpy() > alt + vertical_thresh].reset_index(drop=True)
+        gdf = self._geodataframe(df)
+        self._register(register_name, gdf)
+        return gdf
+
 class IFFSpark:
+    """Spark SQL and Sedona based queries of IFF track points
+
+    Requires the optional pyspark and apache-sedona packages, and
+    downloads the Sedona jars when the Spark session is created.
+    :py:class:`IFFQueryEngine` provides the same methods in-process.
+    """
     def __init__(self):
         from pyspark.sql import SparkSession
         from sedona.register import SedonaRegistrator
@@ -6,11 +6,10 @@ from io import StringIO
 import os
 import jpype
 import jpype.imports
-import tempfile
 import atexit
 import platform
 
-from .gnats import read_gnats_output_file
+from .gnats import read_gnats_output_file, _scratch_output, _wait_for_status
 
 
 # Note: NatsEnvironment is implemented as a class wtih static methods.
@@ -40,6 +39,8 @@ class NatsEnvironment:
     # been started and stopped
     jvm_started = False
     jvm_stopped = False
+    # Total seconds spent in wait_for_status
+    wait_time = 0.
 
     @classmethod
     def start_jvm(cls, nats_home=None):
@@ -175,6 +176,35 @@ class NatsEnvironment:
             raise RuntimeError("JVM already stopped")        
         return getattr(jpype.JPackage('com').osi.util.Constants, name)
 
+    @classmethod
+    def wait_for_status(cls, status, timeout=None):
+        """Wait until the simulation reaches a runtime status
+
+        The status is polled at intervals that start below a
+        millisecond and grow up to 50 ms, so that pausing after a
+        short simulation step costs little more than the step itself.
+
+        Parameters
+        ----------
+        status : str or int
+            Status to wait for, as the name of a NATS constant such as
+            'GNATS_SIMULATION_STATUS_PAUSE', or its value
+        timeout : numeric, optional
+            Seconds after which to raise TimeoutError
+
+        Returns
+        -------
+        float
+            Seconds waited, which are also added to the class
+            attribute wait_time
+        """
+        if isinstance(status, str):
+            status = cls.get_nats_constant(status)
+        waited = _wait_for_status(cls.get_nats_standalone().getSimulationInterface().get_runtime_sim_status,
+                                  status, timeout)
+        cls.wait_time += waited
+        return waited
+
     @classmethod
     def build_path(cls, filename):
         """Return a path to filename that behaves as if original directory is current working directory
@@ -253,7 +283,9 @@ class NatsSimulationWrapper:
         Parameters
         ----------
         output_file : str
-            Output file to write to.  If not provided, a temporary file is used
+            Output file to write to.  If not provided, a temporary
+            file is used, in memory if possible (see
+            :py:func:`paraatm.io.gnats.scratch_tempdir`)
         return_df : bool
             Whether to read the output into a DataFrame and return it
         **kwargs
@@ -277,25 +309,14 @@ class NatsSimulationWrapper:
         results['sim_results'] = self.simulation(**kwargs)
 
         if output_file is None:
-            # Create a temporary directory to store the output, so it
-            # can be read back
-            tempdir = tempfile.mkdtemp()
-            output_file = os.path.join(tempdir, 'nats.csv')
+            # Write the output to a temporary file, so it can be read
+            # back
+            df = _scratch_output(lambda filename: self.write_output(NatsEnvironment.build_path(filename)),
+                                 read_nats_output_file if return_df else None, 'nats.csv')
         else:
-            tempdir = None
-
-        try:
             self.write_output(NatsEnvironment.build_path(output_file))
             if return_df:
                 df = read_nats_output_file(NatsEnvironment.build_path(output_file))
-        finally:
-            # This ensures we clean up the temporary directory and
-            # file even if an exception occurs above.  If there is an
-            # exception, it is automatically re-raised after finally.
-            if tempdir:
-                if os.path.isfile(output_file):
-                    os.remove(output_file)
-                os.rmdir(tempdir)
 
         if hasattr(self, 'cleanup'):
             self.cleanup()
@@ -0,0 +1,114 @@
+"""Resampling of trajectory data onto a common time grid
+
+Surveillance reports and simulation outputs arrive at irregular and
+aircraft-specific times.  :py:func:`resample_trajectories` interpolates
+the trajectory of every callsign onto the same regular time grid, so
+that each grid time holds exactly one state per aircraft in the air.
+This is the input expected by time-bucketed analyses such as the SSD
+safety metrics, and is also convenient for plotting and animation.
+"""
+
+import numpy as np
+import pandas as pd
+
+#columns holding angles in degrees, interpolated along the shorter arc
+ANGLE_COLUMNS = ('heading',)
+
+
+def resample_trajectories(df, interval, max_gap=None, angle_columns=ANGLE_COLUMNS):
+    """Interpolate each callsign onto a common time grid
+
+    Grid times are multiples of interval, counted from midnight of the
+    day of the first record, as for the bins of
+    ``pd.Grouper(key='time', freq=interval)``.  Each callsign gets the
+    grid times between its first and last records; there is no
+    extrapolation.  Numeric columns are interpolated linearly between
+    the surrounding records, columns in angle_columns along the
+    shorter arc, and all other columns (such as 'status') hold the
+    value of the preceding record.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Trajectory data with 'time' and 'callsign' columns.  Of
+        several records with the same callsign and time, the last one
+        is used.
+    interval : str, Timedelta, or numeric
+        Grid spacing, as a pandas offset string or Timedelta, or in
+        seconds
+    max_gap : str, Timedelta, or numeric, optional
+        Longest time between two records that is interpolated.  Grid
+        times in longer gaps are left out, so that the aircraft is
+        absent there rather than given a made-up state.  By default
+        all gaps are interpolated.
+    angle_columns : sequence of str
+        Columns holding angles in degrees.  The interpolated angles are
+        in [0, 360).
+
+    Returns
+    -------
+    DataFrame
+        Resampled data with the columns of df, sorted by time and
+        callsign
+    """
+    interval = _to_ns(interval)
+    if interval <= 0:
+        raise ValueError('interval must be positive')
+
+    records = df.sort_values('time', kind='stable').drop_duplicates(['callsign', 'time'], keep='last')
+    records = records.reset_index(drop=True)
+    if records.empty:
+        return records
+
+    ns = records['time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    origin = ns[0] - ns[0] % (86400 * 10**9)
+
+    # Grid times between the first and last record of each callsign.
+    # The grid is built for all callsigns at once, by repeating each
+    # callsign's first grid index and adding a running count.
+    span = pd.DataFrame({'callsign': records['callsign'], 'ns': ns}).groupby('callsign', sort=False)['ns'].agg(['min', 'max'])
+    first = -((origin - span['min'].to_numpy()) // interval)
+    last = (span['max'].to_numpy() - origin) // interval
+    counts = np.maximum(last - first + 1, 0)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    grid_ns = origin + (np.repeat(first, counts) + offsets) * interval
+    grid = pd.DataFrame({'callsign': np.repeat(span.index.to_numpy(), counts),
+                         'time': grid_ns.astype('datetime64[ns]')})
+    grid['time'] = grid['time'].astype(records['time'].dtype)
+    grid = grid.sort_values('time', kind='stable', ignore_index=True)
+    grid['callsign'] = grid['callsign'].astype(records['callsign'].dtype)
+    grid_ns = grid['time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+    # Records before and after each grid time
+    records['_ns'] = ns
+    before = pd.merge_asof(grid, records, on='time', by='callsign', direction='backward')
+    after = pd.merge_asof(grid[['time', 'callsign']], records, on='time', by='callsign', direction='forward')
+
+    t0 = before['_ns'].to_numpy()
+    t1 = after['_ns'].to_numpy()
+    dt = t1 - t0
+    weight = np.divide(grid_ns - t0, dt, out=np.zeros(len(grid)), where=dt > 0)
+
+    result = before
+    for col in df.columns:
+        if col in ('time', 'callsign') or not pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            continue
+        v0 = before[col].to_numpy(dtype=float)
+        v1 = after[col].to_numpy(dtype=float)
+        if col in angle_columns:
+            result[col] = (v0 + weight * ((v1 - v0 + 180) % 360 - 180)) % 360
+        else:
+            result[col] = v0 + weight * (v1 - v0)
+
+    if max_gap is not None:
+        result = result[dt <= _to_ns(max_gap)]
+
+    result = result.sort_values(['time', 'callsign'], kind='stable', ignore_index=True)
+    return result[list(df.columns)]
+
+
+def _to_ns(value):
+    """Convert an offset string, Timedelta, or seconds to integer nanoseconds"""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(round(value * 1e9))
+    return pd.Timedelta(value).value
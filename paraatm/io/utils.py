@@ -5,6 +5,7 @@ import pandas as pd
 
 from . import gnats
 from . import iff
+from .cache import DataCache, cached_read
 
 class FileTypes(Enum):
     """Enumeration of file types"""
@@ -47,7 +48,7 @@ def write_csv_file(df, filename):
     """
     df.to_csv(filename, index=False)
 
-def read_data_file(filename, *args, **kwargs):
+def read_data_file(filename, *args, cache=False, **kwargs):
     """Detect file format and read scenario data
 
     Supports GNATS and IFF format
@@ -55,14 +56,28 @@ def read_data_file(filename, *args, **kwargs):
     Parameters
     ----------
     filename : str
+    cache : bool or DataCache
+        If True, use the default :py:class:`~paraatm.io.cache.DataCache`
+        to store the parsed result in columnar form, so that a later
+        call with the same file (unchanged) and arguments does not
+        need to reparse the file.  A DataCache instance may be given
+        to use a particular cache directory or size limit.
     """
     filetype = detect_data_file_type(filename)
 
     if filetype == FileTypes.GNATS:
-        return gnats.read_gnats_output_file(filename, *args, **kwargs)
+        reader = gnats.read_gnats_output_file
     elif filetype == FileTypes.IFF:
-        return iff.read_iff_file(filename, *args, **kwargs)
+        reader = iff.read_iff_file
     elif filetype == FileTypes.CSV:
-        return read_csv_file(filename)
+        reader = read_csv_file
+        # read_csv_file does not take any additional arguments
+        args, kwargs = (), {}
     else:
         raise ValueError('unrecognized file type')
+
+    if cache is True:
+        cache = DataCache()
+    if cache:
+        return cached_read(cache, reader, filename, *args, **kwargs)
+    return reader(filename, *args, **kwargs)
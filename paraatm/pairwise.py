@@ -0,0 +1,213 @@
+"""Pairwise geometry between aircraft
+
+Bearings and distances between pairs of aircraft are needed by the SSD
+safety metrics (:py:mod:`paraatm.safety.ground_ssd`,
+:py:mod:`paraatm.safety.enroute_ssd`) and by the BSTAR neighbor search
+(:py:mod:`paraatm.bstar`).  :py:class:`PairwiseGeometry` computes them
+for a set of index pairs, by default the upper triangle of all pairs,
+into output buffers that are allocated once and reused from call to
+call, using in-place NumPy ufuncs so that no temporaries are created.
+"""
+
+import numpy as np
+
+#mean radius of the earth in meters, as used by the SSD metrics
+EARTH_RADIUS = 6371000.
+
+
+def triu_pair_indices(n):
+    """Indices of all pairs of n objects
+
+    Returns
+    -------
+    ind1, ind2 : ndarray of int
+        Pairs with ind1 < ind2, ordered by ind1 and then ind2
+    """
+    return np.triu_indices(n, k=1)
+
+
+class PairwiseGeometry:
+    """Bearings and distances for pairs of positions, computed into reusable buffers
+
+    The arrays returned by the methods are views of internal buffers,
+    which are overwritten by the next call, so they must be used or
+    copied before calling again.  The buffers grow as needed and are
+    kept for later calls, so that an instance used for many time steps
+    allocates memory only a few times.  Instances are not thread-safe.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self._indices = {}
+
+    def _buffer(self, name, n):
+        """Return a float buffer of length n, reallocating with some headroom if needed"""
+        buf = self._buffers.get(name)
+        if buf is None or len(buf) < n:
+            size = n if buf is None else max(n, int(1.5 * len(buf)))
+            buf = self._buffers[name] = np.empty(size)
+        return buf[:n]
+
+    def pair_indices(self, n):
+        """Cached :py:func:`triu_pair_indices` of n"""
+        indices = self._indices.get(n)
+        if indices is None:
+            if len(self._indices) >= 64:
+                self._indices.clear()
+            indices = self._indices[n] = triu_pair_indices(n)
+        return indices
+
+    def _gather(self, lat, lon, ind1, ind2):
+        """Copy the positions of both sides of the pairs into buffers"""
+        n = len(ind1)
+        lat1, lon1 = self._buffer('lat1', n), self._buffer('lon1', n)
+        lat2, lon2 = self._buffer('lat2', n), self._buffer('lon2', n)
+        np.take(lat, ind1, out=lat1)
+        np.take(lon, ind1, out=lon1)
+        np.take(lat, ind2, out=lat2)
+        np.take(lon, ind2, out=lon2)
+        return lat1, lon1, lat2, lon2
+
+    def bearing_distance(self, lat, lon, ind1=None, ind2=None):
+        """Bearing and distance from ind1 to ind2, in the flat-earth approximation
+
+        This is the simplified calculation of
+        :py:func:`paraatm.safety.ground_ssd._qdrdist_matrix`, with
+        identical results.
+
+        Parameters
+        ----------
+        lat, lon : ndarray
+            Positions in degrees
+        ind1, ind2 : ndarray of int, optional
+            Pairs of positions.  Defaults to all pairs.
+
+        Returns
+        -------
+        qdr : ndarray
+            Bearing in degrees in [0, 360)
+        dist : ndarray
+            Distance in meters
+        """
+        if ind1 is None:
+            ind1, ind2 = self.pair_indices(len(lat))
+        lat1, lon1, lat2, lon2 = self._gather(lat, lon, ind1, ind2)
+        n = len(ind1)
+        qdr, dist = self._buffer('qdr', n), self._buffer('dist', n)
+
+        # Cosine of the average latitude
+        cavelat = np.add(lat1, lat2, out=self._buffer('tmp', n))
+        np.radians(cavelat, out=cavelat)
+        np.multiply(cavelat, 0.5, out=cavelat)
+        np.cos(cavelat, out=cavelat)
+        # Differences in radians, in place of the second positions
+        dlat = np.radians(np.subtract(lat2, lat1, out=lat2), out=lat2)
+        dlon = np.radians(np.subtract(lon2, lon1, out=lon2), out=lon2)
+
+        np.multiply(dlon, cavelat, out=qdr)
+        np.arctan2(qdr, dlat, out=qdr)
+        np.degrees(qdr, out=qdr)
+        np.remainder(qdr, 360., out=qdr)
+
+        np.multiply(dlon, dlon, out=dlon)
+        np.multiply(cavelat, cavelat, out=cavelat)
+        np.multiply(dlon, cavelat, out=dlon)
+        np.multiply(dlat, dlat, out=dlat)
+        np.add(dlat, dlon, out=dlat)
+        np.sqrt(dlat, out=dist)
+        np.multiply(dist, EARTH_RADIUS, out=dist)
+        return qdr, dist
+
+    def haversine(self, lat, lon, ind1=None, ind2=None, radius=EARTH_RADIUS):
+        """Great-circle distance between ind1 and ind2
+
+        Parameters
+        ----------
+        lat, lon : ndarray
+            Positions in degrees
+        ind1, ind2 : ndarray of int, optional
+            Pairs of positions.  Defaults to all pairs.
+        radius : numeric
+            Radius of the earth, in the unit of the result
+
+        Returns
+        -------
+        ndarray
+            Distances
+        """
+        if ind1 is None:
+            ind1, ind2 = self.pair_indices(len(lat))
+        # Conversions and cosines are done per position rather than
+        # per pair
+        lat = np.radians(lat)
+        lon = np.radians(lon)
+        coslat = np.cos(lat)
+        n = len(ind1)
+        a, b = self._buffer('lat1', n), self._buffer('lat2', n)
+        dist = self._buffer('dist', n)
+
+        # sin(dlat/2)**2
+        np.take(lat, ind2, out=a)
+        np.subtract(a, np.take(lat, ind1, out=b), out=a)
+        np.multiply(a, 0.5, out=a)
+        np.sin(a, out=a)
+        np.multiply(a, a, out=dist)
+        # sin(dlon/2)**2 * cos(lat1) * cos(lat2)
+        np.take(lon, ind2, out=a)
+        np.subtract(a, np.take(lon, ind1, out=b), out=a)
+        np.multiply(a, 0.5, out=a)
+        np.sin(a, out=a)
+        np.multiply(a, a, out=a)
+        np.multiply(a, np.take(coslat, ind1, out=b), out=a)
+        np.multiply(a, np.take(coslat, ind2, out=b), out=a)
+
+        np.add(dist, a, out=dist)
+        np.sqrt(dist, out=dist)
+        np.arcsin(dist, out=dist)
+        np.multiply(dist, 2 * radius, out=dist)
+        return dist
+
+
+def neighbor_lists(lat, lon, exists, threshold, radius=EARTH_RADIUS, geometry=None):
+    """Neighbors of each object in each frame, within a distance threshold
+
+    Parameters
+    ----------
+    lat, lon : ndarray
+        Positions in degrees, of shape [frames x objects]
+    exists : ndarray of bool
+        Whether each object has a position in each frame
+    threshold : numeric
+        Largest distance of a neighbor, in the unit of radius
+    radius : numeric
+        Radius of the earth
+    geometry : PairwiseGeometry, optional
+        Instance whose buffers to use
+
+    Returns
+    -------
+    nei_list : ndarray
+        Of shape [frames x objects x objects], where nei_list[f,i,j] is
+        1 if j exists and is a neighbor of i in frame f.  An object is
+        not its own neighbor.  Distances are only checked where both i
+        and j exist, so an object without a position has all existing
+        objects as neighbors.
+    nei_num : ndarray
+        Number of neighbors, nei_list summed over the last axis
+    """
+    if geometry is None:
+        geometry = PairwiseGeometry()
+    nframes, n = exists.shape
+    nei_list = np.repeat(exists[:, np.newaxis, :].astype(float), n, axis=1)
+    nei_list[:, np.arange(n), np.arange(n)] = 0
+    for f in range(nframes):
+        present = np.flatnonzero(exists[f])
+        if len(present) < 2:
+            continue
+        ind1, ind2 = geometry.pair_indices(len(present))
+        dist = geometry.haversine(lat[f, present], lon[f, present], ind1, ind2, radius)
+        far = dist > threshold
+        i, j = present[ind1[far]], present[ind2[far]]
+        nei_list[f, i, j] = 0
+        nei_list[f, j, i] = 0
+    return nei_list, nei_list.sum(axis=2)
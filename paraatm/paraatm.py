@@ -9,6 +9,7 @@ import sys
 import importlib
 
 from paraatm.io.utils import read_data_file
+from paraatm.io.cache import DataCache
 from paraatm.plotting import plot_trajectory
 from paraatm.io.nats import NatsSimulationWrapper
 from paraatm.io.gnats import GnatsSimulationWrapper
@@ -37,6 +38,10 @@ def main():
     p_gnats.add_argument('--output', help='file to store gnats results')
     p_gnats.add_argument('--plot', action='store_true', help='plot results')
 
+    p_cache = subparsers.add_parser('cache', help='inspect or clear the cache of parsed data files')
+    p_cache.add_argument('action', choices=['info', 'clear'], help='show cache entries, or remove them all')
+    p_cache.add_argument('--dir', help='cache directory (default: PARAATM_CACHE_DIR or ~/.cache/para-atm)')
+
 
     args = parser.parse_args()
 
@@ -46,6 +51,17 @@ def main():
     if args.command == 'plot':
         df = read_data_file(args.file)
         plot_trajectory(df, output_file=args.output, tooltips=args.tooltips)
+
+    elif args.command == 'cache':
+        cache = DataCache(args.dir)
+        if args.action == 'info':
+            entries = cache.entries()
+            print('Cache directory: {}'.format(cache.directory))
+            print('{} entries, {:.1f} MB'.format(len(entries), entries['bytes'].sum() / 2**20))
+            if len(entries) > 0:
+                print(entries.to_string(index=False))
+        else:
+            print('Removed {} entries from {}'.format(cache.clear(), cache.directory))
         
     elif args.command == 'nats' or args.command == 'gnats':
         dirname = os.path.dirname(os.path.abspath(args.file))
@@ -0,0 +1,203 @@
+"""
+En-route state-space diagram (SSD) safety analysis
+
+For each airborne aircraft, the velocity obstacles (VO) of the traffic
+around it are clipped from the ring of velocities it can reach, which
+gives its forbidden and allowed reachable velocities (FRV and ARV) and
+the free path fraction (FPF), the share of the ring that is allowed.
+Only traffic within ADS-B range and within the vertical separation of
+the aircraft's altitude layer contributes.
+
+SSD construction from https://github.com/TUDelft-CNS-ATM/bluesky by TU
+Delft, as in the deprecated paraatm/deprecated/Commands/enrouteSSD.py,
+operating on the standard trajectory DataFrame instead of the BlueSky
+traffic objects.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from ..io.resample import resample_trajectories
+from ..pairwise import EARTH_RADIUS
+
+from .ground_ssd import (RESULT_COLUMNS, _GEOMETRY, _time_buckets, _run_buckets,
+                         _scale_to_clipper, _clip_velocity_sets)
+
+#conversion from nautical miles to meters
+NM_TO_M = 1852.
+#range of ADS-B reception in meters (65 nautical miles)
+ADSB_RANGE = 65 * NM_TO_M
+
+
+def enroute_ssd_safety_analysis(df, lookahead_seconds=10, hsep=5*NM_TO_M, vsep=1000, margin=1.05,
+                                vmin=100, vmax=600, adsb_range=ADSB_RANGE, n_jobs=None, method='fast', resample=False):
+    """
+    Parameters
+    ----------
+    df : DataFrame
+        Scenario data to analyze, with columns 'time', 'callsign',
+        'latitude', 'longitude', 'altitude' (ft), 'tas' (knots), and
+        'heading' (deg)
+    lookahead_seconds : numeric
+        Length in seconds of the time buckets in which the aircraft
+        are analyzed together.  If an aircraft has several records in
+        a bucket, its latest one is used.
+    hsep : numeric
+        Horizontal separation in meters
+    vsep : numeric
+        Vertical separation in feet.  Aircraft whose altitudes differ
+        by this much or more are in different layers and do not
+        affect each other's SSD.
+    margin : numeric
+        Safety margin factor applied to hsep
+    vmin, vmax : numeric
+        Speed limits in knots of the ring of reachable velocities
+    adsb_range : numeric
+        Distance in meters beyond which other aircraft are not
+        received and do not contribute to the SSD
+    n_jobs : int, optional
+        Number of worker processes, as for
+        :py:func:`paraatm.safety.ground_ssd.ground_ssd_safety_analysis`
+    method : {'fast', 'polygon'}
+        As for
+        :py:func:`paraatm.safety.ground_ssd.ground_ssd_safety_analysis`
+    resample : bool
+        If True, interpolate the trajectories onto the starts of the
+        time buckets first, as for
+        :py:func:`paraatm.safety.ground_ssd.ground_ssd_safety_analysis`
+
+    Returns
+    -------
+    DataFrame
+        Data frame with columns 'time', 'callsign', and 'fpf' (and
+        'frv' and 'arv' for method='polygon').  Buckets with a single
+        aircraft give no rows.
+    """
+    if method not in ('fast', 'polygon'):
+        raise ValueError("method must be 'fast' or 'polygon'")
+
+    traf = df[['time','callsign','latitude','longitude','altitude','tas','heading']].dropna()
+    if resample:
+        traf = resample_trajectories(traf, pd.Timedelta(milliseconds=int(lookahead_seconds*1e3)))
+    groups = [traf.iloc[positions] for positions in _time_buckets(traf, lookahead_seconds)]
+    params = dict(hsep=hsep*margin, vsep=vsep, vmin=float(vmin), vmax=float(vmax), adsb_range=adsb_range)
+    fpfs = _run_buckets(_bucket_fpf, groups, (params, method), n_jobs)
+
+    fpfs = [fpf for fpf in fpfs if fpf is not None]
+    if not fpfs:
+        return pd.DataFrame(columns=RESULT_COLUMNS[:5 if method == 'polygon' else 3])
+    results = pd.concat(fpfs)
+    results.columns = RESULT_COLUMNS[:results.shape[1]]
+    return results
+
+
+def _bucket_fpf(group, params, method='fast'):
+    """Compute the FPF of the aircraft in a single time bucket
+
+    Returns
+    -------
+    DataFrame or None
+        FPF of each aircraft, or None if there is only one
+    """
+    # The records are in time order, so this keeps the latest state
+    group = group.drop_duplicates('callsign', keep='last')
+    ntraf = len(group)
+    if ntraf < 2:
+        return None
+
+    lat = group['latitude'].to_numpy(dtype=float)
+    lon = group['longitude'].to_numpy(dtype=float)
+    alt = group['altitude'].to_numpy(dtype=float)
+    rad = np.deg2rad(group['heading'].to_numpy(dtype=float))
+    tas = group['tas'].to_numpy(dtype=float)
+    gseast, gsnorth = np.sin(rad) * tas, np.cos(rad) * tas
+
+    vmax, vmin = params['vmax'], params['vmin']
+    hsepm = params['hsep']
+    alpham = 0.4999 * np.pi     # [rad] Maximum half-angle for VO
+    betalos = np.pi / 4         # [rad] Minimum divertion angle for LOS (45 deg seems optimal)
+    beta = 1.5 * betalos
+
+    #find the pairs in the same altitude layer and within range
+    ind1, ind2 = _candidate_pairs(lat, lon, alt, params['adsb_range'], params['vsep'])
+    qdr, dist = _GEOMETRY.bearing_distance(lat, lon, ind1, ind2)
+    in_range = dist < params['adsb_range']
+    ind1, ind2 = ind1[in_range], ind2[in_range]
+    qdr = np.deg2rad(qdr[in_range])
+    dist = dist[in_range]
+
+    # Pairs in loss of separation (LOS) get a dart tip instead of a VO
+    los = dist <= hsepm
+    # Half-angle of the Velocity obstacle [rad], limited to 89.982 deg
+    alpha = np.minimum(np.arcsin(hsepm / np.maximum(dist, hsepm)), alpham)
+    sinqdr, cosqdr, tanalpha = np.sin(qdr), np.cos(qdr), np.tan(alpha)
+    # Relevant x1,y1,x2,y2 (x0 and y0 are zero in relative velocity space)
+    x1 = (sinqdr + cosqdr * tanalpha) * 2 * vmax
+    x2 = (sinqdr - cosqdr * tanalpha) * 2 * vmax
+    y1 = (cosqdr - sinqdr * tanalpha) * 2 * vmax
+    y2 = (cosqdr + sinqdr * tanalpha) * 2 * vmax
+
+    # Each pair gives a VO for both of its aircraft, sorted by own
+    # aircraft.  VO from 2 to 1 is mirror of 1 to 2.
+    npairs = len(ind1)
+    own = np.concatenate((ind1, ind2))
+    other = np.concatenate((ind2, ind1))
+    pair = np.tile(np.arange(npairs), 2)
+    fix = np.repeat([1., -1.], npairs)
+    order = np.argsort(own, kind='stable')
+    own, other, pair, fix = own[order], other[order], pair[order], fix[order]
+    start = np.searchsorted(own, np.arange(ntraf+1))
+
+    # VO triangles, with the last vertex repeated so that they stack
+    # with the four-vertex dart tips, giving shape [nVO x 4 x 2]
+    x = np.stack((gseast[other],
+                  x1[pair] * fix + gseast[other],
+                  x2[pair] * fix + gseast[other],
+                  x2[pair] * fix + gseast[other]), axis=-1)
+    y = np.stack((gsnorth[other],
+                  y1[pair] * fix + gsnorth[other],
+                  y2[pair] * fix + gsnorth[other],
+                  y2[pair] * fix + gsnorth[other]), axis=-1)
+    is_los = los[pair]
+    if is_los.any():
+        # Dart tip pointing away from the other aircraft
+        qdr_los = (qdr[pair[is_los]] + np.where(fix[is_los] < 0, np.pi, 0.))[:, None]
+        leg = 1.1 * vmax / np.cos(beta) * np.array([1, 1, 1, 0])
+        angles_los = qdr_los + np.array([2 * beta, 0., -2 * beta, 0.])
+        x[is_los] = leg * np.sin(angles_los)
+        y[is_los] = leg * np.cos(angles_los)
+    VO = _scale_to_clipper(np.stack((x, y), axis=-1))
+
+    FRV_area, ARV_area, FRV, ARV = _clip_velocity_sets(VO, start, None, np.full(ntraf, vmax), np.full(ntraf, vmin), method)
+
+    fpf = ARV_area/(FRV_area+ARV_area)
+    FPFs = pd.DataFrame({0: group['time'].to_numpy(), 1: group['callsign'].to_numpy(), 2: fpf})
+    if method == 'polygon':
+        FPFs[3] = FRV
+        FPFs[4] = ARV
+    return FPFs
+
+
+def _candidate_pairs(lat, lon, alt, radius, vsep):
+    """Find the aircraft pairs that may be within radius and vsep of each other
+
+    Positions are placed on a sphere in 3-D, where the straight-line
+    distance between two points never exceeds their distance along
+    the surface, so that a KD-tree search for pairs within radius
+    (plus a small tolerance for the flat-earth approximation of
+    :py:meth:`~paraatm.pairwise.PairwiseGeometry.bearing_distance`)
+    finds all pairs within radius, at any scale.  Pairs separated
+    vertically by vsep feet or more are dropped.
+
+    Returns
+    -------
+    ind1, ind2 : ndarray of int
+        Pairs with ind1 < ind2
+    """
+    phi, lam = np.radians(lat), np.radians(lon)
+    xyz = EARTH_RADIUS * np.column_stack((np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)))
+    pairs = cKDTree(xyz).query_pairs(radius * 1.01, output_type='ndarray')
+    ind1, ind2 = pairs[:,0], pairs[:,1]
+    layer = np.abs(alt[ind1] - alt[ind2]) < vsep
+    return ind1[layer], ind2[layer]
@@ -10,17 +10,35 @@ Find all aircraft in conflict based on state-space model
 SSD calculations from https://github.com/TUDelft-CNS-ATM/bluesky by TU Delft
 """
 
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
 import pyclipper
+from scipy.spatial import cKDTree
+
+from ..io.resample import resample_trajectories
+from ..pairwise import EARTH_RADIUS, PairwiseGeometry
 
 #conversion from miles to nautical miles
 MILES_TO_NM = 0.868976
 #conversion from feet to meters
 FT_TO_M = 0.3048
+#range of ADS-B reception in meters (65 miles)
+ADSB_RANGE = 65 * 5280 * FT_TO_M
+#scale used by pyclipper to convert coordinates to integers
+CLIPPER_SCALE = 2**31
 
+# Buffers for the pairwise bearings and distances, reused across time
+# buckets (one instance per process)
+_GEOMETRY = PairwiseGeometry()
 
-def ground_ssd_safety_analysis(df, lookahead_seconds=1):
+
+def ground_ssd_safety_analysis(df, lookahead_seconds=1, interaction_radius=None, n_jobs=None, method='fast', resample=False,
+                               profile=None):
     """
     Parameters
     ----------
@@ -28,12 +46,186 @@ def ground_ssd_safety_analysis(df, lookahead_seconds=1):
         Scenario data to analyze
     lookahead_seconds : numeric
         Lookahead time in seconds
+    interaction_radius : numeric, optional
+        Distance in meters beyond which other aircraft do not
+        contribute to the SSD of an aircraft.  Only pairs of aircraft
+        within this distance are found and processed, so that the
+        cost per time bucket scales with the number of nearby pairs
+        instead of the square of the number of aircraft.  Defaults to
+        the ADS-B range of 65 miles, which gives the same results as
+        considering all pairs.
+    n_jobs : int, optional
+        Number of worker processes.  The time buckets are independent
+        of each other, and are handed out to the workers in chunks.
+        If None or 1, the buckets are analyzed one after another in
+        the current process.  If -1, use one process per CPU.  The
+        results are the same in either case.
+    method : {'fast', 'polygon'}
+        With 'fast', only the forbidden reachable velocities (FRV) are
+        clipped from the ring of reachable velocities of each
+        aircraft, and the area of the allowed velocities (ARV) is the
+        rest of the ring area.  With 'polygon', the ARV is clipped as
+        well, and both velocity sets are returned.  The FPF values of
+        the two methods agree up to the rounding of the clipper
+        vertices.
+    resample : bool
+        If True, the trajectories are first interpolated onto the
+        starts of the time buckets with
+        :py:func:`paraatm.io.resample.resample_trajectories`, so that
+        each bucket holds exactly one state of each aircraft in it,
+        instead of all reports that fall into the bucket.  For more
+        control, such as limiting the gaps that are interpolated,
+        resample the data before the analysis.
+    profile : SSDProfile, optional
+        If given, the sizes of the time buckets and the time spent in
+        each phase of the analysis are recorded into it
 
     Returns
     -------
     DataFrame
-        Data frame with columns 'time', 'callsign', and 'fpf'
+        Data frame with columns 'time', 'callsign', and 'fpf'.  With
+        method='polygon', the columns 'frv' and 'arv' hold the
+        velocity sets of each aircraft as lists of polygons, each an
+        array of shape (n, 2) with the x and y velocities of its
+        vertices in m/s.
     """
+    if method not in ('fast', 'polygon'):
+        raise ValueError("method must be 'fast' or 'polygon'")
+
+    timer = _NULL_TIMER if profile is None else _PhaseTimer()
+    if resample:
+        df = resample_trajectories(df, pd.Timedelta(milliseconds=int(lookahead_seconds*1e3)))
+    traf = _traffic_frame(df)
+    timer.lap('prepare')
+    groups = [traf.iloc[positions] for positions in _time_buckets(traf, lookahead_seconds)]
+    timer.lap('split')
+    if profile is None:
+        fpfs = _run_buckets(_bucket_fpf, groups, (interaction_radius, method), n_jobs)
+    else:
+        profiled = _run_buckets(_bucket_fpf_profiled, groups, (interaction_radius, method), n_jobs)
+        timer.lap('buckets')
+        fpfs = [fpf for fpf, _ in profiled]
+        profile.buckets.extend(stats for _, stats in profiled)
+
+    results = pd.concat([fpf for fpf in fpfs if (fpf is not None) and not fpf.empty])
+    results.columns = RESULT_COLUMNS[:results.shape[1]]
+    timer.lap('concat')
+    if profile is not None:
+        profile.runs.append(timer.stats)
+    return results
+
+
+def ground_ssd_sweep(df, lookahead_seconds, interaction_radius=None, n_jobs=None, method='fast'):
+    """Ground SSD analysis for each of several lookahead times
+
+    This gives the same results as calling
+    :py:func:`ground_ssd_safety_analysis` once per lookahead time, but
+    the traffic data is prepared only once, and time buckets holding
+    the same records for different lookahead times are analyzed only
+    once.  For example, with one record per aircraft and second, all
+    lookahead times below one second give the same buckets, and
+    lookahead times drawn from a response time distribution share
+    most of their buckets.
+
+    Parameters
+    ----------
+    df : DataFrame
+        Scenario data to analyze
+    lookahead_seconds : sequence of numeric
+        Lookahead times in seconds
+    interaction_radius, n_jobs, method
+        See :py:func:`ground_ssd_safety_analysis`.  With n_jobs, the
+        distinct time buckets of all lookahead times are spread over
+        the worker processes.
+
+    Returns
+    -------
+    DataFrame
+        Data frame with columns 'lookahead', 'time', 'callsign', and
+        'fpf' (and 'frv' and 'arv' for method='polygon'), where
+        'lookahead' is the lookahead time in seconds
+    """
+    if method not in ('fast', 'polygon'):
+        raise ValueError("method must be 'fast' or 'polygon'")
+
+    traf = _traffic_frame(df)
+
+    # Identify the distinct buckets by their record positions
+    bucket_ids = {}
+    lookahead_buckets = []
+    for lookahead in lookahead_seconds:
+        ids = []
+        for positions in _time_buckets(traf, lookahead):
+            ids.append(bucket_ids.setdefault(positions.tobytes(), len(bucket_ids)))
+        lookahead_buckets.append(ids)
+
+    groups = [traf.iloc[np.frombuffer(key, dtype=np.intp)] for key in bucket_ids]
+    fpfs = _run_buckets(_bucket_fpf, groups, (interaction_radius, method), n_jobs)
+
+    results = []
+    for lookahead, ids in zip(lookahead_seconds, lookahead_buckets):
+        frames = [fpfs[i] for i in ids if (fpfs[i] is not None) and not fpfs[i].empty]
+        if frames:
+            result = pd.concat(frames)
+            result.columns = RESULT_COLUMNS[:result.shape[1]]
+            result.insert(0, 'lookahead', lookahead)
+            results.append(result)
+    return pd.concat(results)
+
+
+def _time_buckets(traf, lookahead_seconds):
+    """Positions of the records in each non-empty time bucket
+
+    Returns
+    -------
+    list of ndarray
+        Record positions of each bucket, in time order
+    """
+    #convert to milliseconds
+    timestep = int(lookahead_seconds*1e3)
+    # Bucket the records by time like pd.Grouper(freq='%dms'%timestep),
+    # which sorts them by time and starts the bins at midnight of the
+    # first day
+    ns = traf['time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    if len(ns) == 0:
+        return []
+    order = np.argsort(ns, kind='stable').astype(np.intp)
+    origin = ns[order[0]] - ns[order[0]] % (86400 * 10**9)
+    bins = (ns[order] - origin) // (timestep * 10**6)
+    return np.split(order, np.flatnonzero(np.diff(bins)) + 1)
+
+
+def _run_buckets(func, groups, args, n_jobs):
+    """Call func(group, *args) for each time bucket, optionally in worker processes
+
+    func must be a module-level function, so that it can be sent to
+    the worker processes.
+
+    Returns
+    -------
+    list
+        Result of func for each group, in order
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    if n_jobs is None or n_jobs == 1 or len(groups) < 2:
+        return [func(group, *args) for group in groups]
+
+    n_jobs = min(n_jobs, len(groups))
+    # Several buckets per task reduce the scheduling overhead,
+    # while still leaving enough tasks to balance the load
+    chunksize = max(1, len(groups) // (4 * n_jobs))
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        # map returns the results in the order of the buckets
+        return list(executor.map(func, groups, *[[arg] * len(groups) for arg in args], chunksize=chunksize))
+
+
+RESULT_COLUMNS = ['time','callsign','fpf','frv','arv']
+TRAFFIC_COLUMNS = ['time','callsign','latitude','longitude','tas','heading','x','y','status']
+
+
+def _traffic_frame(df):
+    """Select the columns used by the analysis and add velocity components and status"""
     traf = df[['time','callsign','latitude','longitude','tas','heading']].copy()
 
     #convert heading to radians
@@ -46,26 +238,283 @@ def ground_ssd_safety_analysis(df, lookahead_seconds=1):
         traf['status'] = df['status']
     else:
         traf['status'] = infer_status(df)
-    traf = traf.dropna()
+    return traf.dropna()
 
 
-    results = []
-    #convert to milliseconds
-    timestep = int(lookahead_seconds*1e3)
-    #group aircraft by time
-    for name, group in traf.groupby(pd.Grouper(key='time',freq='%dms'%timestep)):
-        if group.empty:
-            continue
-        #find vmin and vmax
-        ac_info = list(_load_BADA(group['status']))
-        #conflict returns a list of lists with timestamp, acid, and FPF of the aircraft.
-        fpf = _conflict(group,ac_info)
-        if (fpf is not None) and not fpf.empty:
-            results.append(fpf)
-
-    results = pd.concat(results)
-    results.columns=['time','callsign','fpf']
-    return results
+class _PhaseTimer:
+    """Record the seconds since the previous lap, and counts, into stats"""
+
+    def __init__(self):
+        self.stats = {}
+        self.start = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.stats[phase] = now - self._last
+        self._last = now
+
+    def record(self, **counts):
+        self.stats.update(counts)
+
+
+class _NullTimer:
+    """Stand-in for _PhaseTimer when not profiling"""
+
+    def lap(self, phase):
+        pass
+
+    def record(self, **counts):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _bucket_fpf(group, interaction_radius, method='fast', timer=_NULL_TIMER):
+    """Compute the FPF of the aircraft in a single time bucket
+
+    Returns
+    -------
+    DataFrame or None
+        As returned by :py:func:`_conflict`
+    """
+    #find vmin and vmax
+    ac_info = list(_load_BADA(group['status']))
+    timer.lap('bada')
+    #conflict returns a list of lists with timestamp, acid, and FPF of the aircraft.
+    return _conflict(group,ac_info,interaction_radius,method,timer)
+
+
+def _bucket_fpf_profiled(group, interaction_radius, method='fast'):
+    """Compute the FPF of a time bucket along with its profile
+
+    Returns
+    -------
+    fpf : DataFrame or None
+        As returned by :py:func:`_bucket_fpf`
+    stats : dict
+        Row of :py:meth:`SSDProfile.to_frame`
+    """
+    timer = _PhaseTimer()
+    timer.record(time=group['time'].iloc[0], aircraft=len(group), candidates=0, pairs=0)
+    fpf = _bucket_fpf(group, interaction_radius, method, timer)
+    timer.record(total=time.perf_counter() - timer.start)
+    return fpf, timer.stats
+
+
+BUCKET_PHASES = ['bada', 'search', 'geometry', 'vo', 'clip', 'result']
+RUN_PHASES = ['prepare', 'split', 'buckets', 'concat']
+PROFILE_COLUMNS = ['time', 'aircraft', 'candidates', 'pairs'] + BUCKET_PHASES + ['total']
+
+
+class SSDProfile:
+    """Record of where the time of an SSD analysis goes
+
+    Pass an instance as the profile argument of
+    :py:func:`ground_ssd_safety_analysis`.  For each time bucket, it
+    records the number of aircraft, the number of candidate pairs
+    found by the spatial search and of pairs within the interaction
+    radius, and the seconds spent in each phase:
+
+    - 'bada': looking up the speed limits and separation of each
+      aircraft from its status
+    - 'search': finding the candidate pairs
+    - 'geometry': computing their bearings and distances
+    - 'vo': constructing the velocity obstacles
+    - 'clip': clipping them with pyclipper and computing the areas
+    - 'result': assembling the FPF data frame
+
+    Buckets with a single aircraft end before the 'search' phase.
+    With n_jobs, the buckets are timed in the worker processes.  The
+    phases of each run as a whole are 'prepare' (resampling and
+    preparing the traffic data), 'split' (splitting it into time
+    buckets), 'buckets' (analyzing the buckets, including the
+    overhead of the worker processes), and 'concat' (combining the
+    results).  A profile collects all analyses it is passed to, in
+    order.
+
+    For example, ``profile.to_frame().sort_values('total')`` lists the
+    slowest buckets last, and grouping its rows by 'aircraft' shows
+    how the cost of each phase scales with the traffic.
+
+    Attributes
+    ----------
+    buckets : list of dict
+        Record of each time bucket, as in :py:meth:`to_frame`
+    runs : list of dict
+        Seconds spent in each phase of each run
+    """
+
+    def __init__(self):
+        self.buckets = []
+        self.runs = []
+
+    def to_frame(self):
+        """Return the bucket records as a DataFrame
+
+        Returns
+        -------
+        DataFrame
+            One row per time bucket, with columns 'time' (of the first
+            record in the bucket), 'aircraft', 'candidates', 'pairs',
+            the seconds of each phase, and 'total', the seconds of the
+            bucket as a whole
+        """
+        return pd.DataFrame(self.buckets, columns=PROFILE_COLUMNS)
+
+    def summary(self):
+        """Total seconds spent in each phase, over all buckets and runs
+
+        Returns
+        -------
+        Series
+            The bucket phases followed by the run phases
+        """
+        buckets = self.to_frame()[BUCKET_PHASES].sum()
+        runs = pd.DataFrame(self.runs, columns=RUN_PHASES).sum()
+        return pd.concat([buckets, runs])
+
+
+class GroundSSDMonitor:
+    """Incremental ground SSD analysis of a stream of track updates
+
+    Track updates are passed in batches to :py:meth:`update`, in the
+    same format as the input of :py:func:`ground_ssd_safety_analysis`.
+    The monitor keeps the latest state of each callsign, and whenever
+    an update falls into a later lookahead window than the current
+    one, the current window is complete and the FPF of the aircraft
+    in it is computed from their latest states.
+
+    Windows are aligned to multiples of the lookahead time, so that
+    for time-ordered input with at most one update per aircraft and
+    window, the FPF rows are the same as those of
+    :py:func:`ground_ssd_safety_analysis`.
+
+    The work done by an update is proportional to its batch size plus
+    one SSD computation per window that it completes; the cost of each
+    SSD computation can be bounded with interaction_radius.  The ring
+    polygons of the aircraft are cached between windows.
+    """
+
+    def __init__(self, lookahead_seconds=1, interaction_radius=None, max_age=None):
+        """
+        Parameters
+        ----------
+        lookahead_seconds : numeric
+            Lookahead time in seconds, which is also the length of
+            the windows
+        interaction_radius : numeric, optional
+            Passed on to the SSD computation (see
+            :py:func:`ground_ssd_safety_analysis`)
+        max_age : numeric, optional
+            Time in seconds after which an aircraft without updates is
+            dropped.  Defaults to the lookahead time, so that each
+            window only includes the aircraft updated within it.
+        """
+        self.lookahead = pd.Timedelta(seconds=lookahead_seconds)
+        self.max_age = self.lookahead if max_age is None else pd.Timedelta(seconds=max_age)
+        # Window arithmetic is done on integer nanoseconds
+        self._lookahead_ns = self.lookahead.value
+        self._max_age_ns = self.max_age.value
+        self.interaction_radius = interaction_radius
+        # Latest (time in ns, row) of each callsign, ordered by the
+        # time of the update
+        self.state = {}
+        # Start of the current window in ns
+        self.window_start = None
+        # Number of updates that arrived after their window was
+        # completed, and were therefore ignored
+        self.late_updates = 0
+
+    def update(self, df):
+        """Add a batch of track updates
+
+        Parameters
+        ----------
+        df : DataFrame
+            Track updates with columns 'time', 'callsign', 'latitude',
+            'longitude', 'tas', 'heading', and optionally 'status'
+
+        Returns
+        -------
+        DataFrame
+            FPF rows of the windows completed by this batch, with
+            columns 'time', 'callsign', and 'fpf'.  Empty if no window
+            was completed.
+        """
+        # The batches are typically small, so work on numpy arrays
+        # rather than going through _traffic_frame
+        tas = df['tas'].to_numpy(dtype=float)
+        rad = np.deg2rad(df['heading'].to_numpy(dtype=float))
+        if 'status' in df:
+            status = df['status'].to_numpy(dtype=object)
+        else:
+            status = _status_from_tas(tas)
+        columns = [df['time'].to_numpy(), df['callsign'].to_numpy(dtype=object),
+                   df['latitude'].to_numpy(), df['longitude'].to_numpy(),
+                   tas, df['heading'].to_numpy(), np.sin(rad) * tas, np.cos(rad) * tas, status]
+        valid = ~np.any([pd.isna(c) for c in columns], axis=0)
+        columns = [c[valid] for c in columns]
+        ns = columns[0].astype('datetime64[ns]').astype(np.int64)
+        order = np.argsort(ns, kind='stable')
+        windows = ns - ns % self._lookahead_ns
+
+        results = []
+        for i in order:
+            window_start = windows[i]
+            if self.window_start is None:
+                self.window_start = window_start
+            elif window_start < self.window_start:
+                self.late_updates += 1
+                continue
+            elif window_start > self.window_start:
+                results += self._advance(window_start)
+            row = tuple(c[i] for c in columns)
+            # Move the callsign to the end, to keep the state ordered
+            # by time of update
+            self.state.pop(row[1], None)
+            self.state[row[1]] = (ns[i], row)
+        return self._result(results)
+
+    def flush(self):
+        """Complete the current window, e.g. at the end of the feed
+
+        Returns
+        -------
+        DataFrame
+            FPF rows of the current window, as for :py:meth:`update`
+        """
+        if self.window_start is None:
+            return self._result([])
+        return self._result(self._advance(self.window_start + self._lookahead_ns))
+
+    def _advance(self, window_start):
+        """Complete all windows before window_start, returning their FPF frames"""
+        results = []
+        start = self.window_start
+        while start < window_start:
+            end = start + self._lookahead_ns
+            # Drop aircraft whose latest update is too old
+            for callsign in [c for c, (t, _) in self.state.items() if t < end - self._max_age_ns]:
+                del self.state[callsign]
+            if not self.state:
+                # Nothing to do until the next update
+                break
+            traf = pd.DataFrame([row for _, row in self.state.values()], columns=TRAFFIC_COLUMNS)
+            fpf = _bucket_fpf(traf, self.interaction_radius)
+            if fpf is not None:
+                results.append(fpf)
+            start = end
+        self.window_start = window_start
+        return results
+
+    def _result(self, results):
+        if results:
+            results = pd.concat(results)
+        else:
+            results = pd.DataFrame({0: pd.Series(dtype='datetime64[ns]'), 1: pd.Series(dtype=object), 2: pd.Series(dtype=np.float32)})
+        results.columns = ['time','callsign','fpf']
+        return results
 
 
 def infer_status(df):
@@ -76,11 +525,15 @@ def infer_status(df):
     pd.Series
     """
 
-    status = pd.Series(index=df.index, dtype="object")
-    status[df['tas'] <= 4] = 'PUSHBACK'
-    status[(df['tas'] >4) & (df['tas'] <= 30)] = 'TAXI'
-    status[(df['tas'] > 30) & (df['tas'] <= 200)] = 'TAKEOFF/LANDING'
-    
+    return pd.Series(_status_from_tas(df['tas'].to_numpy(dtype=float)), index=df.index, dtype="object")
+
+
+def _status_from_tas(tas):
+    """Array version of :py:func:`infer_status`, with NaN for unknown status"""
+    status = np.full(len(tas), np.nan, dtype=object)
+    status[tas <= 4] = 'PUSHBACK'
+    status[(tas > 4) & (tas <= 30)] = 'TAXI'
+    status[(tas > 30) & (tas <= 200)] = 'TAKEOFF/LANDING'
     return status
 
 
@@ -144,22 +597,16 @@ def _area(vset):
     return A
 
 #straight from bluesky
-def _qdrdist_matrix_indices(n):
-    """ generate pairwise combinations between n objects """
-    x = np.arange(n-1)
-    ind1 = np.repeat(x,(x+1)[::-1])
-    ind2 = np.ones(ind1.shape[0])
-    np.put(ind2, np.cumsum(x[1:][::-1]+1),np.arange(n *-1 + 3, 1))
-    ind2 = np.cumsum(ind2, out=ind2)
-    return ind1,ind2
-
 def _qdrdist_matrix(lat1, lon1, lat2, lon2):
     """ Calculate bearing and distance vectors, using WGS'84
     In:
     latd1,lond1 en latd2, lond2 [deg] :positions 1 & 2 (vectors)
     Out:
     qdr [deg] = heading from 1 to 2 (matrix)
-    d [nm]= distance from 1 to 2 in nm (matrix) """
+    d [nm]= distance from 1 to 2 in nm (matrix)
+
+    The SSD calculations use the buffered equivalent of the simplified
+    version, :py:meth:`paraatm.pairwise.PairwiseGeometry.bearing_distance`. """
 
     USE_SIMPLIFIED = True
 
@@ -227,72 +674,195 @@ def _qdrdist_matrix(lat1, lon1, lat2, lon2):
 
         return qdr,dist
 
-def _conflict(traffic,ac_info):
+@lru_cache(maxsize=64)
+def _ring_paths(vmax, vmin, N_angle=180):
+    """Ring-shaped velocity set of an aircraft, scaled to clipper integers
+
+    Returns the outer circle (CCW) and the inner circle (CW) as integer
+    arrays of shape (N_angle, 2).  The result is cached, since the
+    rings only depend on the speed limits of the aircraft's status
+    class, and must not be modified.
+    """
+    angles = np.arange(0, 2*np.pi, 2*np.pi/N_angle)
+    #segments of the unit circle
+    xyc = np.transpose(np.reshape(np.concatenate((np.sin(angles), np.cos(angles))), (2, N_angle)))
+    return [_scale_to_clipper(np.flipud(xyc * vmax)), _scale_to_clipper(xyc * vmin)]
+
+def _scale_to_clipper(values):
+    """Vectorized pyclipper.scale_to_clipper, which truncates toward zero"""
+    return (np.asarray(values) * CLIPPER_SCALE).astype(np.int64)
+
+@lru_cache(maxsize=64)
+def _ring_area(vmax, vmin):
+    """Area of the discretized ring of :py:func:`_ring_paths`, in the unscaled units"""
+    return _clipper_area(_ring_paths(vmax, vmin))
+
+def _clipper_area(paths):
+    """Area of a set of integer clipper paths, in the unscaled units
+
+    Equivalent to :py:func:`_area` of the scaled-back paths.
+    """
+    A = 0
+    for path in paths:
+        A += pyclipper.scale_from_clipper(pyclipper.scale_from_clipper(pyclipper.Area(path)))
+    return A
+
+def _clip_velocity_sets(VO, start, use, vmax, vmin, method='fast'):
+    """Clip the VOs of each aircraft from its ring of reachable velocities
+
+    Parameters
+    ----------
+    VO : ndarray
+        Integer clipper paths of the velocity obstacles, sorted by own
+        aircraft, of shape [nVO x nvertices x 2]
+    start : ndarray
+        The VOs of aircraft i are VO[start[i]:start[i+1]]
+    use : ndarray of bool, optional
+        Which VOs to include
+    vmax, vmin : ndarray
+        Speed limits of each aircraft
+    method : {'fast', 'polygon'}
+        See :py:func:`ground_ssd_safety_analysis`
+
+    Returns
+    -------
+    FRV_area, ARV_area : ndarray of float32
+        Areas of the forbidden and allowed reachable velocities
+    FRV, ARV : list
+        With method='polygon', the velocity sets of each aircraft as
+        lists of vertex arrays, and otherwise lists of None
+    """
+    ntraf = len(vmax)
+    FRV_area_loc = np.zeros(ntraf, dtype=np.float32)
+    ARV_area_loc = np.zeros(ntraf, dtype=np.float32)
+    FRV_loc = [None] * ntraf
+    ARV_loc = [None] * ntraf
+    for i in range(ntraf):
+        ring = _ring_paths(vmax[i], vmin[i])
+        VO_i = VO[start[i]:start[i+1]]
+        if use is not None:
+            VO_i = VO_i[use[start[i]:start[i+1]]]
+
+        if len(VO_i) == 0:
+            # No other aircraft in the vicinity, the whole ring is free
+            FRV, ARV = [], list(ring)
+        else:
+            # Make a clipper object
+            pc = pyclipper.Pyclipper()
+            # Add circles (ring-shape) to clipper as subject
+            pc.AddPaths(ring, pyclipper.PT_SUBJECT, True)
+            # Add the VOs of the other aircraft to clipper as clip.
+            # Invalid (degenerate) VOs are skipped, and only if all of
+            # them are invalid is an exception raised.
+            try:
+                pc.AddPaths(VO_i, pyclipper.PT_CLIP, True)
+            except pyclipper.ClipperException:
+                pass
+
+            # Execute clipper command.  The ARV is the rest of the
+            # ring, so for the FPF alone its area is derived from the
+            # FRV area instead of clipping a second time.
+            FRV = pc.Execute(pyclipper.CT_INTERSECTION, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO)
+            ARV = pc.Execute(pyclipper.CT_DIFFERENCE, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO) if method == 'polygon' else None
+
+        if method == 'polygon':
+            FRV_loc[i] = [np.asarray(path) / CLIPPER_SCALE for path in FRV]
+            ARV_loc[i] = [np.asarray(path) / CLIPPER_SCALE for path in ARV]
+
+        # Check if ARV or FRV is empty
+        if ARV is not None and len(ARV) == 0:
+            FRV_area_loc[i] = np.pi * (vmax[i] **2 - vmin[i] ** 2)
+            ARV_area_loc[i] = 0
+        elif len(FRV) == 0:
+            # Happens when there are no other aircraft in the vicinity
+            FRV_area_loc[i] = 0
+            ARV_area_loc[i] = np.pi * (vmax[i] **2 - vmin[i] ** 2)
+        elif ARV is None:
+            FRV_area = _clipper_area(FRV)
+            FRV_area_loc[i] = FRV_area
+            ARV_area_loc[i] = max(_ring_area(vmax[i], vmin[i]) - FRV_area, 0)
+        else:
+            FRV_area_loc[i] = _clipper_area(FRV)
+            ARV_area_loc[i] = _clipper_area(ARV)
+
+    return FRV_area_loc, ARV_area_loc, FRV_loc, ARV_loc
+
+def _candidate_pairs(lat, lon, radius):
+    """Find the aircraft pairs that may be within radius of each other
+
+    Positions are projected to local metric coordinates, scaling
+    longitudes by the cosine of the largest absolute latitude, so that
+    projected distances never exceed the distances of
+    :py:func:`_qdrdist_matrix`.  Pairs within radius in the projection
+    are found with a KD-tree, which gives a superset of the pairs
+    within radius.
+
+    Returns
+    -------
+    ind1, ind2 : ndarray of int
+        Pairs with ind1 < ind2, sorted as in :py:func:`paraatm.pairwise.triu_pair_indices`
+    """
+    if np.isinf(radius):
+        return _GEOMETRY.pair_indices(len(lat))
+    re = EARTH_RADIUS
+    coslat = np.cos(np.radians(np.max(np.abs(lat))))
+    xy = np.column_stack((re * np.radians(lon) * coslat, re * np.radians(lat)))
+    pairs = cKDTree(xy).query_pairs(radius, output_type='ndarray')
+    order = np.lexsort((pairs[:,1], pairs[:,0]))
+    return pairs[order,0], pairs[order,1]
+
+def _conflict(traffic,ac_info,interaction_radius=None,method='fast',timer=_NULL_TIMER):
     """
         constructs SSDs for the current timeframe, populates FRV and ARV, and calculates FPF for aircraft in conflict
         args:
             traffic = pandas dataframe at the current time
             ac_info = the output of load_bada command
+            interaction_radius = distance in meters beyond which other aircraft are
+                ignored, defaults to the ADS-B range
+            method = 'fast' to derive the ARV area from the ring and FRV areas, or
+                'polygon' to clip the ARV as well and return both velocity sets
+            timer = _PhaseTimer to record the time of each phase into, for SSDProfile
         returns:
             FPF = pandas dataframe of aircraft in the current timeframe and each respective FPF measure,
-            or None in the case of only 1 aircraft
+            or None in the case of only 1 aircraft.  With method='polygon', columns 3 and 4
+            hold the FRV and ARV of each aircraft as lists of vertex arrays.
+
+        Candidate pairs within the interaction radius are found with a
+        spatial search before any trigonometry, and the velocity
+        obstacle (VO) triangles of these pairs are computed as NumPy
+        arrays in one step, so that only the clipper boolean
+        operations are left per aircraft.
     """
+    ntraf = len(traffic)
+    #only one aircraft reported in this timeframe
+    if ntraf < 2:
+        return None
+
     #convert string in dataframe to float
     lat,lon = np.array(traffic['latitude']).astype(float),np.array(traffic['longitude']).astype(float)
     gsnorth,gseast = np.array(traffic['y']).astype(float),np.array(traffic['x']).astype(float)
+    callsign = traffic['callsign'].to_numpy(dtype=object)
+    vmax = np.array([info['vmax'] for info in ac_info], dtype=float)
+    vmin = np.array([info['vmin'] for info in ac_info], dtype=float)
     hsep = ac_info[0]['sep']
-    # Local variables, will be put into asas later
-    FRV_loc          = [None] * len(traffic)
-    ARV_loc          = [None] * len(traffic)
-    # For calculation purposes
-    ARV_calc_loc     = [None] * len(traffic)
-    FRV_area_loc     = np.zeros(len(traffic), dtype=np.float32)
-    ARV_area_loc     = np.zeros(len(traffic), dtype=np.float32)
     #constants
-    N_angle = 180
     alpham  = 0.4999 * np.pi
-    betalos = np.pi / 4
-    adsbmax = 65 * 5280 * FT_TO_M
-    beta = 1.5 * betalos
-    angles = np.arange(0, 2*np.pi, 2*np.pi/N_angle)
-    #segments of the unit circle
-    xyc = np.transpose(np.reshape(np.concatenate((np.sin(angles), np.cos(angles))), (2, N_angle)))
-    circle_tup,circle_lst = tuple(),[]
-    for i in range(len(traffic)):
-
-        # if ac_info[i]['vmax'] == 30*MILES_TO_NM: #taxi
-        #     heading = traffic.iloc[i]['heading']
-        #     #put between 0-360
-        #     if heading < 0:
-        #         heading += 360
-        #     #find center of jet blast
-        #     opp_heading_ind = heading//2 - 90
-        #     #build ellipsoid part of outer circle
-        #     for j in range(45):
-        #         xyc[opp_heading_ind-45+j] = xyc[opp_heading_ind-45+j] * (1+j/45)
-        #     for j in range(45):
-        #         xyc[opp_heading_ind+j] = xyc[opp_heading_ind+j] * (2-j/45)
-
-        circle_tup+=((tuple(map(tuple, np.flipud(xyc * ac_info[i]['vmax']))), tuple(map(tuple , xyc * ac_info[i]['vmin'])),),)
-        circle_lst.append([list(map(list, np.flipud(xyc * ac_info[i]['vmax']))), list(map(list , xyc * ac_info[i]['vmin'])),])
-
-    #only one aircraft reported in this timeframe
-    if len(traffic) < 2:
-        return None
-    #generate the dist matrix pairs
-    ind1, ind2 = _qdrdist_matrix_indices(len(traffic))
-    #do the same thing in a way that we can pass to the next function in python3
-    lat1 = np.repeat(lat[:-1],range(len(lat)-1,0,-1))
-    lon1 = np.repeat(lon[:-1],range(len(lon)-1,0,-1))
-    lat2 = np.tile(lat,len(lat)-1)
-    lat2 = np.concatenate([lat2[i:len(lat)] for i in range(1,len(lat))])
-    lon2 = np.tile(lon,len(lon)-1)
-    lon2 = np.concatenate([lon2[i:len(lon)] for i in range(1,len(lon))])
-    #calculate the distance matrix and angles between aircraft
-    qdr,dist = _qdrdist_matrix(lat1,lon1,lat2,lon2)
-    qdr = np.array(qdr)
-    dist = np.array(dist)
-    qdr = np.deg2rad(qdr)
+    if interaction_radius is None:
+        interaction_radius = ADSB_RANGE
+
+    #find the pairs that may be within range
+    ind1, ind2 = _candidate_pairs(lat, lon, interaction_radius)
+    timer.lap('search')
+    #calculate the distances and angles between these aircraft
+    qdr,dist = _GEOMETRY.bearing_distance(lat,lon,ind1,ind2)
+    # Aircraft pairs that are within range (indexing copies the results
+    # out of the shared buffers)
+    in_range = dist < interaction_radius
+    timer.record(candidates=len(ind1), pairs=int(in_range.sum()))
+    ind1, ind2 = ind1[in_range], ind2[in_range]
+    qdr = np.deg2rad(qdr[in_range])
+    dist = dist[in_range]
+    timer.lap('geometry')
     #exclude 0 distance AKA same aircraft
     dist[(dist < hsep) & (dist > 0)] = hsep
     dist[dist==0] = hsep+1
@@ -309,150 +879,51 @@ def _conflict(traffic,ac_info):
     tanalpha = np.tan(alpha)
     cosqdrtanalpha = cosqdr * tanalpha
     sinqdrtanalpha = sinqdr * tanalpha
-
-    #conflict = (traffic.iloc[ind1[list(np.where(dist==hsep)[0])]],traffic.iloc[ind2[list(np.where(dist==hsep)[0])]])
-    FPFs = []
-    for i in range(len(traffic)):
-        # Relevant x1,y1,x2,y2 (x0 and y0 are zero in relative velocity space)
-        x1 = (sinqdr + cosqdrtanalpha) * 2 * ac_info[i]['vmax']
-        x2 = (sinqdr - cosqdrtanalpha) * 2 * ac_info[i]['vmax']
-        y1 = (cosqdr - sinqdrtanalpha) * 2 * ac_info[i]['vmax']
-        y2 = (cosqdr + sinqdrtanalpha) * 2 * ac_info[i]['vmax']
-
-        if  True: #(dist==hsep).any(): #envision this as if acid in conflict['callsign'], but doesn't work like i thought
-            # SSD for aircraft i
-            # Get indices that belong to aircraft i
-            ind = np.where(np.logical_or(ind1 == i,ind2 == i))[0]
-            # Check whether there are any aircraft in the vicinity
-            if len(ind) == 0:
-                # No aircraft in the vicinity
-                # Map them into the format ARV wants. Outercircle CCW, innercircle CW
-                ARV_loc[i] = circle_lst[i]
-                FRV_loc[i] = []
-                ARV_calc_loc[i] = ARV_loc[i]
-                # Calculate areas and store in asas
-                FRV_area_loc[i] = 0
-                ARV_area_loc[i] = np.pi * (ac_info[i]['vmax'] **2 - ac_info[i]['vmin'] ** 2)
-            else:
-                # The i's of the other aircraft
-                i_other = np.delete(np.arange(0, len(traffic)), i)
-                # Aircraft that are within ADS-B range
-                ac_adsb = np.where(dist[ind] < adsbmax)[0]
-                # Now account for ADS-B range in indices of other aircraft (i_other)
-                ind = ind[ac_adsb]
-                i_other = i_other[ac_adsb]
-
-            # VO from 2 to 1 is mirror of 1 to 2. Only 1 to 2 can be constructed in
-            # this manner, so need a correction vector that will mirror the VO
-            fix = np.ones(np.shape(i_other))
-            fix[i_other < i] = -1
-            # Relative bearing [deg] from [-180,180]
-            # (less required conversions than rad in RotA)
-            fix_ang = np.zeros(np.shape(i_other))
-            fix_ang[i_other < i] = 180.
-
-            #current and potential x velocities for other aircraft
-            x = np.concatenate((gseast[i_other],
-                                x1[ind] * fix + gseast[i_other],
-                                x2[ind] * fix + gseast[i_other]))
-            #current and potential y velocities for other aircraft
-            y = np.concatenate((gsnorth[i_other],
-                                y1[ind] * fix + gsnorth[i_other],
-                                y2[ind] * fix + gsnorth[i_other]))
-            # Reshape [(ntraf-1)x3] and put arrays in one array [(ntraf-1)x3x2]
-            x = np.transpose(x.reshape(3, np.shape(i_other)[0]))
-            y = np.transpose(y.reshape(3, np.shape(i_other)[0]))
-            xy = np.dstack((x,y))
-
-            # Make a clipper object
-            pc = pyclipper.Pyclipper()
-            # Add circles (ring-shape) to clipper as subject
-            pc.AddPaths(pyclipper.scale_to_clipper(circle_tup[i]), pyclipper.PT_SUBJECT, True)
-
-            # Add each other other aircraft to clipper as clip
-            for j in range(np.shape(i_other)[0]):
-                if traffic.loc[traffic.index[j],'callsign'] == traffic.loc[traffic.index[i],'callsign']:
-                    continue
-
-                # Scale VO when not in LOS
-                if True:#dist[ind[j]] > hsep:
-                    # Normally VO shall be added of this other a/c
-                    VO = pyclipper.scale_to_clipper(tuple(map(tuple,xy[j,:,:])))
-                else:
-                    # Pair is in LOS, instead of triangular VO, use darttip
-                    # Check if bearing should be mirrored
-                    # i.e FPF = 0.25
-                    if i_other[j] < i:
-                        qdr_los = qdr[ind[j]] + np.pi
-                    else:
-                        qdr_los = qdr[ind[j]]
-                    # Length of inner-leg of darttip
-                    leg = 1.1 * ac_info[i]['vmax'] / np.cos(beta) * np.array([1,1,1,0])
-                    # Angles of darttip
-                    angles_los = np.array([qdr_los + 2 * beta, qdr_los, qdr_los - 2 * beta, 0.])
-                    # Calculate coordinates (CCW)
-                    x_los = leg * np.sin(angles_los)
-                    y_los = leg * np.cos(angles_los)
-                    # Put in array of correct format
-                    xy_los = np.vstack((x_los,y_los)).T
-                    # Scale darttip
-                    VO = pyclipper.scale_to_clipper(tuple(map(tuple,xy_los)))
-                # Add scaled VO to clipper
-                try:
-                    pc.AddPath(VO, pyclipper.PT_CLIP, True)
-                except:
-                    pass
-
-            # Execute clipper command
-            FRV = pyclipper.scale_from_clipper(pc.Execute(pyclipper.CT_INTERSECTION, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO))
-
-            ARV = pc.Execute(pyclipper.CT_DIFFERENCE, pyclipper.PFT_NONZERO, pyclipper.PFT_NONZERO)
-
-            # Scale back
-            ARV = pyclipper.scale_from_clipper(ARV)
-
-            # Check if ARV or FRV is empty
-            if len(ARV) == 0:
-                # No aircraft in the vicinity
-                # Map them into the format ARV wants. Outercircle CCW, innercircle CW
-                ARV_loc[i] = []
-                FRV_loc[i] = circle_lst[i]
-                ARV_calc_loc[i] = []
-                # Calculate areas and store in asas
-                FRV_area_loc[i] = np.pi * (ac_info[i]['vmax'] **2 - ac_info[i]['vmin'] ** 2)
-                ARV_area_loc[i] = 0
-            elif len(FRV) == 0:
-                # Should not happen with one a/c or no other a/c in the vicinity.
-                # These are handled earlier. Happens when RotA has removed all
-                # Map them into the format ARV wants. Outercircle CCW, innercircle CW
-                ARV_loc[i] = circle_lst[i]
-                FRV_loc[i] = []
-                ARV_calc_loc[i] = circle_lst[i]
-                # Calculate areas and store in asas
-                FRV_area_loc[i] = 0
-                ARV_area_loc[i] = np.pi * (ac_info[i]['vmax'] **2 - ac_info[i]['vmin'] ** 2)
-            else:
-                # Check multi exteriors, if this layer is not a list, it means it has no exteriors
-                # In that case, make it a list, such that its format is consistent with further code
-                if not type(FRV[0][0]) == list:
-                    FRV = [FRV]
-                if not type(ARV[0][0]) == list:
-                    ARV = [ARV]
-                # Store in asas
-                FRV_loc[i] = FRV
-                ARV_loc[i] = ARV
-                # Calculate areas and store in asas
-                FRV_area_loc[i] = _area(FRV)
-                ARV_area_loc[i] = _area(ARV)
-
-                # Shortest way out prio, so use full SSD (ARV_calc = ARV)
-                ARV_calc = ARV
-                # Update calculatable ARV for resolutions
-                ARV_calc_loc[i] = ARV_calc
-            fpf = ARV_area_loc[i]/(FRV_area_loc[i]+ARV_area_loc[i])
-            FPFs.append([traffic.iloc[i]['time'],traffic.iloc[i]['callsign'],fpf])
-    FPFs = pd.DataFrame(FPFs)
+    # Relevant x1,y1,x2,y2 per pair, before scaling by the vmax of
+    # the own aircraft (x0 and y0 are zero in relative velocity space)
+    x1 = (sinqdr + cosqdrtanalpha) * 2
+    x2 = (sinqdr - cosqdrtanalpha) * 2
+    y1 = (cosqdr - sinqdrtanalpha) * 2
+    y2 = (cosqdr + sinqdrtanalpha) * 2
+
+    # Each pair gives a VO for both of its aircraft.  Sort them by own
+    # aircraft, with the other aircraft in increasing order.
+    own = np.concatenate((ind1, ind2))
+    other = np.concatenate((ind2, ind1))
+    pair = np.tile(np.arange(len(ind1)), 2)
+    order = np.lexsort((other, own))
+    own, other, pair = own[order], other[order], pair[order]
+    start = np.searchsorted(own, np.arange(ntraf+1))
+
+    # VO from 2 to 1 is mirror of 1 to 2. Only 1 to 2 can be constructed in
+    # this manner, so need a correction vector that will mirror the VO
+    fix = np.where(other < own, -1., 1.)
+    scale = vmax[own]
+    # Current and potential velocities of the other aircraft, giving
+    # the VO triangles with shape [npairs*2 x 3 x 2]
+    x = np.stack((gseast[other],
+                  x1[pair] * scale * fix + gseast[other],
+                  x2[pair] * scale * fix + gseast[other]), axis=-1)
+    y = np.stack((gsnorth[other],
+                  y1[pair] * scale * fix + gsnorth[other],
+                  y2[pair] * scale * fix + gsnorth[other]), axis=-1)
+    VO = _scale_to_clipper(np.stack((x, y), axis=-1))
+
+    # VOs are skipped where the callsign of the traffic row at the
+    # VO's position among the in-range aircraft matches the own
+    # callsign
+    position = np.arange(len(own)) - start[own]
+    use = callsign[position] != callsign[own]
+    timer.lap('vo')
+
+    FRV_area_loc, ARV_area_loc, FRV_loc, ARV_loc = _clip_velocity_sets(VO, start, use, vmax, vmin, method)
+    timer.lap('clip')
+
+    fpf = ARV_area_loc/(FRV_area_loc+ARV_area_loc)
+    FPFs = pd.DataFrame({0: traffic['time'].to_numpy(), 1: traffic['callsign'].to_numpy(), 2: fpf})
+    if method == 'polygon':
+        FPFs[3] = FRV_loc
+        FPFs[4] = ARV_loc
+    timer.lap('result')
 
     return FPFs
-
-
@@ -0,0 +1,255 @@
+"""Monte Carlo sampling of pilot and controller errors in GNATS
+
+GNATS can inject human errors into a simulation through its controller
+interface (for example ``setDelayPeriod``) and pilot interface (for
+example ``setActionLag`` or ``skipFlightPhase``).  To study their
+effect, the same scenario is run many times with different error
+parameters.  :py:func:`run_error_samples` takes the scenario, a
+template of the error calls, and a table with one row of parameter
+values per sample, runs the samples in a
+:py:class:`~paraatm.io.gnats.GnatsScenarioPool`, and returns the
+trajectories of all samples as one table::
+
+    errors = [('setDelayPeriod', 'SWA1897', 'AIRCRAFT_CLEARANCE_PUSHBACK', Sampled('pushback_delay')),
+              ('setActionLag', 'SWA1897', 'COURSE', Sampled('lag_time'), 0.05, 60)]
+    samples = pd.DataFrame({'pushback_delay': rng.uniform(0, 20, 500),
+                            'lag_time': rng.uniform(0, 30, 500)})
+    base = dict(trx_file=trx_file, mfl_file=mfl_file, propagation_time=22000, time_step=30)
+    trajectories = run_error_samples(base, errors, samples, n_workers=8)
+
+Each worker process starts its JVM and loads the wind data once, for
+its first sample.  The aircraft are loaded again for every sample,
+because the injected errors and the simulation change their state.
+"""
+
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ..io.gnats import GnatsEnvironment, GnatsBasicSimulation, GnatsScenarioPool
+
+#interface through which GNATS injects each kind of error
+ERROR_METHODS = {
+    'setDelayPeriod': 'controller',
+    'skipFlightPhase': 'pilot',
+    'setActionRepeat': 'pilot',
+    'setWrongAction': 'pilot',
+    'setActionReversal': 'pilot',
+    'setPartialAction': 'pilot',
+    'skipChangeAction': 'pilot',
+    'setActionLag': 'pilot',
+}
+
+#columns of the timings returned by run_error_samples
+TIMING_COLUMNS = ['setup', 'simulation', 'total', 'rap_loaded', 'pid']
+
+
+class Sampled:
+    """Placeholder for a value taken from a column of the sample table
+
+    Parameters
+    ----------
+    column : str
+        Column of the samples passed to :py:func:`run_error_samples`
+    """
+    def __init__(self, column):
+        self.column = column
+
+    def __repr__(self):
+        return 'Sampled({!r})'.format(self.column)
+
+
+class GnatsErrorSimulation(GnatsBasicSimulation):
+    """GNATS simulation from TRX and MFL files, with injected errors
+
+    The errors are given as tuples of the name of a controller or pilot
+    interface method (see :py:data:`ERROR_METHODS`) followed by its
+    arguments, as in the GNATS Python samples, for example
+    ``('setActionLag', 'SWA1897', 'COURSE', 10, 0.05, 60)``.  Constants
+    such as 'AIRCRAFT_CLEARANCE_PUSHBACK' are given by name, as they
+    are defined in the GNATS Python header.
+
+    The aircraft are always released after the simulation, since the
+    errors change their state.  The time spent on setting up the
+    simulation and on running it is recorded in the attribute timings.
+    """
+    def __init__(self, trx_file, mfl_file, propagation_time, time_step, errors=(), error_time=None):
+        """
+        Parameters
+        ----------
+        trx_file : str
+        mfl_file : str
+        propagation_time : int
+            Total flight propagation time in seconds
+        time_step : int
+            Time step in seconds
+        errors : sequence of tuple
+            Error calls to make
+        error_time : int, optional
+            Simulation time in seconds at which to pause the simulation
+            and inject the errors.  By default they are injected before
+            the simulation starts.
+        """
+        super().__init__(trx_file, mfl_file, propagation_time, time_step)
+        _check_errors(errors)
+        self.errors = errors
+        self.error_time = error_time
+        self.timings = {}
+
+    def inject_errors(self):
+        """Make the error calls on the controller and pilot interfaces"""
+        interfaces = {'controller': GnatsEnvironment.controllerInterface,
+                      'pilot': GnatsEnvironment.pilotInterface}
+        for method, *args in self.errors:
+            getattr(interfaces[ERROR_METHODS[method]], method)(*args)
+
+    def simulation(self):
+        simulationInterface = GnatsEnvironment.simulationInterface
+
+        start = time.perf_counter()
+        simulationInterface.clear_trajectory()
+        rap_loaded = GnatsEnvironment.load_rap(GnatsEnvironment.share_dir + "/tg/rap")
+        GnatsEnvironment.load_aircraft(self.trx_file, self.mfl_file)
+        simulationInterface.setupSimulation(self.propagation_time, self.time_step)
+
+        if self.error_time is None:
+            self.inject_errors()
+            setup = time.perf_counter() - start
+            simulationInterface.start()
+        else:
+            setup = time.perf_counter() - start
+            simulationInterface.start(self.error_time)
+            GnatsEnvironment.wait_for_status('GNATS_SIMULATION_STATUS_PAUSE')
+            injected = time.perf_counter()
+            self.inject_errors()
+            setup += time.perf_counter() - injected
+            simulationInterface.resume()
+
+        GnatsEnvironment.wait_for_status('GNATS_SIMULATION_STATUS_ENDED')
+        self.timings = dict(setup=setup, simulation=time.perf_counter() - start - setup, rap_loaded=rap_loaded)
+
+
+def run_error_simulation(trx_file, mfl_file, propagation_time, time_step, errors=(), error_time=None):
+    """Run a :py:class:`GnatsErrorSimulation` and return its trajectory and timings
+
+    This is the simulator of the :py:class:`~paraatm.io.gnats.GnatsScenarioPool`
+    used by :py:func:`run_error_samples`.  The JVM is started if it is
+    not already running.
+
+    Returns
+    -------
+    trajectory : DataFrame
+        Trajectory results
+    timings : dict
+        Seconds spent on setting up the simulation, including loading
+        the data and injecting the errors ('setup'), on running it
+        ('simulation'), and in total, including starting the JVM and
+        reading the output ('total'), as well as whether the wind data
+        had to be loaded ('rap_loaded') and the process id ('pid')
+    """
+    start = time.perf_counter()
+    GnatsEnvironment.start_jvm()
+    simulation = GnatsErrorSimulation(trx_file, mfl_file, propagation_time, time_step, errors, error_time)
+    trajectory = simulation()['trajectory']
+    timings = dict(simulation.timings, total=time.perf_counter() - start, pid=os.getpid())
+    return trajectory, timings
+
+
+def run_error_samples(base, errors, samples, pool=None, n_workers=None, timeout=None,
+                      skip_failed=False, return_timings=False):
+    """Run a scenario once for each sample of error parameters
+
+    Parameters
+    ----------
+    base : dict
+        Keyword arguments of :py:func:`run_error_simulation` other than
+        errors: 'trx_file', 'mfl_file', 'propagation_time',
+        'time_step', and optionally 'error_time'.  Values may be
+        :py:class:`Sampled`.
+    errors : sequence of tuple
+        Error calls, as for :py:class:`GnatsErrorSimulation`, with
+        :py:class:`Sampled` in place of the arguments that vary
+    samples : DataFrame
+        Parameter values, one row per sample.  The index identifies
+        the samples, and must be unique.
+    pool : GnatsScenarioPool, optional
+        Pool to run the samples in, created with
+        ``simulator=run_error_simulation`` or a function that behaves
+        the same.  By default a pool is created for the call and
+        closed after it.
+    n_workers, timeout : optional
+        Arguments of the pool created when pool is not given
+    skip_failed : bool
+        If True, samples that failed are left out of the results with
+        a warning.  Otherwise, a RuntimeError is raised.
+    return_timings : bool
+        Whether to also return the timings of each sample
+
+    Returns
+    -------
+    trajectories : DataFrame
+        Trajectories of all samples, with the id of the sample in the
+        first column, 'sample'
+    timings : DataFrame
+        If return_timings, the timings of :py:func:`run_error_simulation`
+        for each sample (columns as in :py:data:`TIMING_COLUMNS`),
+        indexed by sample id.  For the first sample run by a worker,
+        'total' includes starting the JVM.
+    """
+    _check_errors(errors)
+    if not samples.index.is_unique:
+        raise ValueError('sample index must be unique')
+    missing = {value.column for value in list(base.values()) + [arg for error in errors for arg in error]
+               if isinstance(value, Sampled)} - set(samples.columns)
+    if missing:
+        raise KeyError('columns not in samples: {}'.format(', '.join(sorted(missing))))
+
+    scenarios = []
+    for row in samples.to_dict('records'):
+        scenario = {key: _resolve(value, row) for key, value in base.items()}
+        scenario['errors'] = [tuple(_resolve(arg, row) for arg in error) for error in errors]
+        scenarios.append(scenario)
+
+    if pool is None:
+        with GnatsScenarioPool(n_workers, simulator=run_error_simulation, timeout=timeout) as pool:
+            results = pool.map(scenarios, return_exceptions=skip_failed)
+    else:
+        results = pool.map(scenarios, return_exceptions=skip_failed)
+
+    ids = samples.index.to_list()
+    failed = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+    if failed:
+        warnings.warn('{} of {} samples failed and are left out, the first one being {}'.format(
+            len(failed), len(results), results[failed[0]]))
+        ids = [sample for sample, result in zip(ids, results) if not isinstance(result, Exception)]
+        results = [result for result in results if not isinstance(result, Exception)]
+
+    if results:
+        trajectories = pd.concat([trajectory for trajectory, _ in results], keys=ids, names=['sample'])
+        trajectories = trajectories.reset_index(level='sample').reset_index(drop=True)
+    else:
+        trajectories = pd.DataFrame(columns=['sample'])
+    if not return_timings:
+        return trajectories
+    timings = pd.DataFrame([t for _, t in results], index=pd.Index(ids, name=samples.index.name),
+                           columns=TIMING_COLUMNS)
+    return trajectories, timings
+
+
+def _check_errors(errors):
+    """Raise ValueError for error calls to unknown methods"""
+    for error in errors:
+        if error[0] not in ERROR_METHODS:
+            raise ValueError('unknown error method: {}'.format(error[0]))
+
+
+def _resolve(value, row):
+    """Replace a Sampled value by its value in row, as a Python scalar"""
+    if isinstance(value, Sampled):
+        value = row[value.column]
+    if isinstance(value, np.generic):
+        value = value.item()
+    return value
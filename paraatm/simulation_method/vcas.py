@@ -14,7 +14,6 @@ The script can also check compliance for each command
 """
 
 import os
-import time
 import pandas as pd
 import numpy as np
 import scipy.stats as sts
@@ -150,14 +149,8 @@ class VCAS(NatsSimulationWrapper, object):
         aclist = self.aircraftInterface.getAllAircraftId()
         self.simulationInterface.setupSimulation(self.sim_time, 1)
         self.simulationInterface.start(1)
-        # Use a while loop to constantly check server status.
-        while True:
-            server_runtime_sim_status = self.simulationInterface.get_runtime_sim_status()
-            # print(server_runtime_sim_status)
-            if (server_runtime_sim_status == self.NATS_SIMULATION_STATUS_PAUSE):
-                break
-            else:
-                time.sleep(0.1)
+        # Wait for the server to pause
+        NatsEnvironment.wait_for_status(self.NATS_SIMULATION_STATUS_PAUSE)
 
         curr_t = self.starttime + self.simulationInterface.get_curr_sim_time()
         ac = self.aircraftInterface.select_aircraft(aclist[0])
@@ -180,13 +173,7 @@ class VCAS(NatsSimulationWrapper, object):
                 ac.setRocd_fps(vy[ind])
                 self.simulationInterface.resume(1)
                 # check pause
-                while True:
-                    server_runtime_sim_status = self.simulationInterface.get_runtime_sim_status()
-                    # print(server_runtime_sim_status)
-                    if (server_runtime_sim_status == self.NATS_SIMULATION_STATUS_PAUSE):
-                        break
-                    else:
-                        time.sleep(0.1)
+                NatsEnvironment.wait_for_status(self.NATS_SIMULATION_STATUS_PAUSE)
 
                 ac = self.aircraftInterface.select_aircraft(aclist[0])
                 h = ac.getAltitude_ft()
@@ -204,13 +191,7 @@ class VCAS(NatsSimulationWrapper, object):
 
                     self.simulationInterface.resume(dt)
                     # check pause
-                    while True:
-                        server_runtime_sim_status = self.simulationInterface.get_runtime_sim_status()
-                        # print(server_runtime_sim_status)
-                        if (server_runtime_sim_status == self.NATS_SIMULATION_STATUS_PAUSE):
-                            break
-                        else:
-                            time.sleep(0.1)
+                    NatsEnvironment.wait_for_status(self.NATS_SIMULATION_STATUS_PAUSE)
 
                     ac = self.aircraftInterface.select_aircraft(aclist[0])
                     ac.setFlight_phase(stat)
@@ -220,13 +201,7 @@ class VCAS(NatsSimulationWrapper, object):
                 ac.setFlight_phase(11)  # cruise
                 self.simulationInterface.resume(275)
                 # check pause
-                while True:
-                    server_runtime_sim_status = self.simulationInterface.get_runtime_sim_status()
-                    # print(server_runtime_sim_status)
-                    if (server_runtime_sim_status == self.NATS_SIMULATION_STATUS_PAUSE):
-                        break
-                    else:
-                        time.sleep(0.1)
+                NatsEnvironment.wait_for_status(self.NATS_SIMULATION_STATUS_PAUSE)
 
                 ac = self.aircraftInterface.select_aircraft(aclist[0])
                 # curlon = ac.getLongitude_deg()
@@ -235,10 +210,7 @@ class VCAS(NatsSimulationWrapper, object):
 
         self.simulationInterface.resume()
         # check end
-        while True:
-            server_runtime_sim_status = self.simulationInterface.get_runtime_sim_status()
-            if (server_runtime_sim_status == self.NATS_SIMULATION_STATUS_ENDED):
-                break
+        NatsEnvironment.wait_for_status(self.NATS_SIMULATION_STATUS_ENDED)
 
     def write_output(self, filename):
         """
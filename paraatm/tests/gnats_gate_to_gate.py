@@ -1,24 +1,17 @@
-import time
-
 from paraatm.io.gnats import GnatsSimulationWrapper, GnatsEnvironment
 
 class GateToGate(GnatsSimulationWrapper):
     def simulation(self):
 
-        GNATS_SIMULATION_STATUS_PAUSE = GnatsEnvironment.get_gnats_constant('GNATS_SIMULATION_STATUS_PAUSE')
-        GNATS_SIMULATION_STATUS_ENDED = GnatsEnvironment.get_gnats_constant('GNATS_SIMULATION_STATUS_ENDED')
-
         DIR_share = GnatsEnvironment.share_dir
 
         simulationInterface = GnatsEnvironment.simulationInterface
-        environmentInterface = GnatsEnvironment.environmentInterface
-        aircraftInterface = GnatsEnvironment.aircraftInterface
 
         simulationInterface.clear_trajectory()
 
-        environmentInterface.load_rap(DIR_share + "/tg/rap")
+        GnatsEnvironment.load_rap(DIR_share + "/tg/rap")
 
-        aircraftInterface.load_aircraft(DIR_share + "/tg/trx/TRX_DEMO_SFO_PHX_GateToGate_geo.trx", DIR_share + "/tg/trx/TRX_DEMO_SFO_PHX_mfl.trx")
+        GnatsEnvironment.load_aircraft(DIR_share + "/tg/trx/TRX_DEMO_SFO_PHX_GateToGate_geo.trx", DIR_share + "/tg/trx/TRX_DEMO_SFO_PHX_mfl.trx")
 
         #     # Controller to set human error: delay time
         #     # Users can try the following setting and see the difference in trajectory
@@ -29,13 +22,8 @@ class GateToGate(GnatsSimulationWrapper):
 
         simulationInterface.start(660)
 
-        # Use a while loop to constantly check simulation status.  When the simulation finishes, continue to output the trajectory data
-        while True:
-            runtime_sim_status = simulationInterface.get_runtime_sim_status()
-            if (runtime_sim_status == GNATS_SIMULATION_STATUS_PAUSE) :
-                break
-            else:
-                time.sleep(1)
+        # Wait until the simulation pauses, then continue to output the trajectory data
+        GnatsEnvironment.wait_for_status('GNATS_SIMULATION_STATUS_PAUSE')
 
         # Pilot to set error scenarios
         # Users can try the following setting and see the difference in trajectory
@@ -49,16 +37,11 @@ class GateToGate(GnatsSimulationWrapper):
 
         simulationInterface.resume()
 
-        while True:
-            runtime_sim_status = simulationInterface.get_runtime_sim_status()
-            if (runtime_sim_status == GNATS_SIMULATION_STATUS_ENDED) :
-                break
-            else:
-                time.sleep(1)
+        GnatsEnvironment.wait_for_status('GNATS_SIMULATION_STATUS_ENDED')
 
     def write_output(self, filename):
         GnatsEnvironment.simulationInterface.write_trajectories(filename)
 
     def cleanup(self):
-        GnatsEnvironment.aircraftInterface.release_aircraft()
-        GnatsEnvironment.environmentInterface.release_rap()
+        GnatsEnvironment.release_aircraft()
+        GnatsEnvironment.release_rap()
@@ -0,0 +1,49 @@
+"""Stand-in for GNATS simulations, used to test GnatsScenarioPool without GNATS
+
+This is kept apart from the tests themselves, so that the pool's worker
+processes can import it quickly.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def simulation(callsign, propagation_time, time_step, crash_marker=None, fail=False):
+    """Return the trajectory of an aircraft flying north at constant speed
+
+    Parameters
+    ----------
+    callsign : str
+    propagation_time : int
+        Total flight propagation time in seconds
+    time_step : int
+        Time step in seconds
+    crash_marker : str, optional
+        If given and the file does not exist yet, create it and kill
+        the process, as for a JVM crash on the first attempt
+    fail : bool
+        Whether to raise an exception instead
+    """
+    if crash_marker is not None and not os.path.exists(crash_marker):
+        open(crash_marker, 'w').close()
+        os._exit(1)
+    if fail:
+        raise ValueError('bad scenario')
+    t = np.arange(0, propagation_time, time_step)
+    return pd.DataFrame({'time': pd.to_datetime(t, unit='s'), 'callsign': callsign,
+                         'latitude': 37 + 1e-4 * t, 'longitude': -122., 'pid': os.getpid()})
+
+
+def error_simulation(trx_file, mfl_file, propagation_time, time_step, errors=(), error_time=None):
+    """Stand-in for :py:func:`paraatm.simulation_method.error_sampling.run_error_simulation`
+
+    The trajectory is that of :py:func:`simulation` for callsign
+    'SWA1897', delayed by the delays set with setDelayPeriod.
+    """
+    df = simulation('SWA1897', propagation_time, time_step)
+    delay = sum(error[3] for error in errors if error[0] == 'setDelayPeriod')
+    df['time'] += pd.Timedelta(seconds=delay)
+    timings = dict(setup=0., simulation=0., total=0., rap_loaded=False, pid=os.getpid())
+    return df, timings
@@ -1,13 +1,8 @@
-import time
-
 from paraatm.io.nats import NatsSimulationWrapper, NatsEnvironment
 
 class GateToGate(NatsSimulationWrapper):
     def simulation(self):
 
-        NATS_SIMULATION_STATUS_PAUSE = NatsEnvironment.get_nats_constant('GNATS_SIMULATION_STATUS_PAUSE')
-        NATS_SIMULATION_STATUS_ENDED = NatsEnvironment.get_nats_constant('GNATS_SIMULATION_STATUS_ENDED')
-
         DIR_share = NatsEnvironment.share_dir
         
         natsStandalone = NatsEnvironment.get_nats_standalone()
@@ -42,13 +37,8 @@ class GateToGate(NatsSimulationWrapper):
 
         simulationInterface.start(660)
 
-        # Use a while loop to constantly check simulation status.  When the simulation finishes, continue to output the trajectory data
-        while True:
-            runtime_sim_status = simulationInterface.get_runtime_sim_status()
-            if (runtime_sim_status == NATS_SIMULATION_STATUS_PAUSE) :
-                break
-            else:
-                time.sleep(1)
+        # Wait until the simulation pauses, then continue to output the trajectory data
+        NatsEnvironment.wait_for_status('GNATS_SIMULATION_STATUS_PAUSE')
 
         # Pilot to set error scenarios
         # Users can try the following setting and see the difference in trajectory
@@ -62,12 +52,7 @@ class GateToGate(NatsSimulationWrapper):
 
         simulationInterface.resume()
 
-        while True:
-            runtime_sim_status = simulationInterface.get_runtime_sim_status()
-            if (runtime_sim_status == NATS_SIMULATION_STATUS_ENDED) :
-                break
-            else:
-                time.sleep(1)
+        NatsEnvironment.wait_for_status('GNATS_SIMULATION_STATUS_ENDED')
 
         # Store attribute for access by write_output and cleanup:
         self.simulationInterface = simulationInterface
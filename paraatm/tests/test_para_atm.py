@@ -2,21 +2,37 @@ import unittest
 import pandas as pd
 import numpy as np
 import os
+import shutil
+import tempfile
+import time
 
+import paraatm.io.gnats
 from paraatm.io.nats import read_nats_output_file, NatsEnvironment
-from paraatm.io.gnats import read_gnats_output_file, GnatsEnvironment, GnatsBasicSimulation
-from paraatm.io.iff import read_iff_file
-from paraatm.io.utils import read_csv_file
-from paraatm.safety.ground_ssd import ground_ssd_safety_analysis
+from paraatm.io.gnats import read_gnats_output_file, GnatsEnvironment, GnatsBasicSimulation, GnatsScenarioPool, scratch_tempdir, MEMORY_TEMP_DIRS, _wait_for_status
+from paraatm.io.iff import read_iff_file, read_iff_file_as_gpd, read_iff_files, iter_iff_file, iff_index_filename, IFFQueryEngine
+from paraatm.io.utils import read_csv_file, read_data_file
+from paraatm.io.cache import DataCache
+from paraatm.io.resample import resample_trajectories
+from paraatm.pairwise import PairwiseGeometry, triu_pair_indices, neighbor_lists, EARTH_RADIUS
+from paraatm.safety.ground_ssd import ground_ssd_safety_analysis, ground_ssd_sweep, GroundSSDMonitor, SSDProfile, _qdrdist_matrix
+from paraatm.safety.enroute_ssd import enroute_ssd_safety_analysis
 from paraatm.rsm.gp import SklearnGPRegressor
 from paraatm.simulation_method.vcas import VCAS
+from paraatm.simulation_method.error_sampling import GnatsErrorSimulation, Sampled, run_error_samples
 
 from . import nats_gate_to_gate
 from . import gnats_gate_to_gate
+from . import gnats_standin
 
 # Change this to False to test NATS instead of GNATS
 USE_GNATS = False
 
+try:
+    import pyarrow
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 sample_nats_file = os.path.join(THIS_DIR, '..', 'sample_data/NATS_output_SFO_PHX.csv')
 sample_gnats_file = os.path.join(THIS_DIR, '..', 'sample_data/GNATS_output_SFO_PHX.csv')
@@ -40,6 +56,74 @@ class TestGNATSFiles(unittest.TestCase):
         df = read_gnats_output_file(sample_gnats_file)
         # Simple check:
         self.assertEqual(df.shape, (218, 13))
+
+    def test_read_gnats_output_no_aircraft(self):
+        # Output of a run without aircraft has only the preamble
+        with open(sample_gnats_file) as f:
+            preamble = [next(f) for _ in range(9)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'empty.csv')
+            with open(filename, 'w') as f:
+                f.writelines(preamble)
+            df = read_gnats_output_file(filename)
+        self.assertEqual(df.shape, (0, 13))
+        self.assertEqual(list(df.columns), list(read_gnats_output_file(sample_gnats_file).columns))
+
+    def test_scratch_tempdir(self):
+        # Simulation output goes to a RAM-backed directory where
+        # available, unless another location has been set
+        tempdir = scratch_tempdir()
+        try:
+            memory_dirs = [d for d in MEMORY_TEMP_DIRS if os.path.isdir(d) and os.access(d, os.W_OK | os.X_OK)
+                           and shutil.disk_usage(d).free >= paraatm.io.gnats.MEMORY_TEMP_MIN_FREE]
+            expected = memory_dirs[0] if memory_dirs else tempfile.gettempdir()
+            self.assertEqual(os.path.dirname(tempdir), expected)
+            # The output reads back as from anywhere else
+            shutil.copy(sample_gnats_file, tempdir)
+            df = read_gnats_output_file(os.path.join(tempdir, os.path.basename(sample_gnats_file)))
+            pd.testing.assert_frame_equal(df, read_gnats_output_file(sample_gnats_file))
+        finally:
+            shutil.rmtree(tempdir)
+
+        with tempfile.TemporaryDirectory() as root:
+            paraatm.io.gnats.scratch_root = root
+            try:
+                tempdir = scratch_tempdir()
+            finally:
+                paraatm.io.gnats.scratch_root = None
+            self.assertEqual(os.path.dirname(tempdir), root)
+
+    def test_scratch_output_fallback(self):
+        with tempfile.TemporaryDirectory() as memory_dir:
+            # Stand-in for a RAM-backed file system
+            saved = paraatm.io.gnats.MEMORY_TEMP_DIRS, paraatm.io.gnats.MEMORY_TEMP_MIN_FREE
+            paraatm.io.gnats.MEMORY_TEMP_DIRS = (memory_dir,)
+            try:
+                # Too little free space
+                paraatm.io.gnats.MEMORY_TEMP_MIN_FREE = 2**62
+                tempdir = scratch_tempdir()
+                shutil.rmtree(tempdir)
+                self.assertEqual(os.path.dirname(tempdir), tempfile.gettempdir())
+
+                # Output that fails to write in memory is written to disk
+                paraatm.io.gnats.MEMORY_TEMP_MIN_FREE = 0
+                def write(filename):
+                    if filename.startswith(memory_dir):
+                        raise OSError('No space left on device')
+                    shutil.copy(sample_gnats_file, filename)
+                with self.assertWarns(UserWarning):
+                    df = paraatm.io.gnats._scratch_output(write, read_gnats_output_file, 'gnats.csv')
+                self.assertEqual(len(df), 218)
+                self.assertEqual(os.listdir(memory_dir), [])
+
+                # Failures on disk are not retried
+                paraatm.io.gnats.MEMORY_TEMP_DIRS = ()
+                paraatm.io.gnats.scratch_root = memory_dir
+                with self.assertRaises(OSError):
+                    paraatm.io.gnats._scratch_output(write, read_gnats_output_file, 'gnats.csv')
+            finally:
+                paraatm.io.gnats.MEMORY_TEMP_DIRS, paraatm.io.gnats.MEMORY_TEMP_MIN_FREE = saved
+                paraatm.io.gnats.scratch_root = None
         
 class TestIFFFiles(unittest.TestCase):
     def test_read_iff(self):
@@ -63,6 +147,238 @@ class TestIFFFiles(unittest.TestCase):
         self.assertEqual(len(df), 372)
         self.assertEqual(len(df['callsign'].unique()), 2)
 
+    def test_read_iff_chunksize(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_3aircraft.csv')
+
+        # Small chunks should give the same result as a single chunk
+        df_dict = read_iff_file(filename, [3,4], chunksize=50)
+        df_dict_small = read_iff_file(filename, [3,4], chunksize=7)
+        self.assertEqual(list(df_dict.keys()), [3,4])
+        for rec in df_dict:
+            pd.testing.assert_frame_equal(df_dict[rec], df_dict_small[rec])
+
+    def test_read_iff_index(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, 'iff.csv')
+            shutil.copy(os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_3aircraft.csv'), filename)
+
+            df = read_iff_file(filename, [3,4], callsigns='ABC123')
+            df_index = read_iff_file(filename, [3,4], callsigns='ABC123', use_index=True)
+            self.assertTrue(os.path.isfile(iff_index_filename(filename)))
+            for rec in df:
+                pd.testing.assert_frame_equal(df[rec], df_index[rec])
+
+            # Second read uses the saved index
+            df_index = read_iff_file(filename, callsigns=['DEF456','GHI789'], use_index=True)
+            self.assertEqual(len(df_index), 372)
+
+    def test_read_iff_compact(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_3aircraft.csv')
+        df = read_iff_file(filename)
+
+        df_compact = read_iff_file(filename, compact=True, chunksize=50)
+        self.assertEqual(df_compact['callsign'].dtype, 'category')
+        self.assertEqual(df_compact['latitude'].dtype, np.float32)
+        self.assertLess(df_compact.memory_usage(deep=True).sum(), df.memory_usage(deep=True).sum())
+        np.testing.assert_allclose(df_compact['latitude'], df['latitude'], atol=1e-5)
+        self.assertEqual(list(df_compact['callsign'].astype(str)), list(df['callsign']))
+
+        # Original and renamed column names are both accepted
+        df_cols = read_iff_file(filename, callsigns='ABC123', usecols=['time', 'coord1', 'longitude'])
+        self.assertEqual(list(df_cols.columns), ['time', 'latitude', 'longitude'])
+        self.assertEqual(len(df_cols), 194)
+
+    def test_read_iff_pushdown(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_3aircraft.csv')
+        df = read_iff_file(filename)
+        t0, t1 = df['time'].quantile([0.3, 0.6])
+        bbox = (37.615, -122.39, 37.625, -122.38)
+
+        # Predicates evaluated during the scan agree with filtering
+        # the full result afterwards
+        df_pushdown = read_iff_file(filename, time_range=(t0, t1), bbox=bbox, chunksize=37)
+        expected = df[(df['time'] >= t0) & (df['time'] < t1)
+                      & df['latitude'].between(bbox[0], bbox[2])
+                      & df['longitude'].between(bbox[1], bbox[3])]
+        self.assertGreater(len(expected), 0)
+        pd.testing.assert_frame_equal(df_pushdown, expected.reset_index(drop=True))
+
+        # Numeric bounds are seconds since the epoch
+        df_pushdown = read_iff_file(filename, time_range=(None, t0.timestamp()))
+        self.assertEqual(len(df_pushdown), (df['time'] < t0).sum())
+
+    def test_read_iff_as_gpd(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_ABC123.csv')
+        df = read_iff_file(filename)
+
+        gdf = read_iff_file_as_gpd(filename)
+        self.assertEqual(gdf.crs.to_epsg(), 4326)
+        np.testing.assert_array_equal(gdf.geometry.x, df['longitude'])
+        np.testing.assert_array_equal(gdf.geometry.z, df['altitude'])
+
+        # Lazy geometry is only built on request, and agrees with the
+        # eager conversion
+        lazy = read_iff_file_as_gpd(filename, lazy_geometry=True)
+        pd.testing.assert_frame_equal(pd.DataFrame(lazy), df)
+        self.assertTrue(lazy.geometry.geom_equals_exact(gdf.geometry, 0).all())
+        self.assertTrue(lazy.to_geodataframe().geom_equals_exact(gdf.geometry, 0).all())
+
+    def test_iff_query_engine(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_3aircraft.csv')
+        engine = IFFQueryEngine()
+        df = engine.register_iff_file_as_sql_table(filename, query_name='iff')
+        self.assertEqual(len(df), 566)
+        gdf = engine.convert_position_to_geometry('iff', register_name='iff_geom')
+        self.assertEqual(gdf.crs.to_epsg(), 4326)
+
+        # Indexed queries agree with a brute-force scan of the table
+        t_start, t_end = df['recTime'].iloc[100], df['recTime'].iloc[300]
+        result = engine.query_time('iff_geom', t_start, t_end)
+        expected = df[(df['recTime'] >= t_start) & (df['recTime'] <= t_end)]
+        self.assertEqual(list(result['recTime']), list(expected['recTime']))
+
+        fix, radius = (37.62, -122.385, 0.0), 0.005
+        result = engine.query_fix_and_radius('iff_geom', fix, radius, -0.01, register_name='near')
+        expected = df[df['latitude'].between(fix[0] - radius, fix[0] + radius, inclusive='neither')
+                      & df['longitude'].between(fix[1] - radius, fix[1] + radius, inclusive='neither')
+                      & (df['altitude'] > -0.01)]
+        self.assertGreater(len(expected), 0)
+        pd.testing.assert_frame_equal(pd.DataFrame(result.drop(columns='geom')), expected.reset_index(drop=True))
+        self.assertEqual(len(engine.tables['near']), len(expected))
+
+    def test_iter_iff(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_3aircraft.csv')
+        df = read_iff_file(filename)
+
+        chunks = list(iter_iff_file(filename, chunksize=50))
+        self.assertEqual(len(chunks), 12)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+
+        # Time windows are yielded in time order
+        chunks = list(iter_iff_file(filename, time_window='60s', max_delay='1h'))
+        for chunk in chunks:
+            self.assertEqual(len(chunk['time'].dt.floor('60s').unique()), 1)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True),
+                                      df.sort_values('time', kind='stable', ignore_index=True))
+
+    def test_read_iff_files(self):
+        filenames = [os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_ABC123.csv'),
+                     os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_3aircraft.csv')]
+        df = read_iff_files(filenames, n_jobs=2)
+        self.assertEqual(len(df), 724 + 566)
+        self.assertEqual(list(df['source_file'].unique()), filenames)
+
+        # Parallel and serial reads agree
+        df_dict = read_iff_files(filenames, [3,4], n_jobs=2)
+        df_dict_serial = read_iff_files(filenames, [3,4])
+        for rec in df_dict_serial:
+            pd.testing.assert_frame_equal(df_dict[rec], df_dict_serial[rec])
+
+@unittest.skipIf(not HAVE_PYARROW, "pyarrow is required for the data cache")
+class TestDataCache(unittest.TestCase):
+    def test_cached_read(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_ABC123.csv')
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache = DataCache(tempdir)
+            df_dict = read_data_file(filename, 'all')
+            read_data_file(filename, 'all', cache=cache)
+            self.assertEqual(len(cache.entries()), 1)
+
+            # Second read is served from the cache
+            df_dict_cached = read_data_file(filename, 'all', cache=cache)
+            for rec in df_dict:
+                pd.testing.assert_frame_equal(df_dict[rec], df_dict_cached[rec])
+
+            # Different reader arguments use a separate entry
+            read_data_file(filename, cache=cache)
+            self.assertEqual(len(cache.entries()), 2)
+
+            # Least recently used entries are evicted first
+            cache.evict(max_bytes=cache.entries()['bytes'].iloc[-1])
+            self.assertEqual(len(cache.entries()), 1)
+            self.assertEqual(cache.clear(), 1)
+
+    def test_make_key(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_ABC123.csv')
+        cache = DataCache(tempfile.gettempdir())
+        # Long arrays that differ only in the middle, which repr() leaves out
+        a = np.arange(2000)
+        b = a.copy()
+        b[1000] = -1
+        self.assertNotEqual(cache.make_key(filename, 'reader', (a,)), cache.make_key(filename, 'reader', (b,)))
+        callsigns = np.array(['AC{}'.format(i) for i in range(2000)], dtype=object)
+        self.assertNotEqual(cache.make_key(filename, 'reader', kwargs=dict(callsigns=callsigns)),
+                            cache.make_key(filename, 'reader', kwargs=dict(callsigns=callsigns[::-1])))
+        self.assertEqual(cache.make_key(filename, 'reader', kwargs=dict(callsigns=list(callsigns))),
+                         cache.make_key(filename, 'reader', kwargs=dict(callsigns=list(callsigns))))
+
+@unittest.skipIf(HAVE_PYARROW, "pyarrow is installed")
+class TestDataCacheWithoutPyarrow(unittest.TestCase):
+    def test_cached_read(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_ASDEX_ABC123.csv')
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache = DataCache(tempdir)
+            # The file is still read, just not cached
+            with self.assertWarns(UserWarning):
+                df = read_data_file(filename, cache=cache)
+            pd.testing.assert_frame_equal(df, read_data_file(filename))
+            self.assertEqual(len(cache.entries()), 0)
+
+class TestResample(unittest.TestCase):
+    def test_resample_trajectories(self):
+        df = pd.DataFrame({'time': pd.to_datetime(['2020-01-01 00:00:00.5', '2020-01-01 00:00:10.5',
+                                                    '2020-01-01 00:00:02.0', '2020-01-01 00:00:03.0', '2020-01-01 00:00:30.0']),
+                           'callsign': ['A', 'A', 'B', 'B', 'B'],
+                           'latitude': [0., 10., 5., 6., 8.],
+                           'heading': [350., 10., 90., 90., 90.],
+                           'status': ['TAXI', 'AIRBORNE', 'TAXI', 'TAXI', 'TAXI']})
+        resampled = resample_trajectories(df, 5)
+
+        a = resampled[resampled['callsign'] == 'A']
+        self.assertEqual(list(a['time']), list(pd.to_datetime(['2020-01-01 00:00:05', '2020-01-01 00:00:10'])))
+        np.testing.assert_allclose(a['latitude'], [4.5, 9.5])
+        # Headings are interpolated across north
+        np.testing.assert_allclose(a['heading'], [359., 9.])
+        self.assertEqual(list(a['status']), ['TAXI', 'TAXI'])
+        # One state per callsign and grid time, sorted by time
+        self.assertFalse(resampled.duplicated(['time', 'callsign']).any())
+        self.assertTrue(resampled['time'].is_monotonic_increasing)
+
+        # Grid times in gaps longer than max_gap are left out, while
+        # grid times with a record are kept
+        resampled = resample_trajectories(df, 5, max_gap=10)
+        self.assertEqual(list(resampled[resampled['callsign'] == 'B']['time']), [pd.Timestamp('2020-01-01 00:00:30')])
+        self.assertEqual((resampled['callsign'] == 'A').sum(), 2)
+
+class TestPairwise(unittest.TestCase):
+    def test_bearing_distance(self):
+        rng = np.random.default_rng(0)
+        geometry = PairwiseGeometry()
+        # Buffers are reused for calls of different sizes
+        for n in [10, 100, 2]:
+            lat, lon = rng.uniform(37, 38, n), rng.uniform(-123, -122, n)
+            ind1, ind2 = triu_pair_indices(n)
+            qdr, dist = geometry.bearing_distance(lat, lon)
+            expected_qdr, expected_dist = _qdrdist_matrix(lat[ind1], lon[ind1], lat[ind2], lon[ind2])
+            np.testing.assert_array_equal(qdr, expected_qdr)
+            np.testing.assert_array_equal(dist, expected_dist)
+
+        # One degree of latitude along a meridian
+        dist = geometry.haversine(np.array([0., 1.]), np.array([0., 0.]))
+        self.assertAlmostEqual(dist[0], np.radians(1) * EARTH_RADIUS, 6)
+
+    def test_neighbor_lists(self):
+        # Object 1 is 0.5 km from object 0 and object 2 is 10 km away,
+        # and object 2 is missing in the second frame
+        km = 1 / (np.radians(1) * 6373.0)
+        lat = np.array([[0., 0.5 * km, 10 * km], [0., 0.5 * km, 0.]])
+        lon = np.zeros((2, 3))
+        exists = np.array([[True, True, True], [True, True, False]])
+        nei_list, nei_num = neighbor_lists(lat, lon, exists, 1.0, radius=6373.0)
+        np.testing.assert_array_equal(nei_list[0], [[0, 1, 0], [1, 0, 0], [0, 0, 0]])
+        np.testing.assert_array_equal(nei_list[1], [[0, 1, 0], [1, 0, 0], [1, 1, 0]])
+        np.testing.assert_array_equal(nei_num, nei_list.sum(axis=2))
+
 class TestGroundSSD(unittest.TestCase):
     def test_ground_ssd(self):
         filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
@@ -75,6 +391,159 @@ class TestGroundSSD(unittest.TestCase):
         self.assertTrue(all(safety['fpf'] >= 0.0))
         self.assertEqual(sum(safety['fpf'].isnull()), 0)
 
+        # Regression check against the values of the original,
+        # non-vectorized implementation
+        self.assertEqual(len(safety), 2056)
+        self.assertAlmostEqual(safety['fpf'].astype(float).sum(), 1549.1172603, 5)
+
+    def test_ground_ssd_interaction_radius(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
+        df = read_csv_file(filename)
+        df = df[df['time'] < df['time'].min() + pd.Timedelta('60s')]
+        safety = ground_ssd_safety_analysis(df)
+
+        # A radius beyond the ADS-B range does not change the results
+        pd.testing.assert_frame_equal(ground_ssd_safety_analysis(df, interaction_radius=1e6), safety)
+
+        # A small radius leaves the aircraft without close neighbors
+        # fully free
+        safety_near = ground_ssd_safety_analysis(df, interaction_radius=100)
+        self.assertEqual(len(safety_near), len(safety))
+        self.assertTrue(all(safety_near['fpf'] <= 1.0))
+        self.assertGreater((safety_near['fpf'] == 1.0).sum(), (safety['fpf'] == 1.0).sum())
+
+    def test_ground_ssd_parallel(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
+        df = read_csv_file(filename)
+        df = df[df['time'] < df['time'].min() + pd.Timedelta('60s')]
+
+        # Parallel results match the serial run exactly, in time order
+        safety = ground_ssd_safety_analysis(df)
+        pd.testing.assert_frame_equal(ground_ssd_safety_analysis(df, n_jobs=2), safety, check_exact=True)
+
+    def test_ground_ssd_profile(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
+        df = read_csv_file(filename)
+        df = df[df['time'] < df['time'].min() + pd.Timedelta('60s')]
+        safety = ground_ssd_safety_analysis(df)
+
+        # Profiling does not change the results, in serial or parallel
+        # runs, and records every bucket of each run
+        profile = SSDProfile()
+        pd.testing.assert_frame_equal(ground_ssd_safety_analysis(df, profile=profile), safety, check_exact=True)
+        pd.testing.assert_frame_equal(ground_ssd_safety_analysis(df, n_jobs=2, profile=profile), safety, check_exact=True)
+        buckets = profile.to_frame()
+        self.assertEqual(len(profile.runs), 2)
+        self.assertEqual(len(buckets), 120)
+        self.assertEqual(buckets.loc[buckets['aircraft'] > 1, 'aircraft'].sum(), 2 * len(safety))
+
+        # All pairs are candidates within the default ADS-B range
+        n = buckets['aircraft']
+        pd.testing.assert_series_equal(buckets['candidates'], n * (n - 1) // 2, check_names=False)
+        self.assertTrue((buckets['total'] >= buckets[['bada', 'search', 'geometry', 'vo', 'clip', 'result']].sum(axis=1)).all())
+        self.assertEqual(list(profile.summary().index),
+                         ['bada', 'search', 'geometry', 'vo', 'clip', 'result', 'prepare', 'split', 'buckets', 'concat'])
+
+    def test_ground_ssd_resample(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
+        df = read_csv_file(filename)
+        df = df[df['time'] < df['time'].min() + pd.Timedelta('60s')]
+
+        # Some aircraft have several reports in a 1 s bucket
+        self.assertTrue(df.assign(bucket=df['time'].dt.floor('1s')).duplicated(['bucket', 'callsign']).any())
+
+        # After resampling, each bucket holds one state per aircraft,
+        # at the start of the bucket
+        safety = ground_ssd_safety_analysis(df, resample=True)
+        self.assertFalse(safety.duplicated(['time', 'callsign']).any())
+        self.assertTrue((safety['time'] == safety['time'].dt.floor('1s')).all())
+
+    def test_ground_ssd_sweep(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
+        df = read_csv_file(filename)
+        df = df[df['time'] < df['time'].min() + pd.Timedelta('60s')]
+        lookaheads = [0.5, 1, 1.5, 3]
+        sweep = ground_ssd_sweep(df, lookaheads)
+
+        # Each lookahead time gives the results of a separate analysis
+        self.assertEqual(list(sweep.columns), ['lookahead', 'time', 'callsign', 'fpf'])
+        for lookahead in lookaheads:
+            result = sweep[sweep['lookahead'] == lookahead].drop(columns='lookahead')
+            pd.testing.assert_frame_equal(result, ground_ssd_safety_analysis(df, lookahead_seconds=lookahead), check_exact=True)
+
+    def test_ground_ssd_polygon(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
+        df = read_csv_file(filename)
+        df = df[df['time'] < df['time'].min() + pd.Timedelta('60s')]
+        safety = ground_ssd_safety_analysis(df)
+        safety_polygon = ground_ssd_safety_analysis(df, method='polygon')
+
+        # The FPF values of the fast path match those from the
+        # clipped ARV polygons
+        pd.testing.assert_frame_equal(safety_polygon[['time', 'callsign', 'fpf']], safety, atol=1e-6)
+
+        # The velocity sets are returned, and their areas give the
+        # FPF.  Holes are oriented clockwise, so summing the signed
+        # areas of the polygons subtracts them.
+        def area(polygons):
+            return sum(0.5 * np.sum(p[:,0] * np.roll(p[:,1], -1) - np.roll(p[:,0], -1) * p[:,1]) for p in polygons)
+        row = safety_polygon[safety_polygon['fpf'].between(0.1, 0.9)].iloc[0]
+        frv_area, arv_area = area(row['frv']), area(row['arv'])
+        self.assertAlmostEqual(arv_area / (frv_area + arv_area), row['fpf'], 5)
+
+        with self.assertRaises(ValueError):
+            ground_ssd_safety_analysis(df, method='exact')
+
+    def test_ground_ssd_monitor(self):
+        filename = os.path.join(THIS_DIR, '..', 'sample_data/IFF_SFO_window.csv')
+        df = read_csv_file(filename)
+        df = df[df['time'] < df['time'].min() + pd.Timedelta('60s')]
+        # Keep the latest update of each aircraft per window, in time
+        # order, which is the input for which the monitor matches the
+        # batch analysis
+        df = df.sort_values('time', kind='stable')
+        df = df[~df.assign(window=df['time'].dt.floor('1s')).duplicated(['window', 'callsign'], keep='last')]
+        safety = ground_ssd_safety_analysis(df)
+
+        monitor = GroundSSDMonitor()
+        results = [monitor.update(df.iloc[i:i+25]) for i in range(0, len(df), 25)]
+        results.append(monitor.flush())
+        pd.testing.assert_frame_equal(pd.concat(results, ignore_index=True), safety.reset_index(drop=True), check_exact=True)
+        self.assertEqual(monitor.late_updates, 0)
+
+class TestEnrouteSSD(unittest.TestCase):
+    def test_enroute_ssd(self):
+        # Two aircraft head-on at FL350, 20 NM apart, a third one 2000
+        # ft above the first, and a fourth one out of ADS-B range
+        time = pd.Timestamp('2020-01-01 12:00')
+        nm_lon = 1 / 60 / np.cos(np.radians(40))
+        df = pd.DataFrame({'time': [time] * 4,
+                           'callsign': ['A', 'B', 'C', 'D'],
+                           'latitude': [40., 40., 40., 40.],
+                           'longitude': [-100., -100 + 20 * nm_lon, -100 + 2 * nm_lon, -90.],
+                           'altitude': [35000, 35000, 37000, 35000],
+                           'tas': [450] * 4,
+                           'heading': [90, 270, 90, 90]})
+        safety = enroute_ssd_safety_analysis(df)
+
+        fpf = safety.set_index('callsign')['fpf']
+        self.assertLess(fpf['A'], 1.0)
+        self.assertAlmostEqual(fpf['A'], fpf['B'], 5)
+        self.assertEqual(fpf['C'], 1.0)
+        self.assertEqual(fpf['D'], 1.0)
+
+        # Within the horizontal separation, a dart tip reduces the
+        # FPF further
+        df_los = df.assign(longitude=[-100., -100 + 2 * nm_lon, -100 + 2 * nm_lon, -90.])
+        fpf_los = enroute_ssd_safety_analysis(df_los).set_index('callsign')['fpf']
+        self.assertLess(fpf_los['A'], fpf['A'])
+
+        # The polygon method gives the same FPF, along with the
+        # velocity sets
+        safety_polygon = enroute_ssd_safety_analysis(df, method='polygon')
+        pd.testing.assert_frame_equal(safety_polygon[['time', 'callsign', 'fpf']], safety, atol=1e-6)
+        self.assertEqual(len(safety_polygon['arv'].iloc[3]), 2)
+
 @unittest.skipIf(USE_GNATS, "use GNATS instead of NATS")
 class TestNatsSimulation(unittest.TestCase):
     # Note that for this test to run, NATS must be installed and the
@@ -139,6 +608,148 @@ class TestGnatsSimulation(unittest.TestCase):
         # Basic consistency checks:
         self.assertEqual(len(df), 218)
 
+class RecordingInterface:
+    """Stand-in for the GNATS Java interfaces that records the calls made"""
+    def __init__(self):
+        self.calls = []
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append(name)
+
+class TestGnatsLoadCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        GnatsEnvironment.environmentInterface = RecordingInterface()
+        GnatsEnvironment.aircraftInterface = RecordingInterface()
+
+    def tearDown(self):
+        del GnatsEnvironment.environmentInterface, GnatsEnvironment.aircraftInterface
+        GnatsEnvironment.loaded_rap = GnatsEnvironment.loaded_aircraft = None
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, text, mtime=None):
+        filename = os.path.join(self.tmpdir, name)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(filename, (mtime, mtime))
+        return filename
+
+    def test_load_rap(self):
+        environment = GnatsEnvironment.environmentInterface
+        self.write('rap/wind.grb2', 'wind', mtime=1e9)
+        rap = os.path.join(self.tmpdir, 'rap')
+        self.assertTrue(GnatsEnvironment.load_rap(rap))
+        self.assertFalse(GnatsEnvironment.load_rap(rap))
+        self.assertEqual(environment.calls, ['load_rap'])
+
+        # A changed file is loaded again, replacing the old data
+        self.write('rap/wind.grb2', 'wind', mtime=2e9)
+        self.assertTrue(GnatsEnvironment.load_rap(rap))
+        self.assertEqual(environment.calls, ['load_rap', 'release_rap', 'load_rap'])
+
+        GnatsEnvironment.release_rap()
+        GnatsEnvironment.release_rap()
+        self.assertTrue(GnatsEnvironment.load_rap(rap))
+        self.assertEqual(environment.calls, ['load_rap', 'release_rap', 'load_rap', 'release_rap', 'load_rap'])
+
+    def test_load_aircraft(self):
+        aircraft = GnatsEnvironment.aircraftInterface
+        trx1 = self.write('a.trx', 'TRACK A')
+        trx2 = self.write('b.trx', 'TRACK A')
+        trx3 = self.write('c.trx', 'TRACK C')
+        mfl = self.write('mfl.trx', 'MFL')
+
+        # Aircraft are identified by the contents of the files
+        self.assertTrue(GnatsEnvironment.load_aircraft(trx1, mfl))
+        self.assertFalse(GnatsEnvironment.load_aircraft(trx2, mfl))
+        self.assertEqual(aircraft.calls, ['load_aircraft'])
+        self.assertTrue(GnatsEnvironment.load_aircraft(trx3, mfl))
+        self.assertEqual(aircraft.calls, ['load_aircraft', 'release_aircraft', 'load_aircraft'])
+
+class TestWaitForStatus(unittest.TestCase):
+    def test_wait_for_status(self):
+        # Stand-in for get_runtime_sim_status of a simulation that
+        # pauses after 5 ms
+        pause_time = time.perf_counter() + 0.005
+        def get_status():
+            return 'PAUSE' if time.perf_counter() >= pause_time else 'RUNNING'
+
+        # The pause is noticed within a few ms, not after a fixed sleep
+        waited = _wait_for_status(get_status, 'PAUSE')
+        self.assertGreaterEqual(waited, 0.004)
+        self.assertLess(waited, 0.05)
+        self.assertLess(_wait_for_status(get_status, 'PAUSE'), 0.001)
+
+        with self.assertRaises(TimeoutError):
+            _wait_for_status(get_status, 'ENDED', timeout=0.01)
+
+class TestGnatsScenarioPool(unittest.TestCase):
+    def test_scenario_pool(self):
+        tmpdir = tempfile.mkdtemp()
+        scenarios = [dict(callsign='AC{}'.format(i), propagation_time=100 * (i + 1), time_step=10) for i in range(6)]
+        scenarios[3]['crash_marker'] = os.path.join(tmpdir, 'crashed')
+        try:
+            with GnatsScenarioPool(2, simulator=gnats_standin.simulation) as pool:
+                trajectories = pool.map(scenarios)
+
+                # Results are in order, and the crashed worker was
+                # replaced to run its scenario again
+                self.assertEqual([len(df) for df in trajectories], [10, 20, 30, 40, 50, 60])
+                self.assertEqual([df['callsign'].iloc[0] for df in trajectories], ['AC0', 'AC1', 'AC2', 'AC3', 'AC4', 'AC5'])
+                self.assertEqual(pool.restarts, 1)
+                self.assertNotEqual(trajectories[0]['pid'].iloc[0], trajectories[1]['pid'].iloc[0])
+
+                # Failing scenarios are reported without stopping the others
+                scenarios = [dict(callsign='AC0', propagation_time=100, time_step=10, fail=True),
+                             dict(callsign='AC1', propagation_time=100, time_step=10)]
+                with self.assertRaises(RuntimeError):
+                    pool.map(scenarios)
+                results = pool.map(scenarios, return_exceptions=True)
+                self.assertIsInstance(results[0], RuntimeError)
+                self.assertIn('bad scenario', str(results[0]))
+                self.assertEqual(len(results[1]), 10)
+                self.assertEqual(pool.restarts, 1)
+
+            with self.assertRaises(RuntimeError):
+                pool.map(scenarios)
+        finally:
+            shutil.rmtree(tmpdir)
+
+class TestErrorSampling(unittest.TestCase):
+    def test_inject_errors(self):
+        GnatsEnvironment.controllerInterface = RecordingInterface()
+        GnatsEnvironment.pilotInterface = RecordingInterface()
+        try:
+            errors = [('setDelayPeriod', 'SWA1897', 'AIRCRAFT_CLEARANCE_PUSHBACK', 7),
+                      ('setActionLag', 'SWA1897', 'COURSE', 10, 0.05, 60),
+                      ('skipFlightPhase', 'SWA1897', 'FLIGHT_PHASE_CLIMB_TO_CRUISE_ALTITUDE')]
+            GnatsErrorSimulation('a.trx', 'mfl.trx', 22000, 30, errors).inject_errors()
+            self.assertEqual(GnatsEnvironment.controllerInterface.calls, ['setDelayPeriod'])
+            self.assertEqual(GnatsEnvironment.pilotInterface.calls, ['setActionLag', 'skipFlightPhase'])
+        finally:
+            del GnatsEnvironment.controllerInterface, GnatsEnvironment.pilotInterface
+
+        with self.assertRaises(ValueError):
+            GnatsErrorSimulation('a.trx', 'mfl.trx', 22000, 30, [('setDelay', 'SWA1897', 7)])
+
+    def test_run_error_samples(self):
+        base = dict(trx_file='a.trx', mfl_file='mfl.trx', propagation_time=Sampled('duration'), time_step=10)
+        errors = [('setDelayPeriod', 'SWA1897', 'AIRCRAFT_CLEARANCE_PUSHBACK', Sampled('delay'))]
+        samples = pd.DataFrame({'delay': [0, 5, 20], 'duration': [100, 200, 100]}, index=[10, 11, 12])
+
+        with GnatsScenarioPool(2, simulator=gnats_standin.error_simulation) as pool:
+            trajectories, timings = run_error_samples(base, errors, samples, pool=pool, return_timings=True)
+
+        self.assertEqual(list(trajectories.columns[:3]), ['sample', 'time', 'callsign'])
+        self.assertEqual(trajectories.groupby('sample').size().to_dict(), {10: 10, 11: 20, 12: 10})
+        start = trajectories.groupby('sample')['time'].min()
+        self.assertEqual(list((start - start[10]).dt.total_seconds()), [0, 5, 20])
+        self.assertEqual(list(timings.index), [10, 11, 12])
+
+        with self.assertRaises(KeyError):
+            run_error_samples(base, errors, samples[['delay']], pool=pool)
+
 class TestSklearnGP(unittest.TestCase):
     def test_1d(self):
         x = np.array([1., 3., 5., 6., 7., 8.])